@@ -49,7 +49,13 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Server-Timing y métricas de base de datos por endpoint (va primero para medir todo)
+    'core.middleware.DbTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    # Comprime las respuestas grandes (debe ir antes de lo que lea el cuerpo)
+    'django.middleware.gzip.GZipMiddleware',
+    # ETag por contenido y 304 para las vistas que no traen uno propio
+    'django.middleware.http.ConditionalGetMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -81,16 +87,90 @@ WSGI_APPLICATION = 'FactoraPos.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# Pool de sesiones de oracledb (parámetros de oracledb.create_pool).
+# Con pool, CONN_MAX_AGE debe quedar en 0: las conexiones vuelven al pool.
+DB_POOL = {
+    'min': 2,
+    'max': 10,
+    'increment': 1,
+    'ping_interval': 60,   # segundos inactiva antes de verificar una sesión al entregarla
+    'wait_timeout': 5000,  # ms máximos esperando una sesión libre
+}
+
 # Configuración para Oracle Database
+# core.backends.oracle = backend Oracle de Django + métricas del pool (/api/db/pool/)
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.oracle',
+        'ENGINE': 'core.backends.oracle',
         'NAME': 'localhost:1521/XEPDB1',
         'USER': 'FACTORA_POS',
         'PASSWORD': 'factorapass',
+        'OPTIONS': {
+            'pool': DB_POOL,
+        },
     }
 }
 
+# Cache (memoria local por defecto; cambiar BACKEND para compartirlo entre
+# workers, p. ej. django.core.cache.backends.redis.RedisCache)
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'factorapos',
+    }
+}
+
+# Alias de CACHES y segundos de vida de los listados de catálogo (core.cache).
+# Las versiones de cada tabla se leen de VERSIONES_TABLAS (compartida por todos
+# los workers) y se reutilizan CATALOG_VERSION_TTL segundos por proceso
+# (crear la tabla con: python manage.py setup_cache_versions)
+CATALOG_CACHE = 'default'
+CATALOG_CACHE_TIMEOUT = 300
+CATALOG_VERSION_TTL = 1
+
+# Cache LRU de productos por ID/código para el escaneo en caja (inventario.lookup)
+LOOKUP_CACHE_SIZE = 5000
+LOOKUP_CACHE_TTL = 60
+
+# IDs que cada proceso reserva de una vez en las secuencias SEQ_* (core.ids).
+# 0 = un NEXTVAL dentro de cada INSERT ... RETURNING
+ID_BLOCK_SIZE = 0
+
+# Segundos que core.schema mantiene las columnas de cada tabla en memoria
+SCHEMA_CACHE_TTL = 300
+
+# Mantener RESUMEN_VENTAS_DIA / RESUMEN_VENDEDORES_DIA / RESUMEN_MOVIMIENTOS_DIA
+# en cada venta y movimiento
+# (crear las tablas con: python manage.py rebuild_resumenes)
+RESUMENES_DIARIOS = True
+
+# Antigüedad mínima (segundos) de un cambio antes de que /api/sync/ lo entregue
+# (crear la tabla CAMBIOS con: python manage.py setup_change_feed)
+SYNC_LAG_SEGUNDOS = 2
+
+# Libro de stock (inventario.ledger): antigüedad del corte de cada snapshot
+# (crear las tablas con: python manage.py stock_ledger)
+STOCK_SNAPSHOT_LAG_SEGUNDOS = 60
+
+# Métricas de base de datos por request (core.dbtiming): Server-Timing,
+# histogramas en /api/db/stats/ y log de consultas de más de DB_SLOW_QUERY_MS
+DB_TIMING = True
+DB_SLOW_QUERY_MS = 200
+
+# Reportes en segundo plano (reportes.jobs): archivos generados, hilos por
+# proceso y segundos que un resultado se reutiliza
+# (crear la tabla REPORTES_JOBS con: python manage.py reportes_jobs)
+REPORTES_JOBS_DIR = BASE_DIR / 'reportes_jobs'
+REPORTES_JOBS_WORKERS = 2
+REPORTES_JOBS_TTL = 3600
+
+# Historial archivado (core.archivo): directorio de los archivos columnares y
+# meses recientes, además del actual, que se quedan en la base
+# (archivar con: python manage.py archivar_historial)
+ARCHIVO_DIR = BASE_DIR / 'archivo'
+ARCHIVO_MESES_ACTIVOS = 24
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -130,9 +210,27 @@ STATIC_URL = 'static/'
 STATICFILES_DIRS = [
     BASE_DIR / "static",
 ]
+STATIC_ROOT = BASE_DIR / 'staticfiles'
+
+# collectstatic publica cada archivo con el hash de su contenido en el nombre
+# (staticfiles.json); sin DEBUG, {% static %} devuelve esos nombres
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.ManifestStaticFilesStorage'},
+}
 
-# Cache busting para desarrollo
-STATIC_VERSION = '1.0'
+# Bundles de JS/CSS por página (core.bundles): con STATIC_BUNDLES las plantillas
+# cargan un bundle minificado con hash, servido con caché de STATIC_MAX_AGE
+# segundos; sin él, los archivos fuente con ?v=<mtime>
+# (generar con: python manage.py build_bundles)
+STATIC_BUNDLES = not DEBUG
+STATIC_BUNDLES_DIR = BASE_DIR / 'static' / 'bundles'
+STATIC_MAX_AGE = 365 * 24 * 3600
+
+# Sin DEBUG, servir STATIC_ROOT desde Django (core.views.static_inmutable) solo
+# como respaldo cuando no hay servidor web delante; en producción lo sirve el
+# servidor web (ver README, "Archivos estáticos en producción")
+STATIC_SERVIR_DJANGO = False
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
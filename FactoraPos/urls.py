@@ -1,5 +1,8 @@
+from django.conf import settings
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
+
+from core.views import static_inmutable
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -15,3 +18,10 @@ urlpatterns = [
     path('ventas/', include('ventas.urls')),
     path('config/', include('config.urls')),
 ]
+
+# Respaldo para despliegues sin servidor web delante: en producción STATIC_ROOT
+# lo sirve el servidor web (ver README, "Archivos estáticos en producción")
+if not settings.DEBUG and settings.STATIC_SERVIR_DJANGO:
+    urlpatterns += [
+        re_path(r'^%s(?P<path>.*)$' % settings.STATIC_URL.lstrip('/'), static_inmutable),
+    ]
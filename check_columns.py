@@ -1,9 +1,19 @@
-import oracledb
+"""
+Muestra las columnas de CLIENTES usando la conexión configurada en settings
+Ejecutar: python check_columns.py
+"""
+import os
 
-conn = oracledb.connect('FACTORA_POS/factorapass@localhost:1521/XEPDB1')
-cur = conn.cursor()
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'FactoraPos.settings')
+
+import django
+django.setup()
+
+from django.db import connection
+
+cur = connection.cursor()
 cur.execute("SELECT column_name FROM user_tab_columns WHERE table_name='CLIENTES'")
 print("Columnas de CLIENTES:")
 for r in cur.fetchall():
     print(f"  - {r[0]}")
-conn.close()
+cur.close()
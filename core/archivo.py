@@ -0,0 +1,283 @@
+"""
+Archivo del historial frío de ventas y movimientos.
+
+`manage.py archivar_historial` mueve los meses cerrados (anteriores a
+ARCHIVO_MESES_ACTIVOS) de las tablas calientes a archivos columnares
+comprimidos (core.columnar) en ARCHIVO_DIR, un archivo por tabla y mes:
+
+- familia `ventas`: VENTAS y DETALLE_VENTA (el detalle lleva la FECHA de su
+  venta como FECHA_VENTA, para filtrar sin cruzar tablas)
+- familia `movimientos`: MOVIMIENTOS_INVENTARIO
+
+Por cada mes: se escriben los archivos, se anota el mes en manifest.json (la
+frontera de la familia pasa al mes siguiente) y recién entonces se borran de
+la base, por lotes y por ID, las filas que quedaron en el archivo. Si el
+proceso se corta a mitad del borrado, la próxima ejecución lo completa.
+
+Lectura: desde que un mes está en el manifiesto se lee solo del archivo. Las
+consultas que piden fechas anteriores a la frontera (frontera() / incluye())
+agregan `FECHA >= frontera` a la parte caliente y completan con filas().
+"""
+import calendar
+import itertools
+import json
+import logging
+import os
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+from django.conf import settings
+from django.db import connection
+
+from core import columnar
+from core.ids import SECUENCIAS
+
+logger = logging.getLogger(__name__)
+
+ARCHIVO_DIR = str(getattr(settings, 'ARCHIVO_DIR', settings.BASE_DIR / 'archivo'))
+
+# Meses recientes (además del actual) que nunca se archivan
+ARCHIVO_MESES_ACTIVOS = getattr(settings, 'ARCHIVO_MESES_ACTIVOS', 24)
+
+# Filas borradas por transacción al sacar un mes de la base
+ARCHIVO_BORRADO_LOTE = 1000
+
+# Familia -> tablas en orden de escritura (el borrado va en orden inverso:
+# primero el detalle) con el SELECT del mes y la columna de fecha del archivo
+FAMILIAS = {
+    'ventas': [
+        ('VENTAS', """
+            SELECT v.* FROM VENTAS v
+            WHERE v.FECHA >= %s AND v.FECHA < %s
+            ORDER BY v.FECHA, v.ID_VENTA
+        """, 'FECHA'),
+        ('DETALLE_VENTA', """
+            SELECT d.*, v.FECHA AS FECHA_VENTA FROM DETALLE_VENTA d
+            JOIN VENTAS v ON d.ID_VENTA = v.ID_VENTA
+            WHERE v.FECHA >= %s AND v.FECHA < %s
+            ORDER BY v.FECHA, d.ID_VENTA, d.ID_DETALLE
+        """, 'FECHA_VENTA'),
+    ],
+    'movimientos': [
+        ('MOVIMIENTOS_INVENTARIO', """
+            SELECT m.* FROM MOVIMIENTOS_INVENTARIO m
+            WHERE m.FECHA >= %s AND m.FECHA < %s
+            ORDER BY m.FECHA, m.ID_MOV
+        """, 'FECHA'),
+    ],
+}
+
+FAMILIA_DE_TABLA = {tabla: familia for familia, tablas in FAMILIAS.items() for tabla, _, _ in tablas}
+
+
+def _ruta_manifiesto():
+    return os.path.join(ARCHIVO_DIR, 'manifest.json')
+
+
+def ruta_mes(tabla, mes):
+    return os.path.join(ARCHIVO_DIR, tabla, f'{mes:%Y-%m}.fcol')
+
+
+def mes_siguiente(mes):
+    dias = calendar.monthrange(mes.year, mes.month)[1]
+    return mes.replace(day=1) + timedelta(days=dias)
+
+
+# =============================================
+# Manifiesto (compartido por los workers del host)
+# =============================================
+
+_manifiesto = {'mtime': None, 'datos': {}}
+_lock = threading.Lock()
+
+
+def manifiesto():
+    """Contenido de manifest.json; se relee solo si cambió en disco"""
+    ruta = _ruta_manifiesto()
+    try:
+        mtime = os.stat(ruta).st_mtime_ns
+    except FileNotFoundError:
+        return {}
+    with _lock:
+        if _manifiesto['mtime'] != mtime:
+            with open(ruta, encoding='utf-8') as f:
+                _manifiesto['datos'] = json.load(f)
+            _manifiesto['mtime'] = mtime
+        return _manifiesto['datos']
+
+
+def _guardar_manifiesto(datos):
+    os.makedirs(ARCHIVO_DIR, exist_ok=True)
+    temporal = _ruta_manifiesto() + '.tmp'
+    with open(temporal, 'w', encoding='utf-8') as f:
+        json.dump(datos, f, indent=2, sort_keys=True)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporal, _ruta_manifiesto())
+
+
+def frontera(familia):
+    """Primer día que sigue en la base (todo lo anterior está archivado), o None"""
+    hasta = manifiesto().get(familia, {}).get('hasta')
+    return date.fromisoformat(hasta) if hasta else None
+
+
+def incluye(familia, desde):
+    """Frontera si una consulta desde `desde` (None = sin límite) necesita el archivo; si no, None"""
+    limite = frontera(familia)
+    if limite is None:
+        return None
+    if desde is not None and _como_datetime(desde) >= _como_datetime(limite):
+        return None
+    return limite
+
+
+def _como_datetime(valor):
+    return valor if isinstance(valor, datetime) else datetime(valor.year, valor.month, valor.day)
+
+
+# =============================================
+# Lectura
+# =============================================
+
+def meses(familia, desde=None, hasta=None):
+    """Meses archivados que se cruzan con [desde, hasta), como (inicio, fin) recortados al rango"""
+    desde = _como_datetime(desde) if desde is not None else None
+    hasta = _como_datetime(hasta) if hasta is not None else None
+    rangos = []
+    for nombre_mes in sorted(manifiesto().get(familia, {}).get('meses', {})):
+        inicio = datetime.strptime(nombre_mes, '%Y-%m')
+        fin = _como_datetime(mes_siguiente(inicio))
+        if (hasta is not None and inicio >= hasta) or (desde is not None and fin <= desde):
+            continue
+        rangos.append((max(inicio, desde) if desde else inicio, min(fin, hasta) if hasta else fin))
+    return rangos
+
+
+def filas(tabla, desde=None, hasta=None, columnas=None):
+    """Dicts (claves en minúscula) de las filas archivadas de `tabla` con
+    desde <= fecha < hasta, en orden de fecha"""
+    columnas = [c.upper() for c in columnas] if columnas else None
+    for inicio, fin in meses(FAMILIA_DE_TABLA[tabla], desde, hasta):
+        with columnar.Lector(ruta_mes(tabla, inicio)) as lector:
+            nombres = [c.lower() for c in (columnas or lector.columnas)]
+            for fila in lector.leer(inicio, fin, columnas):
+                yield dict(zip(nombres, fila))
+
+
+def filas_recientes(tabla, desde=None, hasta=None, columnas=None):
+    """Como filas(), pero de la más reciente a la más antigua (para listados
+    ORDER BY FECHA DESC); se tiene en memoria un mes por vez"""
+    columnas = [c.upper() for c in columnas] if columnas else None
+    for inicio, fin in reversed(meses(FAMILIA_DE_TABLA[tabla], desde, hasta)):
+        with columnar.Lector(ruta_mes(tabla, inicio)) as lector:
+            nombres_columnas = [c.lower() for c in (columnas or lector.columnas)]
+            mes = list(lector.leer(inicio, fin, columnas))
+        for fila in reversed(mes):
+            yield dict(zip(nombres_columnas, fila))
+
+
+def con_nombres(filas_archivadas, tabla, clave, columna, lote=1000):
+    """Agrega a cada dict `columna` con el NOMBRE de `tabla` para su `clave`,
+    buscando los nombres en la base de a `lote` filas"""
+    filas_archivadas = iter(filas_archivadas)
+    while True:
+        parte = list(itertools.islice(filas_archivadas, lote))
+        if not parte:
+            return
+        with connection.cursor() as cursor:
+            encontrados = nombres(cursor, tabla, (f[clave] for f in parte))
+        for fila in parte:
+            fila[columna] = encontrados.get(fila[clave])
+            yield fila
+
+
+def nombres(cursor, tabla, ids):
+    """{id: NOMBRE} de las filas de `tabla` (PRODUCTOS, USUARIOS, ...) con esos IDs"""
+    columna_id = SECUENCIAS[tabla][0]
+    ids = sorted({i for i in ids if i is not None})
+    resultado = {}
+    for inicio in range(0, len(ids), 1000):
+        lote = ids[inicio:inicio + 1000]
+        cursor.execute(
+            f"SELECT {columna_id}, NOMBRE FROM {tabla} WHERE {columna_id} IN ({', '.join(['%s'] * len(lote))})",
+            lote
+        )
+        resultado.update(cursor.fetchall())
+    return resultado
+
+
+# =============================================
+# Escritura
+# =============================================
+
+def meses_pendientes(cursor, familia, hasta):
+    """Meses con filas en la base anteriores a `hasta` (primer día de un mes)"""
+    tabla = FAMILIAS[familia][0][0]
+    cursor.execute(f"SELECT MIN(FECHA) FROM {tabla} WHERE FECHA < %s", [hasta])
+    primera = cursor.fetchone()[0]
+    pendientes = []
+    mes = date(primera.year, primera.month, 1) if primera else hasta
+    inicio = frontera(familia)
+    if inicio and inicio > mes:
+        # Filas con fecha ya archivada que llegaron después: no se mezclan con el archivo
+        logger.warning('%s tiene filas anteriores a la frontera del archivo (%s)', tabla, inicio)
+        mes = inicio
+    while mes < hasta:
+        pendientes.append(mes)
+        mes = mes_siguiente(mes)
+    return pendientes
+
+
+def _leer_mes(cursor, sql, mes):
+    desde = datetime(mes.year, mes.month, 1)
+    cursor.execute(sql, [desde, _como_datetime(mes_siguiente(mes))])
+    columnas = [col[0] for col in cursor.description]
+    return columnas, cursor.fetchall()
+
+
+def archivar_mes(connection, familia, mes, pausa=0.05):
+    """Archiva un mes de la familia y lo borra de la base; devuelve filas por tabla
+
+    Un mes ya anotado en el manifiesto no se reescribe: solo se completa su
+    borrado (el archivo es la copia buena; la base pudo quedar a medias).
+    """
+    nombre_mes = f'{mes:%Y-%m}'
+    datos = manifiesto()
+    estado = datos.get(familia, {}).get('meses', {}).get(nombre_mes)
+
+    if estado is None:
+        estado = {'borrado': False, 'filas': {}}
+        with connection.cursor() as cursor:
+            for tabla, sql, orden in FAMILIAS[familia]:
+                columnas, filas_mes = _leer_mes(cursor, sql, mes)
+                os.makedirs(os.path.dirname(ruta_mes(tabla, mes)), exist_ok=True)
+                estado['filas'][tabla] = columnar.escribir(ruta_mes(tabla, mes), columnas, filas_mes, orden)
+        datos = json.loads(json.dumps(datos))
+        familia_datos = datos.setdefault(familia, {'meses': {}})
+        familia_datos['meses'][nombre_mes] = estado
+        familia_datos['hasta'] = max(familia_datos.get('hasta') or '', mes_siguiente(mes).isoformat())
+        _guardar_manifiesto(datos)
+
+    if not estado['borrado']:
+        for tabla, _, _ in reversed(FAMILIAS[familia]):
+            _borrar_archivadas(connection, tabla, mes, pausa)
+        datos = json.loads(json.dumps(manifiesto()))
+        datos[familia]['meses'][nombre_mes]['borrado'] = True
+        _guardar_manifiesto(datos)
+    return estado['filas']
+
+
+def _borrar_archivadas(connection, tabla, mes, pausa):
+    """Borra de la base, por ID y en lotes, las filas que están en el archivo del mes"""
+    columna_id = SECUENCIAS[tabla][0]
+    with columnar.Lector(ruta_mes(tabla, mes)) as lector:
+        ids = [fila[0] for fila in lector.leer(columnas=[columna_id])]
+    with connection.cursor() as cursor:
+        for inicio in range(0, len(ids), ARCHIVO_BORRADO_LOTE):
+            lote = ids[inicio:inicio + ARCHIVO_BORRADO_LOTE]
+            cursor.execute(
+                f"DELETE FROM {tabla} WHERE {columna_id} IN ({', '.join(['%s'] * len(lote))})", lote
+            )
+            time.sleep(pausa)
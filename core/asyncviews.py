@@ -0,0 +1,57 @@
+"""
+Versiones async de las vistas de lectura para servir con ASGI.
+
+El backend Oracle de Django es síncrono, así que cada llamada se ejecuta en un
+pool de hilos propio (ASYNC_DB_THREADS, por defecto el `max` del pool de
+sesiones) mientras el event loop sigue atendiendo otros terminales. Al
+terminar, el hilo devuelve su conexión al pool: con ASGI las señales de fin de
+request no cierran las conexiones abiertas en hilos del executor.
+"""
+import asyncio
+import contextvars
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connections
+from django.http import JsonResponse
+
+ASYNC_DB_THREADS = getattr(
+    settings, 'ASYNC_DB_THREADS', getattr(settings, 'DB_POOL', {}).get('max', 10)
+)
+
+_executor = ThreadPoolExecutor(max_workers=ASYNC_DB_THREADS, thread_name_prefix='async-db')
+
+
+def _run_and_release(func, *args, **kwargs):
+    try:
+        return func(*args, **kwargs)
+    finally:
+        connections.close_all()
+
+
+async def run_in_db_thread(func, *args, **kwargs):
+    """Ejecuta `func` en el pool de hilos de BD y devuelve su conexión al terminar
+
+    El hilo corre con una copia del contexto actual, así la medición de
+    core.dbtiming del request sigue activa dentro de la vista.
+    """
+    loop = asyncio.get_running_loop()
+    contexto = contextvars.copy_context()
+    return await loop.run_in_executor(
+        _executor, functools.partial(contexto.run, _run_and_release, func, *args, **kwargs)
+    )
+
+
+def async_view(view):
+    """Envuelve una vista síncrona de lectura como vista async"""
+    @functools.wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if 'stream' in request.GET:
+            # El cursor del streaming vive en el hilo que ya devolvió su conexión
+            return JsonResponse({
+                'success': False,
+                'error': 'stream no está disponible en las rutas async; use la ruta síncrona'
+            }, status=400)
+        return await run_in_db_thread(view, request, *args, **kwargs)
+    return wrapper
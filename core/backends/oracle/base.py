@@ -0,0 +1,41 @@
+"""
+Backend Oracle de Django con métricas del pool de sesiones y de consultas.
+
+Igual que django.db.backends.oracle, pero mide cuánto tarda cada worker en
+obtener una conexión (espera en el pool o apertura de sesión) y, si el pool
+define wait_timeout, usa POOL_GETMODE_TIMEDWAIT para no esperar sin límite.
+Las métricas se consultan con core.dbpool.pool_stats().
+
+Los cursores se envuelven con core.dbtiming para medir consultas, filas y
+tiempo de base de datos por request.
+"""
+import time
+
+from django.db.backends.oracle import base as oracle_base
+from django.db.backends.oracle.base import Database
+
+from core.dbpool import record_acquire
+from core.dbtiming import TimedCursorDebugWrapper, TimedCursorWrapper
+
+
+class DatabaseWrapper(oracle_base.DatabaseWrapper):
+
+    def get_connection_params(self):
+        conn_params = super().get_connection_params()
+        pool = conn_params.get('pool')
+        if isinstance(pool, dict) and 'wait_timeout' in pool and 'getmode' not in pool:
+            conn_params['pool'] = {**pool, 'getmode': Database.POOL_GETMODE_TIMEDWAIT}
+        return conn_params
+
+    def get_new_connection(self, conn_params):
+        inicio = time.perf_counter()
+        try:
+            return super().get_new_connection(conn_params)
+        finally:
+            record_acquire(self.alias, time.perf_counter() - inicio)
+
+    def make_cursor(self, cursor):
+        return TimedCursorWrapper(cursor, self)
+
+    def make_debug_cursor(self, cursor):
+        return TimedCursorDebugWrapper(cursor, self)
@@ -0,0 +1,85 @@
+"""
+Utilidades comunes de los benchmarks HTTP (bench_async, bench_api).
+
+Los requests salen con urllib desde un pool de hilos contra un servidor en
+marcha; las latencias se miden de punta a punta (incluye serializar y leer el
+body completo).
+"""
+import json
+import statistics
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+
+def percentil(valores, p):
+    """Percentil `p` (0-100) por rango más cercano; None si no hay valores"""
+    if not valores:
+        return None
+    valores = sorted(valores)
+    return valores[min(len(valores) - 1, int(len(valores) * p / 100))]
+
+
+def peticion(url, method='GET', body=None, timeout=60):
+    """Ejecuta un request; devuelve (segundos, status HTTP, body JSON o None)
+
+    status es 0 si no hubo respuesta (timeout, conexión rechazada).
+    """
+    data = json.dumps(body).encode() if body is not None else None
+    request = urllib.request.Request(url, data=data, method=method)
+    if data is not None:
+        request.add_header('Content-Type', 'application/json')
+    inicio = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            contenido = response.read()
+            status = response.status
+    except urllib.error.HTTPError as e:
+        contenido = e.read()
+        status = e.code
+    except Exception:
+        return time.perf_counter() - inicio, 0, None
+    segundos = time.perf_counter() - inicio
+    try:
+        return segundos, status, json.loads(contenido)
+    except ValueError:
+        return segundos, status, None
+
+
+def _ms(segundos):
+    return round(segundos * 1000, 2) if segundos is not None else None
+
+
+def medir(funciones, concurrency):
+    """Ejecuta `funciones` (callables sin argumentos que devuelven el resultado
+    de `peticion`) con `concurrency` hilos y resume throughput y latencias.
+
+    Un request cuenta como error si no hubo respuesta o el status es >= 400.
+    """
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        resultados = list(pool.map(lambda f: f(), funciones))
+    duracion = time.perf_counter() - inicio
+    latencias = [s for s, status, _ in resultados if 0 < status < 400]
+    return {
+        'requests': len(resultados),
+        'errores': len(resultados) - len(latencias),
+        'segundos': round(duracion, 3),
+        'req_s': round(len(latencias) / duracion, 1) if duracion else 0,
+        'p50_ms': _ms(percentil(latencias, 50)),
+        'p95_ms': _ms(percentil(latencias, 95)),
+        'p99_ms': _ms(percentil(latencias, 99)),
+        'media_ms': _ms(statistics.mean(latencias)) if latencias else None,
+        'max_ms': _ms(max(latencias)) if latencias else None,
+    }
+
+
+# Datos sintéticos (seed_bench / bench_api): todo lo generado lleva este prefijo
+# en NOMBRE para poder borrarlo con `seed_bench --limpiar`
+BENCH_PREFIJO = 'BENCH-'
+BENCH_USUARIO = 'bench'
+
+# Escala -> filas base: N productos, N ventas (~3 líneas c/u), N movimientos,
+# N/5 clientes y N/1000 proveedores
+ESCALAS = {'10k': 10_000, '100k': 100_000, '1m': 1_000_000}
@@ -0,0 +1,344 @@
+"""
+Bundles de JS y CSS por página.
+
+`manage.py build_bundles` concatena y minifica los archivos de cada página en
+STATIC_BUNDLES_DIR (static/bundles/<página>.js|.css) y corre collectstatic:
+ManifestStaticFilesStorage los copia a STATIC_ROOT con el hash del contenido
+en el nombre (bundles/inventario.3f2a9c1e.js) y los anota en staticfiles.json.
+Como un cambio en el contenido cambia el nombre, se sirven con caché de un año:
+en producción desde el servidor web (README) y, como respaldo,
+core.views.static_inmutable con STATIC_SERVIR_DJANGO.
+
+Las plantillas usan `{% bundle 'inventario' 'js' %}` (core.templatetags.bundles):
+con STATIC_BUNDLES un solo tag al bundle con hash; sin él (desarrollo), un tag
+por archivo fuente con ?v=<mtime> para que el navegador tome cada cambio.
+
+La minificación es conservadora: quita comentarios y sangrías y colapsa
+espacios fuera de cadenas, plantillas y expresiones regulares, sin renombrar
+nada. Los saltos de línea del JS se mantienen (inserción automática de ';').
+"""
+import os
+import re
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+
+STATIC_BUNDLES_DIR = str(getattr(settings, 'STATIC_BUNDLES_DIR', settings.BASE_DIR / 'static' / 'bundles'))
+
+# Subdirectorio de STATIC_URL donde quedan los bundles
+PREFIJO = 'bundles'
+
+# Página -> archivos en el orden en que las plantillas los cargaban
+BUNDLES = {
+    'index': {
+        'css': ['css/index.css'],
+        'js': ['js/index.js'],
+    },
+    'dashboard': {
+        'css': ['css/dashboard.css'],
+        'js': ['js/auth.js', 'js/notifications.js', 'js/dashboard.js'],
+    },
+    'inventario': {
+        'css': ['css/shared.css', 'css/Inventario.css'],
+        'js': ['js/auth.js', 'js/notifications.js', 'js/Inventario.js'],
+    },
+    'movimientos': {
+        'css': ['css/shared.css', 'css/Movimientos.css'],
+        'js': ['js/auth.js', 'js/notifications.js', 'js/Movimiento.js'],
+    },
+    'proveedores': {
+        'css': ['css/shared.css', 'css/Proveedores.css'],
+        'js': ['js/auth.js', 'js/Proveedores.js'],
+    },
+    'punto_de_venta': {
+        'css': ['css/shared.css', 'css/PuntoDeVenta.css'],
+        'js': ['js/auth.js', 'js/PuntoDeVenta.js'],
+    },
+    'clientes': {
+        'css': ['css/shared.css', 'css/Clientes.css'],
+        'js': ['js/auth.js', 'js/Clientes.js'],
+    },
+    'compras': {
+        'css': ['css/shared.css'],
+        'js': [],
+    },
+    'rma': {
+        'css': ['css/shared.css', 'css/RMA.css'],
+        'js': ['js/auth.js', 'js/notifications.js', 'js/RMA.js'],
+    },
+    'reportes': {
+        'css': ['css/reportes.css'],
+        'js': ['js/auth.js', 'js/notifications.js', 'js/reportes_v2.js'],
+    },
+    'usuarios': {
+        'css': ['css/shared.css', 'css/usuarios.css'],
+        'js': ['js/auth.js', 'js/usuarios.js'],
+    },
+    'usuarios_config': {
+        'css': ['css/shared.css'],
+        'js': ['js/auth.js'],
+    },
+    'config': {
+        'css': ['css/config.css'],
+        'js': ['js/auth.js', 'js/config.js'],
+    },
+}
+
+TIPOS = ('js', 'css')
+
+
+class BundleError(Exception):
+    """Bundle o archivo fuente inexistente"""
+
+
+def nombre_bundle(pagina, tipo):
+    """Ruta estática del bundle (relativa a STATIC_URL)"""
+    return f'{PREFIJO}/{pagina}.{tipo}'
+
+
+def fuentes(pagina, tipo):
+    if pagina not in BUNDLES or tipo not in TIPOS:
+        raise BundleError(f'bundle desconocido: {pagina}.{tipo}')
+    return BUNDLES[pagina][tipo]
+
+
+def _ruta_fuente(nombre):
+    ruta = finders.find(nombre)
+    if ruta is None:
+        raise BundleError(f'{nombre} no está en STATICFILES_DIRS')
+    return ruta
+
+
+def version_fuente(nombre):
+    """mtime del archivo fuente (para ?v= en desarrollo); '' si no se encuentra"""
+    ruta = finders.find(nombre)
+    return str(int(os.stat(ruta).st_mtime)) if ruta else ''
+
+
+# =============================================
+# Minificación
+# =============================================
+
+# Después de estos caracteres (o de estas palabras) un '/' empieza una regex, no una división
+_ANTES_DE_REGEX = set('(,=:[!&|?{};+-*%<>~^\n')
+_PALABRAS_ANTES_DE_REGEX = ('return', 'typeof', 'instanceof', 'in', 'of', 'new', 'delete', 'void',
+                            'throw', 'case', 'do', 'else', 'yield', 'await')
+
+
+def _fin_cadena(codigo, i):
+    """Índice siguiente al cierre de la cadena '...' o "..." que empieza en i"""
+    comilla = codigo[i]
+    i += 1
+    while i < len(codigo):
+        c = codigo[i]
+        if c == '\\':
+            i += 2
+            continue
+        if c == comilla or c == '\n':
+            return i + 1
+        i += 1
+    return i
+
+
+def _fin_regex(codigo, i):
+    i += 1
+    en_clase = False
+    while i < len(codigo):
+        c = codigo[i]
+        if c == '\\':
+            i += 2
+            continue
+        if c == '\n':
+            return i
+        if en_clase:
+            en_clase = c != ']'
+        elif c == '[':
+            en_clase = True
+        elif c == '/':
+            i += 1
+            while i < len(codigo) and (codigo[i].isalnum() or codigo[i] == '_'):
+                i += 1
+            return i
+        i += 1
+    return i
+
+
+def _fin_plantilla(codigo, i):
+    """Índice siguiente al cierre del template literal `...` (con ${...} anidados)"""
+    i += 1
+    while i < len(codigo):
+        c = codigo[i]
+        if c == '\\':
+            i += 2
+            continue
+        if c == '`':
+            return i + 1
+        if codigo.startswith('${', i):
+            i = _fin_expresion(codigo, i + 2)
+            continue
+        i += 1
+    return i
+
+
+def _fin_expresion(codigo, i):
+    """Índice siguiente a la '}' que cierra una expresión ${...}"""
+    nivel = 1
+    while i < len(codigo):
+        c = codigo[i]
+        if c in '\'"':
+            i = _fin_cadena(codigo, i)
+            continue
+        if c == '`':
+            i = _fin_plantilla(codigo, i)
+            continue
+        if c == '{':
+            nivel += 1
+        elif c == '}':
+            nivel -= 1
+            if nivel == 0:
+                return i + 1
+        i += 1
+    return i
+
+
+_PALABRA = re.compile(r'[\w$\u0080-\uffff]+')
+
+
+def _es_palabra(c):
+    return c.isalnum() or c in '_$' or ord(c) > 127
+
+
+def _empieza_regex(previo):
+    if not previo or previo[-1] in _ANTES_DE_REGEX:
+        return True
+    return previo in _PALABRAS_ANTES_DE_REGEX
+
+
+def minificar_js(codigo):
+    """Quita comentarios, sangrías y espacios innecesarios; conserva los saltos de línea"""
+    salida = []
+    separador = ''  # espacio o salto pendiente antes del próximo token
+    i = 0
+    n = len(codigo)
+    while i < n:
+        c = codigo[i]
+        if c == '\n':
+            separador = '\n'
+            i += 1
+            continue
+        if c in ' \t\r\f\v':
+            separador = separador or ' '
+            i += 1
+            continue
+        if codigo.startswith('//', i):
+            fin = codigo.find('\n', i)
+            i = n if fin < 0 else fin
+            continue
+        if codigo.startswith('/*', i):
+            fin = codigo.find('*/', i + 2)
+            fin = n if fin < 0 else fin + 2
+            # Un comentario multilínea cuenta como salto de línea para la inserción de ';'
+            separador = '\n' if '\n' in codigo[i:fin] else (separador or ' ')
+            i = fin
+            continue
+
+        previo = salida[-1] if salida else ''
+        if c in '\'"':
+            fin = _fin_cadena(codigo, i)
+        elif c == '`':
+            fin = _fin_plantilla(codigo, i)
+        elif c == '/' and _empieza_regex(previo):
+            fin = _fin_regex(codigo, i)
+        else:
+            palabra = _PALABRA.match(codigo, i)
+            fin = palabra.end() if palabra else i + 1
+
+        if separador == '\n' and salida:
+            salida.append('\n')
+        elif separador and previo and (
+            (_es_palabra(previo[-1]) and _es_palabra(c)) or (previo[-1] in '+-/' and c == previo[-1])
+        ):
+            salida.append(' ')
+        separador = ''
+        salida.append(codigo[i:fin])
+        i = fin
+    return ''.join(salida) + '\n'
+
+
+_CSS_IMPORT = re.compile(r'''@import\s+(?:url\()?\s*['"]?([^'")\s]+)['"]?\s*\)?\s*;''')
+_CSS_TOKENS = re.compile(r'''("(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*'|/\*.*?\*/)''', re.S)
+
+
+def _compactar_css(texto):
+    texto = re.sub(r'\s+', ' ', texto)
+    # Después de ':' el espacio sobra; antes no (`a :hover` no es `a:hover`)
+    return re.sub(r' ?([{};,]) ?', r'\1', texto).replace(': ', ':').replace(';}', '}')
+
+
+def minificar_css(codigo):
+    """Quita comentarios y colapsa espacios (sin tocar el contenido de las cadenas)"""
+    partes = []
+    fuera = []
+    for parte in _CSS_TOKENS.split(codigo):
+        if parte.startswith('/*'):
+            fuera.append(' ')
+        elif parte[:1] in ('"', "'"):
+            partes.append(_compactar_css(''.join(fuera)))
+            partes.append(parte)
+            fuera = []
+        else:
+            fuera.append(parte)
+    partes.append(_compactar_css(''.join(fuera)))
+    return ''.join(partes).strip() + '\n'
+
+
+def _css_con_imports(nombre, vistos):
+    """Contenido de un CSS con sus @import locales resueltos en línea"""
+    if nombre in vistos:
+        return ''
+    vistos.add(nombre)
+    with open(_ruta_fuente(nombre), encoding='utf-8') as f:
+        contenido = f.read()
+
+    def importar(m):
+        destino = m.group(1)
+        if '//' in destino:
+            return m.group(0)
+        return _css_con_imports(os.path.normpath(os.path.join(os.path.dirname(nombre), destino)).replace(os.sep, '/'), vistos)
+
+    return _CSS_IMPORT.sub(importar, contenido)
+
+
+# =============================================
+# Construcción
+# =============================================
+
+def construir(pagina, tipo):
+    """Concatena y minifica un bundle; devuelve el contenido"""
+    if tipo == 'css':
+        vistos = set()
+        return ''.join(minificar_css(_css_con_imports(nombre, vistos)) for nombre in fuentes(pagina, tipo))
+    partes = []
+    for nombre in fuentes(pagina, tipo):
+        with open(_ruta_fuente(nombre), encoding='utf-8') as f:
+            # El ';' separa archivos que no terminan en punto y coma
+            partes.append(';' + minificar_js(f.read()))
+    return ''.join(partes)
+
+
+def escribir_bundles(paginas=None):
+    """Escribe los bundles en STATIC_BUNDLES_DIR; devuelve [(nombre, bytes fuente, bytes bundle)]"""
+    os.makedirs(STATIC_BUNDLES_DIR, exist_ok=True)
+    resultado = []
+    for pagina in paginas or BUNDLES:
+        for tipo in TIPOS:
+            if not fuentes(pagina, tipo):
+                continue
+            contenido = construir(pagina, tipo).encode('utf-8')
+            original = sum(os.path.getsize(_ruta_fuente(n)) for n in fuentes(pagina, tipo))
+            ruta = os.path.join(STATIC_BUNDLES_DIR, f'{pagina}.{tipo}')
+            with open(ruta + '.tmp', 'wb') as f:
+                f.write(contenido)
+            os.replace(ruta + '.tmp', ruta)
+            resultado.append((nombre_bundle(pagina, tipo), original, len(contenido)))
+    return resultado
@@ -0,0 +1,254 @@
+"""
+Cache de lectura para los listados de catálogo (productos, proveedores,
+clientes, usuarios) sobre el framework de cache de Django.
+
+Cada tabla tiene un número de versión; la clave de una respuesta incluye las
+versiones de todas las tablas que lee, así que invalidar una tabla es solo
+incrementar su versión (las entradas viejas expiran solas). La misma clave
+sirve de ETag para responder 304 a If-None-Match.
+
+Las versiones viven en la base (tabla VERSIONES_TABLAS, creada con `manage.py
+setup_cache_versions`): todos los workers y los comandos de gestión ven el
+mismo valor, y cada proceso lo reutiliza a lo sumo CATALOG_VERSION_TTL
+segundos. Sin esa tabla se guardan en el cache de Django con vida
+CATALOG_CACHE_TIMEOUT: con un backend local por proceso, un worker que no
+hizo la escritura puede entregar datos viejos hasta que la versión expira.
+El backend se elige con CATALOG_CACHE (alias de settings.CACHES).
+"""
+import hashlib
+import os
+import threading
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import IntegrityError, connection, transaction
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags
+
+from core.schema import registry
+
+CATALOG_CACHE = getattr(settings, 'CATALOG_CACHE', 'default')
+CATALOG_CACHE_TIMEOUT = getattr(settings, 'CATALOG_CACHE_TIMEOUT', 300)
+
+# Segundos que un proceso reutiliza las versiones leídas de VERSIONES_TABLAS
+CATALOG_VERSION_TTL = getattr(settings, 'CATALOG_VERSION_TTL', 1)
+
+DDL_VERSIONES = [
+    """
+    CREATE TABLE VERSIONES_TABLAS (
+        TABLA VARCHAR2(60) PRIMARY KEY,
+        VERSION NUMBER NOT NULL
+    )
+    """,
+]
+
+# La primera versión parte del reloj: si la tabla se recrea no se repiten ETags
+MERGE_VERSION_SQL = """
+    MERGE INTO VERSIONES_TABLAS v
+    USING (SELECT %s AS TABLA, %s AS INICIAL FROM DUAL) s
+    ON (v.TABLA = s.TABLA)
+    WHEN MATCHED THEN UPDATE SET v.VERSION = v.VERSION + 1
+    WHEN NOT MATCHED THEN INSERT (TABLA, VERSION) VALUES (s.TABLA, s.INICIAL)
+"""
+
+_stats = {'vistas': {}, 'invalidaciones': {}}
+_stats_lock = threading.Lock()
+
+# Versiones leídas de la base en este proceso: {tabla: (vence, version)}
+_versiones = {}
+_versiones_lock = threading.Lock()
+
+
+def _cache():
+    return caches[CATALOG_CACHE]
+
+
+def _version_key(tabla):
+    return f'catalogo:version:{tabla}'
+
+
+def _count_lookup(vista, campo):
+    with _stats_lock:
+        entry = _stats['vistas'].setdefault(vista, {'hits': 0, 'misses': 0})
+        entry[campo] += 1
+
+
+def _nueva_version():
+    # Basada en el reloj: si el backend descarta una clave de versión, la
+    # siguiente no repite un valor anterior (ni un ETag ya entregado)
+    return time.time_ns()
+
+
+def _versiones_en_base(cursor):
+    return bool(registry.columns(cursor, 'VERSIONES_TABLAS'))
+
+
+def _leer_versiones(cursor, tablas):
+    ahora = time.monotonic()
+    with _versiones_lock:
+        vigentes = {t: _versiones[t][1] for t in tablas if t in _versiones and _versiones[t][0] > ahora}
+    faltan = [t for t in tablas if t not in vigentes]
+    if faltan:
+        cursor.execute(
+            f"SELECT TABLA, VERSION FROM VERSIONES_TABLAS WHERE TABLA IN ({', '.join(['%s'] * len(faltan))})",
+            faltan
+        )
+        leidas = dict(cursor.fetchall())
+        with _versiones_lock:
+            for tabla in faltan:
+                # Sin fila: la tabla todavía no se invalidó nunca
+                vigentes[tabla] = leidas.get(tabla, 0)
+                _versiones[tabla] = (ahora + CATALOG_VERSION_TTL, vigentes[tabla])
+    return [vigentes[t] for t in tablas]
+
+
+def table_versions(*tablas):
+    """Versión actual de cada tabla (de VERSIONES_TABLAS o, sin ella, del cache)"""
+    with connection.cursor() as cursor:
+        if _versiones_en_base(cursor):
+            return _leer_versiones(cursor, tablas)
+
+    cache = _cache()
+    keys = [_version_key(t) for t in tablas]
+    versiones = cache.get_many(keys)
+    for key in keys:
+        if key not in versiones:
+            cache.add(key, _nueva_version(), CATALOG_CACHE_TIMEOUT)
+            versiones[key] = cache.get(key)
+    return [versiones[key] for key in keys]
+
+
+def _incrementar(cursor, tabla):
+    try:
+        with transaction.atomic():
+            cursor.execute(MERGE_VERSION_SQL, [tabla, _nueva_version()])
+    except IntegrityError:
+        # Otra sesión insertó la fila a la vez: ahora existe y el MERGE la actualiza
+        with transaction.atomic():
+            cursor.execute(MERGE_VERSION_SQL, [tabla, _nueva_version()])
+
+
+def invalidate(*tablas):
+    """Invalida las respuestas cacheadas que leen alguna de estas tablas"""
+    with connection.cursor() as cursor:
+        en_base = _versiones_en_base(cursor)
+        if en_base:
+            for tabla in tablas:
+                _incrementar(cursor, tabla)
+    cache = _cache()
+    for tabla in tablas:
+        if en_base:
+            with _versiones_lock:
+                _versiones.pop(tabla, None)
+        else:
+            try:
+                cache.incr(_version_key(tabla))
+                cache.touch(_version_key(tabla), CATALOG_CACHE_TIMEOUT)
+            except ValueError:
+                cache.set(_version_key(tabla), _nueva_version(), CATALOG_CACHE_TIMEOUT)
+        with _stats_lock:
+            invalidaciones = _stats['invalidaciones']
+            invalidaciones[tabla] = invalidaciones.get(tabla, 0) + 1
+
+
+def invalidate_on_commit(*tablas):
+    """Invalida cuando la transacción actual confirme (inmediato en autocommit)"""
+    transaction.on_commit(lambda: invalidate(*tablas))
+
+
+def _list_key(request, view, tablas):
+    """Clave (y ETag) de una respuesta: vista + versiones de tablas + query string"""
+    query = '&'.join(sorted(request.GET.urlencode().split('&')))
+    versiones = '.'.join(str(v) for v in table_versions(*tablas))
+    digest = hashlib.md5(f'{request.path}?{query}|{versiones}'.encode()).hexdigest()
+    return f'catalogo:{view.__name__}:{digest}', f'"{digest}"'
+
+
+def _not_modified(request, etag):
+    # GZipMiddleware debilita el ETag (W/"..."); la comparación es débil
+    etags = parse_etags(request.META.get('HTTP_IF_NONE_MATCH', ''))
+    return '*' in etags or any(e.removeprefix('W/') == etag for e in etags)
+
+
+def _with_validators(response, etag):
+    if response.status_code == 200:
+        response['ETag'] = etag
+        # El navegador puede guardar la respuesta pero debe revalidarla siempre
+        patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def conditional_list(*tablas):
+    """Decorador para listados GET: ETag según las versiones de `tablas`
+
+    Responde 304 a If-None-Match sin tocar la base de datos. No guarda el
+    cuerpo (para historiales grandes); cached_list además lo cachea.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method != 'GET':
+                return view(request, *args, **kwargs)
+            _, etag = _list_key(request, view, tablas)
+            if _not_modified(request, etag):
+                return HttpResponseNotModified(headers={'ETag': etag})
+            return _with_validators(view(request, *args, **kwargs), etag)
+        return wrapper
+    return decorator
+
+
+def cached_list(*tablas):
+    """Decorador para vistas GET que devuelven JSON leído de `tablas`
+
+    Cachea el cuerpo de la respuesta y, como conditional_list, entrega ETag y
+    responde 304 cuando el cliente ya tiene la versión vigente.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method != 'GET':
+                return view(request, *args, **kwargs)
+
+            key, etag = _list_key(request, view, tablas)
+            if _not_modified(request, etag):
+                _count_lookup(view.__name__, 'hits')
+                return HttpResponseNotModified(headers={'ETag': etag})
+
+            cache = _cache()
+            content = cache.get(key)
+            if content is not None:
+                _count_lookup(view.__name__, 'hits')
+                response = HttpResponse(content, content_type='application/json')
+                return _with_validators(response, etag)
+
+            _count_lookup(view.__name__, 'misses')
+            response = view(request, *args, **kwargs)
+            if response.status_code == 200 and not response.streaming:
+                cache.set(key, response.content, CATALOG_CACHE_TIMEOUT)
+            return _with_validators(response, etag)
+        return wrapper
+    return decorator
+
+
+def cache_stats():
+    """Contadores de hits/misses/invalidaciones de este proceso"""
+    with _stats_lock:
+        vistas = {vista: dict(valores) for vista, valores in _stats['vistas'].items()}
+        invalidaciones = dict(_stats['invalidaciones'])
+    with connection.cursor() as cursor:
+        origen = 'VERSIONES_TABLAS' if _versiones_en_base(cursor) else 'cache'
+    for valores in vistas.values():
+        consultas = valores['hits'] + valores['misses']
+        valores['hit_ratio'] = round(valores['hits'] / consultas, 3) if consultas else None
+    return {
+        'pid': os.getpid(),
+        'backend': settings.CACHES[CATALOG_CACHE]['BACKEND'],
+        'timeout': CATALOG_CACHE_TIMEOUT,
+        # 'cache' con un backend local: los workers no comparten invalidaciones
+        'versiones': origen,
+        'vistas': vistas,
+        'invalidaciones': invalidaciones,
+    }
@@ -0,0 +1,252 @@
+"""
+Archivos columnares de solo lectura para el historial archivado (core.archivo).
+
+Sin dependencias externas. Un archivo guarda una tabla (un mes) ordenada por
+su columna de fecha, en grupos de FILAS_POR_GRUPO filas; dentro de cada grupo
+cada columna es un bloque comprimido con zlib:
+
+    MAGIC | bloques ... | pie (JSON) | largo del pie (8 bytes LE) | MAGIC
+
+El pie trae el esquema (con la escala de las columnas decimales) y, por grupo, el offset/largo de cada bloque y el
+mínimo/máximo de la columna de orden. El lector mapea el archivo en memoria
+(mmap) y solo descomprime los grupos cuyo rango de fechas se cruza con el
+pedido, y de ellos solo las columnas que se leen.
+
+Tipos de columna:
+- i: enteros (int64; Decimal sin decimales también)
+- d: Decimal con decimales (montos): enteros int64 escalados por 10**escala,
+  con la escala de la columna en el pie; se leen como Decimal exactos. Si un
+  valor escalado no cabe en int64 la columna se guarda como texto (escala null)
+- n: float (float64)
+- t: fechas (int64, microsegundos desde 1970, sin zona horaria)
+- s: texto (largos int32 + UTF-8)
+"""
+import json
+import math
+import mmap
+import os
+import struct
+import sys
+import zlib
+from array import array
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+MAGIC = b'FPCOL1'
+
+FILAS_POR_GRUPO = 50_000
+
+_NULO_INT = -2 ** 63
+_MAX_INT = 2 ** 63 - 1
+_EPOCA = datetime(1970, 1, 1)
+_LARGO_PIE = struct.Struct('<Q')
+
+
+def _tipo(valores):
+    """Tipo de columna según los valores (los None no cuentan)"""
+    tipo = None
+    for valor in valores:
+        if valor is None:
+            continue
+        if isinstance(valor, (datetime, date)):
+            actual = 't'
+        elif isinstance(valor, bool) or (isinstance(valor, int)):
+            actual = 'i'
+        elif isinstance(valor, Decimal):
+            if not valor.is_finite():
+                return 's'
+            actual = 'i' if valor == valor.to_integral_value() else 'd'
+        elif isinstance(valor, float):
+            actual = 'n'
+        else:
+            return 's'
+        if tipo is None:
+            tipo = actual
+        elif tipo != actual:
+            numericos = {tipo, actual}
+            if not numericos <= {'i', 'd', 'n'}:
+                return 's'
+            # Con algún float la columna es float; si no, Decimal
+            tipo = 'n' if 'n' in numericos else 'd'
+    return tipo or 's'
+
+
+def _escala(valores):
+    """Decimales necesarios para guardar exactos los valores de una columna 'd'
+    (None si escalados no caben en int64: la columna va como texto)"""
+    escala = 0
+    for valor in valores:
+        if isinstance(valor, Decimal):
+            escala = max(escala, -valor.as_tuple().exponent)
+    for valor in valores:
+        if valor is not None and abs(int(Decimal(valor).scaleb(escala))) > _MAX_INT:
+            return None
+    return escala
+
+
+def _a_micros(valor):
+    if not isinstance(valor, datetime):
+        valor = datetime(valor.year, valor.month, valor.day)
+    return (valor.replace(tzinfo=None) - _EPOCA) // timedelta(microseconds=1)
+
+
+def _numeros(codigo, valores):
+    datos = array(codigo, valores)
+    if sys.byteorder == 'big':
+        datos.byteswap()
+    return datos.tobytes()
+
+
+def _desde_bytes(codigo, contenido):
+    datos = array(codigo)
+    datos.frombytes(contenido)
+    if sys.byteorder == 'big':
+        datos.byteswap()
+    return datos
+
+
+def _codificar(tipo, valores, escala=None):
+    if tipo == 'i':
+        return _numeros('q', [_NULO_INT if v is None else int(v) for v in valores])
+    if tipo == 'd' and escala is not None:
+        return _numeros('q', [_NULO_INT if v is None else int(Decimal(v).scaleb(escala)) for v in valores])
+    if tipo == 'n':
+        return _numeros('d', [math.nan if v is None else float(v) for v in valores])
+    if tipo == 't':
+        return _numeros('q', [_NULO_INT if v is None else _a_micros(v) for v in valores])
+    textos = [None if v is None else str(v).encode('utf-8') for v in valores]
+    largos = _numeros('i', [-1 if t is None else len(t) for t in textos])
+    return largos + b''.join(t for t in textos if t)
+
+
+def _decodificar(tipo, contenido, filas, escala=None):
+    if tipo == 'i':
+        return [None if v == _NULO_INT else v for v in _desde_bytes('q', contenido)]
+    if tipo == 'd' and escala is not None:
+        return [None if v == _NULO_INT else Decimal(v).scaleb(-escala)
+                for v in _desde_bytes('q', contenido)]
+    if tipo == 'n':
+        return [None if math.isnan(v) else v for v in _desde_bytes('d', contenido)]
+    if tipo == 't':
+        return [None if v == _NULO_INT else _EPOCA + timedelta(microseconds=v)
+                for v in _desde_bytes('q', contenido)]
+    largos = _desde_bytes('i', contenido[:4 * filas])
+    valores = []
+    pos = 4 * filas
+    for largo in largos:
+        if largo < 0:
+            valores.append(None)
+        else:
+            valores.append(contenido[pos:pos + largo].decode('utf-8'))
+            pos += largo
+    if tipo == 'd':
+        return [None if v is None else Decimal(v) for v in valores]
+    return valores
+
+
+def escribir(ruta, columnas, filas, orden):
+    """Escribe `filas` (tuplas, ya ordenadas por la columna `orden`) en `ruta`
+
+    Se escribe a un temporal y se renombra al final: el archivo aparece
+    completo o no aparece. Devuelve la cantidad de filas escritas.
+    """
+    filas = list(filas)
+    indice_orden = columnas.index(orden)
+    tipos = [_tipo(fila[i] for fila in filas) for i in range(len(columnas))]
+    escalas = [_escala([fila[i] for fila in filas]) if tipo == 'd' else None
+               for i, tipo in enumerate(tipos)]
+    grupos = []
+    temporal = ruta + '.tmp'
+    with open(temporal, 'wb') as archivo:
+        archivo.write(MAGIC)
+        for inicio in range(0, len(filas), FILAS_POR_GRUPO):
+            grupo = filas[inicio:inicio + FILAS_POR_GRUPO]
+            fechas = [f[indice_orden] for f in grupo if f[indice_orden] is not None]
+            bloques = []
+            for i, tipo in enumerate(tipos):
+                contenido = zlib.compress(_codificar(tipo, [f[i] for f in grupo], escalas[i]), 6)
+                bloques.append([archivo.tell(), len(contenido)])
+                archivo.write(contenido)
+            grupos.append({
+                'filas': len(grupo),
+                'min': _a_micros(min(fechas)) if fechas else None,
+                'max': _a_micros(max(fechas)) if fechas else None,
+                'bloques': bloques,
+            })
+        pie = json.dumps({
+            'columnas': list(columnas), 'tipos': tipos, 'escalas': escalas, 'orden': orden,
+            'filas': len(filas), 'grupos': grupos,
+        }).encode('utf-8')
+        archivo.write(pie)
+        archivo.write(_LARGO_PIE.pack(len(pie)))
+        archivo.write(MAGIC)
+        archivo.flush()
+        os.fsync(archivo.fileno())
+    os.replace(temporal, ruta)
+    return len(filas)
+
+
+class Lector:
+    """Lee un archivo columnar mapeado en memoria"""
+
+    def __init__(self, ruta):
+        with open(ruta, 'rb') as archivo:
+            self._mm = mmap.mmap(archivo.fileno(), 0, access=mmap.ACCESS_READ)
+        fin = len(self._mm) - len(MAGIC)
+        if self._mm[:len(MAGIC)] != MAGIC or self._mm[fin:] != MAGIC:
+            self.cerrar()
+            raise ValueError(f'{ruta} no es un archivo columnar válido')
+        (largo,) = _LARGO_PIE.unpack(self._mm[fin - _LARGO_PIE.size:fin])
+        pie = json.loads(self._mm[fin - _LARGO_PIE.size - largo:fin - _LARGO_PIE.size])
+        self.columnas = pie['columnas']
+        self.tipos = pie['tipos']
+        self._escalas = pie.get('escalas') or [None] * len(self.tipos)
+        self.orden = pie['orden']
+        self.filas = pie['filas']
+        self._grupos = pie['grupos']
+
+    def cerrar(self):
+        self._mm.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+
+    def leer(self, desde=None, hasta=None, columnas=None):
+        """Genera tuplas con `columnas` (todas por defecto) de las filas con
+        desde <= orden < hasta; los grupos fuera del rango no se descomprimen"""
+        columnas = columnas or self.columnas
+        indices = [self.columnas.index(c) for c in columnas]
+        i_orden = self.columnas.index(self.orden)
+        leer_orden = i_orden not in indices
+        desde_us = _a_micros(desde) if desde is not None else None
+        hasta_us = _a_micros(hasta) if hasta is not None else None
+
+        for grupo in self._grupos:
+            if grupo['min'] is not None:
+                if hasta_us is not None and grupo['min'] >= hasta_us:
+                    continue
+                if desde_us is not None and grupo['max'] < desde_us:
+                    continue
+            valores = {}
+            for i in indices + ([i_orden] if leer_orden else []):
+                offset, largo = grupo['bloques'][i]
+                contenido = zlib.decompress(self._mm[offset:offset + largo])
+                valores[i] = _decodificar(self.tipos[i], contenido, grupo['filas'], self._escalas[i])
+
+            # Filtro fino solo si el grupo no cae entero dentro del rango
+            completo = grupo['min'] is not None and (
+                (desde_us is None or grupo['min'] >= desde_us)
+                and (hasta_us is None or grupo['max'] < hasta_us)
+            )
+            fechas = valores[i_orden]
+            desde_dt = _EPOCA + timedelta(microseconds=desde_us) if desde_us is not None else None
+            hasta_dt = _EPOCA + timedelta(microseconds=hasta_us) if hasta_us is not None else None
+            for n in range(grupo['filas']):
+                if not completo:
+                    fecha = fechas[n]
+                    if fecha is None or (desde_dt and fecha < desde_dt) or (hasta_dt and fecha >= hasta_dt):
+                        continue
+                yield tuple(valores[i][n] for i in indices)
@@ -0,0 +1,54 @@
+"""
+Métricas de conexiones a la base de datos por proceso.
+
+El backend core.backends.oracle registra el tiempo de cada obtención de
+conexión; pool_stats() lo combina con el estado del pool de oracledb
+(sesiones abiertas, ocupadas, mínimo y máximo).
+"""
+import os
+import threading
+
+from django.db import connections
+
+_acquires = {}
+_lock = threading.Lock()
+
+
+def record_acquire(alias, segundos):
+    with _lock:
+        entry = _acquires.setdefault(alias, {'count': 0, 'total': 0.0, 'max': 0.0})
+        entry['count'] += 1
+        entry['total'] += segundos
+        entry['max'] = max(entry['max'], segundos)
+
+
+def pool_stats():
+    """Estado del pool y tiempos de obtención de conexión de este proceso"""
+    data = {'pid': os.getpid(), 'databases': {}}
+    for alias in connections:
+        wrapper = connections[alias]
+        stats = {'pool': None}
+
+        pool = getattr(wrapper, 'pool', None) if getattr(wrapper, 'is_pool', False) else None
+        if pool is not None:
+            stats['pool'] = {
+                'min': pool.min,
+                'max': pool.max,
+                'increment': pool.increment,
+                'opened': pool.opened,
+                'busy': pool.busy,
+                'utilizacion': round(pool.busy / pool.max, 3) if pool.max else None,
+            }
+        else:
+            stats['conn_max_age'] = wrapper.settings_dict.get('CONN_MAX_AGE', 0)
+
+        with _lock:
+            acquire = dict(_acquires.get(alias, {'count': 0, 'total': 0.0, 'max': 0.0}))
+        count = acquire['count']
+        stats['obtenciones'] = {
+            'count': count,
+            'promedio_ms': round(acquire['total'] / count * 1000, 2) if count else None,
+            'max_ms': round(acquire['max'] * 1000, 2),
+        }
+        data['databases'][alias] = stats
+    return data
@@ -0,0 +1,251 @@
+"""
+Instrumentación de base de datos por request.
+
+El backend core.backends.oracle envuelve cada cursor (también los de
+connection.cursor() que usan las vistas) con TimedCursorWrapper: mientras
+haya un request en curso (core.middleware.DbTimingMiddleware) cuenta round
+trips, filas leídas y tiempo en execute/fetch. Al terminar el request el
+middleware agrega esas cifras al histograma del endpoint, registra las
+consultas más lentas que DB_SLOW_QUERY_MS en el logger `core.dbtiming` y
+devuelve el desglose en el header Server-Timing.
+
+Fuera de un request (comandos, hilos de fondo) el wrapper no mide nada. Lo
+que un StreamingHttpResponse lee después de devolverse la respuesta tampoco
+entra en las cifras del request.
+"""
+import bisect
+import logging
+import os
+import threading
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db.backends.utils import CursorDebugWrapper, CursorWrapper
+
+logger = logging.getLogger(__name__)
+
+DB_TIMING = getattr(settings, 'DB_TIMING', True)
+
+# Consultas (execute + fetch) por encima de este tiempo se registran con su SQL
+DB_SLOW_QUERY_MS = getattr(settings, 'DB_SLOW_QUERY_MS', 200)
+
+# Límites superiores (ms) de los buckets del histograma; el último es +inf
+BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+# Caracteres de SQL que se guardan en el log de consultas lentas
+_SQL_MAX = 2000
+
+_actual = ContextVar('db_timing', default=None)
+
+
+class Sentencia:
+    __slots__ = ('sql', 'segundos', 'filas')
+
+    def __init__(self, sql):
+        self.sql = sql
+        self.segundos = 0.0
+        self.filas = 0
+
+
+class RequestStats:
+    """Cifras de base de datos de un request"""
+
+    def __init__(self):
+        self.inicio = time.perf_counter()
+        self.consultas = 0
+        self.filas = 0
+        self.db_segundos = 0.0
+        self.lentas = []
+
+    def ejecutada(self, sql, segundos):
+        self.consultas += 1
+        self.db_segundos += segundos
+        sentencia = Sentencia(sql)
+        sentencia.segundos = segundos
+        return sentencia
+
+    def leidas(self, sentencia, filas, segundos):
+        self.filas += filas
+        self.db_segundos += segundos
+        if sentencia is not None:
+            sentencia.filas += filas
+            sentencia.segundos += segundos
+
+    def cerrar(self, sentencia):
+        """Anota la sentencia si ya superó el umbral de consulta lenta"""
+        if sentencia is not None and sentencia.segundos * 1000 >= DB_SLOW_QUERY_MS:
+            if sentencia not in self.lentas:
+                self.lentas.append(sentencia)
+
+
+def iniciar():
+    """Empieza a medir en el contexto actual; devuelve el token para terminar()"""
+    return _actual.set(RequestStats())
+
+
+def terminar(token):
+    stats = _actual.get()
+    _actual.reset(token)
+    return stats
+
+
+def desactivar():
+    """Deja de medir en el contexto actual (tareas de fondo que heredan el de un request)"""
+    _actual.set(None)
+
+
+class TimedCursorMixin:
+    """Mide execute/executemany y los fetch de un CursorWrapper de Django"""
+
+    _sentencia = None
+
+    def _medir_ejecucion(self, metodo, sql, *args):
+        stats = _actual.get()
+        if stats is None:
+            return metodo(sql, *args)
+        inicio = time.perf_counter()
+        try:
+            return metodo(sql, *args)
+        finally:
+            self._sentencia = stats.ejecutada(sql, time.perf_counter() - inicio)
+            stats.cerrar(self._sentencia)
+
+    def execute(self, sql, params=None):
+        return self._medir_ejecucion(super().execute, sql, params)
+
+    def executemany(self, sql, param_list):
+        return self._medir_ejecucion(super().executemany, sql, param_list)
+
+    def _medir_fetch(self, nombre, *args):
+        fetch = CursorWrapper.__getattr__(self, nombre)
+        stats = _actual.get()
+        if stats is None:
+            return fetch(*args)
+        inicio = time.perf_counter()
+        resultado = fetch(*args)
+        filas = len(resultado) if isinstance(resultado, list) else int(resultado is not None)
+        stats.leidas(self._sentencia, filas, time.perf_counter() - inicio)
+        stats.cerrar(self._sentencia)
+        return resultado
+
+    def fetchone(self):
+        return self._medir_fetch('fetchone')
+
+    def fetchmany(self, *args):
+        return self._medir_fetch('fetchmany', *args)
+
+    def fetchall(self):
+        return self._medir_fetch('fetchall')
+
+    def __iter__(self):
+        stats = _actual.get()
+        if stats is None:
+            yield from super().__iter__()
+            return
+        filas = iter(super().__iter__())
+        while True:
+            inicio = time.perf_counter()
+            try:
+                fila = next(filas)
+            except StopIteration:
+                stats.leidas(self._sentencia, 0, time.perf_counter() - inicio)
+                stats.cerrar(self._sentencia)
+                return
+            stats.leidas(self._sentencia, 1, time.perf_counter() - inicio)
+            yield fila
+
+
+class TimedCursorWrapper(TimedCursorMixin, CursorWrapper):
+    pass
+
+
+class TimedCursorDebugWrapper(TimedCursorMixin, CursorDebugWrapper):
+    pass
+
+
+# =============================================
+# Histogramas por endpoint
+# =============================================
+
+_endpoints = {}
+_lock = threading.Lock()
+
+
+def _nuevo_endpoint():
+    return {
+        'requests': 0, 'errores': 0, 'buckets': [0] * (len(BUCKETS_MS) + 1),
+        'total_s': 0.0, 'db_s': 0.0, 'max_s': 0.0,
+        'consultas': 0, 'filas': 0, 'lentas': 0,
+    }
+
+
+def registrar(endpoint, stats, total_segundos, status):
+    """Suma un request terminado al histograma del endpoint y registra las consultas lentas"""
+    with _lock:
+        e = _endpoints.setdefault(endpoint, _nuevo_endpoint())
+        e['requests'] += 1
+        e['errores'] += int(status >= 500)
+        e['buckets'][bisect.bisect_left(BUCKETS_MS, total_segundos * 1000)] += 1
+        e['total_s'] += total_segundos
+        e['db_s'] += stats.db_segundos
+        e['max_s'] = max(e['max_s'], total_segundos)
+        e['consultas'] += stats.consultas
+        e['filas'] += stats.filas
+        e['lentas'] += len(stats.lentas)
+
+    for sentencia in stats.lentas:
+        logger.warning(
+            'Consulta lenta %.1f ms (%d filas) en %s: %s',
+            sentencia.segundos * 1000, sentencia.filas, endpoint,
+            ' '.join(str(sentencia.sql).split())[:_SQL_MAX]
+        )
+
+
+def server_timing(stats, total_segundos):
+    db_ms = stats.db_segundos * 1000
+    total_ms = total_segundos * 1000
+    return (
+        f'db;dur={db_ms:.1f};desc="{stats.consultas} consultas, {stats.filas} filas", '
+        f'app;dur={max(total_ms - db_ms, 0):.1f}, total;dur={total_ms:.1f}'
+    )
+
+
+def _percentil_bucket(buckets, total, p):
+    """Límite superior (ms) del bucket que contiene el percentil p; None si cae en +inf"""
+    objetivo = total * p / 100
+    acumulado = 0
+    for limite, cantidad in zip(BUCKETS_MS + (None,), buckets):
+        acumulado += cantidad
+        if acumulado >= objetivo:
+            return limite
+    return None
+
+
+def db_stats():
+    """Histogramas y promedios por endpoint en este proceso"""
+    with _lock:
+        copia = {k: dict(v, buckets=list(v['buckets'])) for k, v in _endpoints.items()}
+    endpoints = {}
+    for endpoint, e in sorted(copia.items()):
+        n = e['requests']
+        endpoints[endpoint] = {
+            'requests': n,
+            'errores': e['errores'],
+            'histograma': e['buckets'],
+            'p50_ms': _percentil_bucket(e['buckets'], n, 50),
+            'p95_ms': _percentil_bucket(e['buckets'], n, 95),
+            'p99_ms': _percentil_bucket(e['buckets'], n, 99),
+            'max_ms': round(e['max_s'] * 1000, 2),
+            'promedio_ms': round(e['total_s'] / n * 1000, 2) if n else None,
+            'db_promedio_ms': round(e['db_s'] / n * 1000, 2) if n else None,
+            'consultas_promedio': round(e['consultas'] / n, 2) if n else None,
+            'filas_promedio': round(e['filas'] / n, 1) if n else None,
+            'consultas_lentas': e['lentas'],
+        }
+    return {
+        'pid': os.getpid(),
+        'umbral_lento_ms': DB_SLOW_QUERY_MS,
+        'buckets_ms': list(BUCKETS_MS) + ['+inf'],
+        'endpoints': endpoints,
+    }
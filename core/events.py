@@ -0,0 +1,184 @@
+"""
+Canal de eventos en vivo (SSE) para stock y ventas.
+
+Las escrituras ya anotan en CAMBIOS (core.sync) los productos cuyo stock o
+precio cambió y las ventas registradas, en la misma transacción. Cada proceso
+ASGI tiene un único EventHub: mientras haya al menos un dashboard conectado,
+una sola tarea lee los cambios nuevos de CAMBIOS cada EVENTOS_INTERVALO
+segundos y reparte el mismo evento a todas las conexiones. Sin conexiones la
+tarea se detiene; con conexiones pero sin cambios, cada lectura es una
+consulta por índice que no devuelve filas.
+
+Leer de CAMBIOS (y no de una cola en memoria) hace que una venta atendida por
+otro worker también llegue a los dashboards conectados a este.
+
+Eventos (`event:` / `data:` JSON):
+- stock: {id_producto, nombre, stock, precio} o {id_producto, eliminado: true}
+- venta: {id_venta, total, fecha}
+"""
+import asyncio
+import json
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection
+
+from core import dbtiming
+from core.asyncviews import run_in_db_thread
+from core.schema import registry
+from core.sync import SYNC_LAG_SEGUNDOS
+
+# Segundos entre lecturas de CAMBIOS mientras haya suscriptores
+EVENTOS_INTERVALO = getattr(settings, 'EVENTOS_INTERVALO', 1.0)
+
+# Segundos sin eventos tras los que se envía un comentario para mantener viva la conexión
+EVENTOS_KEEPALIVE = 15
+
+# Eventos pendientes por conexión; si un cliente lento la llena se descartan los más antiguos
+EVENTOS_COLA = 1000
+
+SELECT_CAMBIOS_SQL = f"""
+    SELECT ID_CAMBIO, TABLA, ID_REGISTRO,
+           CASE WHEN FECHA < SYSTIMESTAMP - NUMTODSINTERVAL({SYNC_LAG_SEGUNDOS}, 'SECOND')
+                THEN 1 ELSE 0 END
+    FROM CAMBIOS
+    WHERE ID_CAMBIO > %s AND TABLA IN ('PRODUCTOS', 'VENTAS')
+    ORDER BY ID_CAMBIO
+"""
+
+
+def _por_id(cursor, sql, ids):
+    cursor.execute(sql.format(ids=', '.join(['%s'] * len(ids))), ids)
+    columns = [col[0].lower() for col in cursor.description]
+    return {row[0]: dict(zip(columns, row)) for row in cursor.fetchall()}
+
+
+class _Lector:
+    """Estado de lectura de CAMBIOS de un EventHub (se usa desde un solo hilo a la vez)
+
+    Los IDs de secuencia pueden confirmarse fuera de orden, así que la marca
+    solo avanza sobre cambios con más de SYNC_LAG_SEGUNDOS; los más recientes
+    se releen en cada vuelta y `vistos` evita emitirlos dos veces.
+    """
+
+    def __init__(self):
+        self.marca = None
+        self.vistos = set()
+
+    def leer(self):
+        """Eventos nuevos desde la última lectura, como (id, tipo, data)"""
+        with connection.cursor() as cursor:
+            if self.marca is None:
+                # Al arrancar no se reenvía el historial
+                cursor.execute("SELECT NVL(MAX(ID_CAMBIO), 0) FROM CAMBIOS")
+                self.marca = cursor.fetchone()[0]
+                return []
+
+            cursor.execute(SELECT_CAMBIOS_SQL, [self.marca])
+            filas = cursor.fetchall()
+            nuevas = [f for f in filas if f[0] not in self.vistos]
+            self.vistos.update(f[0] for f in nuevas)
+            confirmadas = [f[0] for f in filas if f[3]]
+            if confirmadas:
+                self.marca = max(confirmadas)
+                self.vistos = {i for i in self.vistos if i > self.marca}
+            if not nuevas:
+                return []
+
+            # Un evento por producto/venta aunque haya varios cambios en esta vuelta
+            ultimo = {}
+            for id_cambio, tabla, id_registro, _ in nuevas:
+                ultimo[(tabla, id_registro)] = id_cambio
+            productos = [i for t, i in ultimo if t == 'PRODUCTOS']
+            ventas = [i for t, i in ultimo if t == 'VENTAS']
+            sql_productos = """
+                SELECT ID_PRODUCTO, NOMBRE, STOCK, PRECIO FROM PRODUCTOS
+                WHERE ID_PRODUCTO IN ({ids})
+            """
+            if 'ACTIVO' in registry.columns(cursor, 'PRODUCTOS'):
+                sql_productos += " AND NVL(ACTIVO, 'S') = 'S'"
+            filas_productos = _por_id(cursor, sql_productos, productos) if productos else {}
+            filas_ventas = _por_id(cursor, """
+                SELECT ID_VENTA, TOTAL, FECHA FROM VENTAS WHERE ID_VENTA IN ({ids})
+            """, ventas) if ventas else {}
+
+        eventos = []
+        for (tabla, id_registro), id_cambio in sorted(ultimo.items(), key=lambda e: e[1]):
+            if tabla == 'PRODUCTOS':
+                data = filas_productos.get(id_registro) or {'id_producto': id_registro, 'eliminado': True}
+                eventos.append((id_cambio, 'stock', data))
+            elif id_registro in filas_ventas:
+                eventos.append((id_cambio, 'venta', filas_ventas[id_registro]))
+        return eventos
+
+
+def feed_disponible():
+    """True si existe la tabla CAMBIOS (python manage.py setup_change_feed)"""
+    with connection.cursor() as cursor:
+        return bool(registry.columns(cursor, 'CAMBIOS'))
+
+
+class EventHub:
+    """Fan-out de eventos a las conexiones SSE de este proceso"""
+
+    def __init__(self):
+        self._colas = set()
+        self._tarea = None
+        self._lector = _Lector()
+
+    @property
+    def suscriptores(self):
+        return len(self._colas)
+
+    def suscribir(self):
+        cola = asyncio.Queue(maxsize=EVENTOS_COLA)
+        self._colas.add(cola)
+        if self._tarea is None or self._tarea.done():
+            self._lector = _Lector()
+            self._tarea = asyncio.get_running_loop().create_task(self._leer_cambios())
+        return cola
+
+    def cancelar(self, cola):
+        self._colas.discard(cola)
+
+    def _publicar(self, evento):
+        for cola in self._colas:
+            if cola.full():
+                cola.get_nowait()
+            cola.put_nowait(evento)
+
+    async def _leer_cambios(self):
+        # Al quedar sin suscriptores la tarea termina; la próxima suscripción
+        # arranca otra desde los cambios de ese momento
+        # La tarea hereda el contexto del request que la creó: no medir sus lecturas ahí
+        dbtiming.desactivar()
+        while self._colas:
+            try:
+                eventos = await run_in_db_thread(self._lector.leer)
+            except Exception:
+                eventos = []
+            for evento in eventos:
+                self._publicar(evento)
+            await asyncio.sleep(EVENTOS_INTERVALO)
+
+
+hub = EventHub()
+
+
+def formato_sse(id_evento, tipo, data):
+    return f"id: {id_evento}\nevent: {tipo}\ndata: {json.dumps(data, cls=DjangoJSONEncoder)}\n\n"
+
+
+async def stream_eventos(cola, hub=hub):
+    """Generador async de la respuesta SSE de una conexión"""
+    try:
+        yield 'retry: 3000\n\n'
+        while True:
+            try:
+                evento = await asyncio.wait_for(cola.get(), EVENTOS_KEEPALIVE)
+            except asyncio.TimeoutError:
+                yield ': keepalive\n\n'
+                continue
+            yield formato_sse(*evento)
+    finally:
+        hub.cancelar(cola)
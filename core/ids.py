@@ -0,0 +1,107 @@
+"""
+Asignación de IDs con secuencias de Oracle.
+
+Reemplaza el patrón SELECT NVL(MAX(ID), 0) + 1 seguido de INSERT: el ID sale de
+la secuencia de cada tabla dentro del propio INSERT (RETURNING ... INTO), en un
+solo round trip y sin colisiones entre workers concurrentes.
+
+Con ID_BLOCK_SIZE > 1 cada proceso reserva bloques de IDs de la secuencia y los
+va consumiendo localmente, para no pedir NEXTVAL en cada inserción.
+"""
+import threading
+
+from django.conf import settings
+
+from core.schema import registry
+
+# Tabla -> (columna ID, secuencia)
+SECUENCIAS = {
+    'PROVEEDORES': ('ID_PROVEEDOR', 'SEQ_PROVEEDORES'),
+    'PRODUCTOS': ('ID_PRODUCTO', 'SEQ_PRODUCTOS'),
+    'CLIENTES': ('ID_CLIENTE', 'SEQ_CLIENTES'),
+    'USUARIOS': ('ID_USUARIO', 'SEQ_USUARIOS'),
+    'VENTAS': ('ID_VENTA', 'SEQ_VENTAS'),
+    'DETALLE_VENTA': ('ID_DETALLE', 'SEQ_DETALLE'),
+    'MOVIMIENTOS_INVENTARIO': ('ID_MOV', 'SEQ_MOVIMIENTOS'),
+    'GARANTIAS': ('ID_GARANTIA', 'SEQ_GARANTIAS'),
+}
+
+# IDs reservados por proceso en cada viaje a la secuencia (0 o 1 = sin bloques)
+ID_BLOCK_SIZE = getattr(settings, 'ID_BLOCK_SIZE', 0)
+
+
+class _IdVar:
+    """Variable de salida para RETURNING ... INTO con el cursor de Django"""
+
+    def bind_parameter(self, cursor):
+        self.bound_param = cursor.cursor.var(int)
+        return self.bound_param
+
+    def get_value(self):
+        value = self.bound_param.getvalue()
+        return value[0] if isinstance(value, list) else value
+
+
+def reserve_ids(cursor, tabla, cantidad):
+    """Obtiene `cantidad` valores de la secuencia de la tabla en un solo round trip"""
+    if cantidad <= 0:
+        return []
+    _, secuencia = SECUENCIAS[tabla]
+    cursor.execute(
+        f"SELECT {secuencia}.NEXTVAL FROM DUAL CONNECT BY LEVEL <= %s", [cantidad]
+    )
+    return [row[0] for row in cursor.fetchall()]
+
+
+class IdBlockAllocator:
+    """Reserva bloques de IDs por proceso y los entrega de uno en uno"""
+
+    def __init__(self, block_size):
+        self.block_size = block_size
+        self._bloques = {}
+        self._lock = threading.Lock()
+
+    def next_id(self, cursor, tabla):
+        with self._lock:
+            bloque = self._bloques.setdefault(tabla, [])
+            if not bloque:
+                bloque.extend(reserve_ids(cursor, tabla, self.block_size))
+            return bloque.pop(0)
+
+
+_allocator = IdBlockAllocator(ID_BLOCK_SIZE) if ID_BLOCK_SIZE > 1 else None
+
+
+def _insert_sql(tabla, columnas, expresiones, con_bloque):
+    columna_id, secuencia = SECUENCIAS[tabla]
+    cols = ', '.join([columna_id] + list(columnas) + list(expresiones))
+    sql_valores = ['%s'] * len(columnas) + list(expresiones.values())
+    if con_bloque:
+        return f"INSERT INTO {tabla} ({cols}) VALUES ({', '.join(['%s'] + sql_valores)})"
+    sql_valores = ', '.join([f"{secuencia}.NEXTVAL"] + sql_valores)
+    return (
+        f"INSERT INTO {tabla} ({cols}) VALUES ({sql_valores}) "
+        f"RETURNING {columna_id} INTO %s"
+    )
+
+
+def insert_returning_id(cursor, tabla, columnas, valores, expresiones=None):
+    """INSERT en `tabla` asignando el ID desde su secuencia; devuelve el ID creado
+
+    `expresiones` agrega columnas con SQL literal, p. ej. {'FECHA': 'SYSDATE'}.
+    """
+    expresiones = expresiones or {}
+    con_bloque = _allocator is not None
+    key = ('insert', tabla, tuple(columnas), tuple(expresiones.items()), con_bloque)
+    sql = registry.statement(
+        key, lambda: _insert_sql(tabla, columnas, expresiones, con_bloque)
+    )
+
+    if con_bloque:
+        new_id = _allocator.next_id(cursor, tabla)
+        cursor.execute(sql, [new_id] + list(valores))
+        return new_id
+
+    id_var = _IdVar()
+    cursor.execute(sql, list(valores) + [id_var])
+    return id_var.get_value()
@@ -0,0 +1,76 @@
+"""
+Mueve los meses cerrados de ventas y movimientos a archivos columnares
+(core.archivo) y los borra de las tablas calientes:
+
+    python manage.py archivar_historial                      # lo anterior a ARCHIVO_MESES_ACTIVOS
+    python manage.py archivar_historial --hasta 2023-01      # todo lo anterior a enero de 2023
+    python manage.py archivar_historial --familia ventas --simular
+
+Se puede interrumpir: la siguiente ejecución completa el borrado del mes que
+quedó a medias. Cada mes se lee completo en memoria antes de escribirse.
+"""
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from core import archivo
+from core.cache import invalidate
+
+
+def _restar_meses(mes, n):
+    total = mes.year * 12 + mes.month - 1 - n
+    return date(total // 12, total % 12 + 1, 1)
+
+
+class Command(BaseCommand):
+    help = 'Archiva los meses cerrados de VENTAS/DETALLE_VENTA y MOVIMIENTOS_INVENTARIO'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hasta', help='Archivar los meses anteriores a este (YYYY-MM)')
+        parser.add_argument('--familia', choices=list(archivo.FAMILIAS),
+                            help='Archivar solo ventas o solo movimientos')
+        parser.add_argument('--simular', action='store_true',
+                            help='Solo listar los meses que se archivarían')
+
+    def handle(self, *args, **options):
+        hoy = date.today().replace(day=1)
+        limite = _restar_meses(hoy, archivo.ARCHIVO_MESES_ACTIVOS)
+        if options['hasta']:
+            try:
+                pedido = date.fromisoformat(options['hasta'] + '-01')
+            except ValueError:
+                raise CommandError('--hasta debe tener formato YYYY-MM')
+            if pedido > limite:
+                raise CommandError(
+                    f'Solo se archivan meses anteriores a {limite:%Y-%m} (ARCHIVO_MESES_ACTIVOS = '
+                    f'{archivo.ARCHIVO_MESES_ACTIVOS})'
+                )
+            limite = pedido
+
+        familias = [options['familia']] if options['familia'] else list(archivo.FAMILIAS)
+        for familia in familias:
+            with connection.cursor() as cursor:
+                meses = archivo.meses_pendientes(cursor, familia, limite)
+            # Un mes anotado pero sin terminar de borrar va primero
+            a_medias = [
+                date.fromisoformat(m + '-01')
+                for m, estado in sorted(archivo.manifiesto().get(familia, {}).get('meses', {}).items())
+                if not estado['borrado']
+            ]
+            meses = sorted(set(a_medias) | set(meses))
+            if not meses:
+                self.stdout.write(f'  {familia}: nada que archivar antes de {limite:%Y-%m}')
+                continue
+            if options['simular']:
+                self.stdout.write(f"  {familia}: {', '.join(f'{m:%Y-%m}' for m in meses)}")
+                continue
+
+            for mes in meses:
+                filas = archivo.archivar_mes(connection, familia, mes)
+                detalle = ', '.join(f'{tabla} {n}' for tabla, n in filas.items())
+                self.stdout.write(f'  {familia} {mes:%Y-%m}: {detalle}')
+            invalidate(*(tabla for tabla, _, _ in archivo.FAMILIAS[familia]))
+            self.stdout.write(f'  {familia}: frontera {archivo.frontera(familia)}')
+
+        self.stdout.write(self.style.SUCCESS('Archivo actualizado'))
@@ -0,0 +1,291 @@
+"""
+Benchmark de carga de todas las APIs JSON de inventario y ventas contra un
+servidor en marcha, con los datos de `seed_bench`:
+
+    python manage.py seed_bench --escala 100k
+    python manage.py bench_api --concurrency 20 --requests 200 --salida bench.json
+    python manage.py bench_api --baseline bench.json --tolerancia 0.2
+
+Las rutas se leen de inventario/urls.py y ventas/urls.py (toda ruta con
+nombre api_*): una ruta nueva sin escenario aparece en `sin_escenario` y hace
+fallar el comando, para que no quede fuera del benchmark. Cada escenario
+genera sus requests con datos BENCH- (las escrituras también crean filas
+BENCH-, que `seed_bench --limpiar` borra).
+
+El resultado JSON tiene throughput y p50/p95/p99 por ruta. Con --baseline se
+compara contra una corrida anterior y el comando termina con error si el p95
+de alguna ruta empeora más que --tolerancia o aparecen errores nuevos.
+"""
+import functools
+import json
+import platform
+import random
+import subprocess
+from datetime import datetime
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.urls import reverse
+
+from core.bench import BENCH_PREFIJO, BENCH_USUARIO, medir, peticion
+from inventario import urls as inventario_urls
+from ventas import urls as ventas_urls
+
+# Filas de muestra que se leen de la base para armar los requests
+MUESTRA = 10_000
+
+
+class Contexto:
+    """IDs BENCH- de muestra y filas creadas durante la corrida"""
+
+    def __init__(self, cursor, rnd):
+        self.rnd = rnd
+        prefijo = f'{BENCH_PREFIJO}%'
+        cursor.execute(
+            "SELECT ID_PRODUCTO FROM PRODUCTOS WHERE NOMBRE LIKE %s FETCH FIRST %s ROWS ONLY",
+            [prefijo, MUESTRA]
+        )
+        self.productos = [row[0] for row in cursor.fetchall()]
+        cursor.execute(
+            "SELECT ID_CLIENTE FROM CLIENTES WHERE NOMBRE LIKE %s FETCH FIRST %s ROWS ONLY",
+            [prefijo, MUESTRA]
+        )
+        self.clientes = [row[0] for row in cursor.fetchall()]
+        cursor.execute(
+            "SELECT MIN(ID_USUARIO) FROM USUARIOS WHERE LOWER(NOMBRE) = %s", [BENCH_USUARIO]
+        )
+        self.id_usuario = cursor.fetchone()[0]
+        if not self.productos or not self.clientes or self.id_usuario is None:
+            raise CommandError('No hay datos BENCH-: ejecutar antes python manage.py seed_bench')
+        # IDs creados por los escenarios *_create, consumidos por *_delete
+        self.creados = {'productos': [], 'clientes': []}
+
+    def producto(self):
+        return self.rnd.choice(self.productos)
+
+    def cliente(self):
+        return self.rnd.choice(self.clientes)
+
+    def productos_muestra(self, n):
+        return self.rnd.sample(self.productos, min(n, len(self.productos)))
+
+
+def _producto_body(ctx, id_producto=None):
+    body = {
+        'nombre': f'{BENCH_PREFIJO}bench {ctx.rnd.randint(1, 10**9)}',
+        'descripcion': 'bench',
+        'stock': 1_000_000,
+        'precio': ctx.rnd.randint(5, 5000) * 100,
+    }
+    if id_producto is not None:
+        body['id_producto'] = id_producto
+    return body
+
+
+def _cliente_body(ctx):
+    n = ctx.rnd.randint(1, 10**9)
+    return {'nombre': f'{BENCH_PREFIJO}Cliente {n}', 'rut': f'BB{n}', 'correo': f'c{n}@bench.local'}
+
+
+def _borrar_creado(ctx, tipo, nombre):
+    """DELETE de una fila creada en esta corrida
+
+    Si no quedan: para productos, solo el chequeo de impacto (?check=true);
+    para clientes, un cliente BENCH- de la muestra.
+    """
+    if ctx.creados[tipo]:
+        return 'POST', reverse(nombre, kwargs={'id': ctx.creados[tipo].pop()}), None
+    if tipo == 'productos':
+        return 'POST', reverse(nombre, kwargs={'id': ctx.producto()}) + '?check=true', None
+    return 'POST', reverse(nombre, kwargs={'id': ctx.clientes.pop()}), None
+
+
+# Nombre de la ruta -> función(ctx) que devuelve (método, ruta, body)
+ESCENARIOS = {
+    # Inventario
+    'api_productos_list': lambda ctx: (
+        'GET', reverse('api_productos_list') + f'?limit=100&cursor={ctx.producto()}', None),
+    'api_productos_buscar': lambda ctx: (
+        'GET', reverse('api_productos_buscar') + f'?q={ctx.rnd.choice(["cab", "mous", "monitor usb", "carg"])}', None),
+    'api_productos_lookup': lambda ctx: (
+        'POST', reverse('api_productos_lookup'), {'ids': ctx.productos_muestra(20)}),
+    'api_productos_lookup_stats': lambda ctx: ('GET', reverse('api_productos_lookup_stats'), None),
+    'api_productos_detalle': lambda ctx: (
+        'GET', reverse('api_productos_detalle', kwargs={'id': ctx.producto()}), None),
+    'api_productos_codigo': lambda ctx: (
+        'GET', reverse('api_productos_codigo', kwargs={'codigo': f'{BENCH_PREFIJO}{ctx.producto()}'}), None),
+    'api_productos_create': lambda ctx: ('POST', reverse('api_productos_create'), _producto_body(ctx)),
+    'api_productos_bulk': lambda ctx: (
+        'POST', reverse('api_productos_bulk'),
+        {'productos': [_producto_body(ctx, i) for i in ctx.productos_muestra(100)]}),
+    'api_productos_update': lambda ctx: (
+        'POST', reverse('api_productos_update', kwargs={'id': ctx.producto()}), _producto_body(ctx)),
+    'api_productos_delete': lambda ctx: _borrar_creado(ctx, 'productos', 'api_productos_delete'),
+    'api_proveedores_list': lambda ctx: ('GET', reverse('api_proveedores_list'), None),
+    'api_proveedores_create': lambda ctx: (
+        'POST', reverse('api_proveedores_create'),
+        {'nombre': f'{BENCH_PREFIJO}Proveedor {ctx.rnd.randint(1, 10**9)}', 'contacto': 'bench'}),
+    'api_movimientos_list': lambda ctx: ('GET', reverse('api_movimientos_list'), None),
+    'api_movimientos_create': lambda ctx: (
+        'POST', reverse('api_movimientos_create'),
+        {'id_producto': ctx.producto(), 'tipo': 'ENTRADA', 'cantidad': 1}),
+    'api_movimientos_batch': lambda ctx: (
+        'POST', reverse('api_movimientos_batch'),
+        {'movimientos': [{'id_producto': i, 'tipo': 'ENTRADA', 'cantidad': 1}
+                         for i in ctx.productos_muestra(20)]}),
+    'api_stock': lambda ctx: (
+        'GET', reverse('api_stock') + f"?ids={','.join(map(str, ctx.productos_muestra(50)))}", None),
+    'api_async_productos_list': lambda ctx: (
+        'GET', reverse('api_async_productos_list') + f'?limit=100&cursor={ctx.producto()}', None),
+    'api_async_productos_lookup': lambda ctx: (
+        'POST', reverse('api_async_productos_lookup'), {'ids': ctx.productos_muestra(20)}),
+    'api_async_proveedores_list': lambda ctx: ('GET', reverse('api_async_proveedores_list'), None),
+    'api_async_movimientos_list': lambda ctx: ('GET', reverse('api_async_movimientos_list'), None),
+
+    # Ventas
+    'api_clientes_list': lambda ctx: ('GET', reverse('api_clientes_list'), None),
+    'api_clientes_create': lambda ctx: ('POST', reverse('api_clientes_create'), _cliente_body(ctx)),
+    'api_clientes_update': lambda ctx: (
+        'POST', reverse('api_clientes_update', kwargs={'id': ctx.cliente()}), {'telefono': '+56911111111'}),
+    'api_clientes_delete': lambda ctx: _borrar_creado(ctx, 'clientes', 'api_clientes_delete'),
+    'api_ventas_list': lambda ctx: ('GET', reverse('api_ventas_list'), None),
+    'api_ventas_create': lambda ctx: (
+        'POST', reverse('api_ventas_create'), {'id_usuario': ctx.id_usuario, 'total': 1000}),
+    'api_ventas_checkout': lambda ctx: (
+        'POST', reverse('api_ventas_checkout'),
+        {'id_usuario': ctx.id_usuario, 'id_cliente': ctx.cliente(),
+         'items': [{'id_producto': i, 'cantidad': 1} for i in ctx.productos_muestra(3)]}),
+    'api_usuarios_list': lambda ctx: ('GET', reverse('api_usuarios_list'), None),
+    'api_login': lambda ctx: (
+        'POST', reverse('api_login'), {'username': BENCH_USUARIO, 'password': BENCH_USUARIO}),
+    'api_async_clientes_list': lambda ctx: ('GET', reverse('api_async_clientes_list'), None),
+    'api_async_ventas_list': lambda ctx: ('GET', reverse('api_async_ventas_list'), None),
+    'api_async_usuarios_list': lambda ctx: ('GET', reverse('api_async_usuarios_list'), None),
+}
+
+# Los escenarios que consumen filas creadas van después de sus *_create
+_TIPO_CREADO = {'api_productos_create': 'productos', 'api_clientes_create': 'clientes'}
+
+
+def rutas_api():
+    """Nombres api_* de inventario/urls.py y ventas/urls.py, en orden de declaración"""
+    return [
+        p.name for urls in (inventario_urls, ventas_urls)
+        for p in urls.urlpatterns if p.name and p.name.startswith('api_')
+    ]
+
+
+def _commit_actual():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, timeout=5
+        ).stdout.strip() or None
+    except Exception:
+        return None
+
+
+def _ejecutar(base, ctx, nombre, metodo, ruta, body):
+    segundos, status, data = peticion(base + ruta, metodo, body)
+    tipo = _TIPO_CREADO.get(nombre)
+    if tipo and isinstance(data, dict) and data.get('id') is not None:
+        ctx.creados[tipo].append(data['id'])
+    return segundos, status, data
+
+
+def comparar(resultados, baseline, tolerancia):
+    """Rutas cuyo p95 empeoró más que `tolerancia` (fracción) o con errores nuevos"""
+    anteriores = {r['ruta']: r for r in baseline.get('resultados', [])}
+    regresiones = []
+    for r in resultados:
+        antes = anteriores.get(r['ruta'])
+        if antes is None:
+            continue
+        if r['errores'] > antes['errores']:
+            regresiones.append(f"{r['ruta']}: errores {antes['errores']} -> {r['errores']}")
+        if antes['p95_ms'] and r['p95_ms'] and r['p95_ms'] > antes['p95_ms'] * (1 + tolerancia):
+            regresiones.append(f"{r['ruta']}: p95 {antes['p95_ms']} -> {r['p95_ms']} ms")
+    return regresiones
+
+
+class Command(BaseCommand):
+    help = 'Benchmark de carga (throughput y p50/p95/p99) de las APIs de inventario y ventas'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', default='http://127.0.0.1:8000')
+        parser.add_argument('--concurrency', type=int, default=20,
+                            help='Requests simultáneos (default: 20)')
+        parser.add_argument('--requests', type=int, default=200,
+                            help='Requests por ruta (default: 200)')
+        parser.add_argument('--warmup', type=int, default=10,
+                            help='Requests por ruta antes de medir (default: 10)')
+        parser.add_argument('--solo', help='Solo rutas cuyo nombre contenga este texto')
+        parser.add_argument('--semilla', type=int, default=42)
+        parser.add_argument('--salida', help='Archivo JSON de resultados (default: stdout)')
+        parser.add_argument('--baseline', help='JSON de una corrida anterior para comparar')
+        parser.add_argument('--tolerancia', type=float, default=0.2,
+                            help='Empeoramiento de p95 admitido frente al baseline (default: 0.2)')
+
+    def handle(self, *args, **options):
+        base = options['base_url'].rstrip('/')
+        concurrency = options['concurrency']
+        total = options['requests']
+
+        rutas = rutas_api()
+        sin_escenario = [n for n in rutas if n not in ESCENARIOS]
+        if options['solo']:
+            rutas = [n for n in rutas if options['solo'] in n]
+        # Las bajas consumen las filas creadas: se miden al final
+        rutas.sort(key=lambda n: n.endswith('_delete'))
+
+        with connection.cursor() as cursor:
+            ctx = Contexto(cursor, random.Random(options['semilla']))
+        connection.close()
+
+        resultados = []
+        for nombre in rutas:
+            if nombre not in ESCENARIOS:
+                continue
+            peticiones = [ESCENARIOS[nombre](ctx) for _ in range(options['warmup'] + total)]
+            funciones = [
+                functools.partial(_ejecutar, base, ctx, nombre, *p) for p in peticiones
+            ]
+            medir(funciones[:options['warmup']], concurrency)
+            r = medir(funciones[options['warmup']:], concurrency)
+            metodo, ruta, _ = peticiones[0]
+            resultados.append({'ruta': nombre, 'metodo': metodo, 'url': ruta.split('?')[0], **r})
+            self.stderr.write(
+                f"{nombre:32} {r['req_s']:8.1f} req/s  p50 {r['p50_ms']} ms  "
+                f"p95 {r['p95_ms']} ms  p99 {r['p99_ms']} ms  err {r['errores']}"
+            )
+
+        reporte = {
+            'fecha': datetime.now().isoformat(timespec='seconds'),
+            'commit': _commit_actual(),
+            'base_url': base,
+            'concurrency': concurrency,
+            'requests': total,
+            'productos_muestra': len(ctx.productos),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'sin_escenario': sin_escenario,
+            'resultados': resultados,
+        }
+
+        regresiones = []
+        if options['baseline']:
+            with open(options['baseline'], encoding='utf-8') as f:
+                regresiones = comparar(resultados, json.load(f), options['tolerancia'])
+            reporte['regresiones'] = regresiones
+
+        contenido = json.dumps(reporte, indent=2, ensure_ascii=False)
+        if options['salida']:
+            with open(options['salida'], 'w', encoding='utf-8') as f:
+                f.write(contenido + '\n')
+        else:
+            self.stdout.write(contenido)
+
+        if sin_escenario:
+            raise CommandError(f"Rutas sin escenario de benchmark: {', '.join(sin_escenario)}")
+        if regresiones:
+            raise CommandError('Regresiones frente al baseline:\n  ' + '\n  '.join(regresiones))
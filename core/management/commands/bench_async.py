@@ -0,0 +1,45 @@
+"""
+Compara throughput y latencia de las rutas síncronas y async contra un
+servidor en marcha (p. ej. `uvicorn FactoraPos.asgi:application --workers 1`):
+
+    python manage.py bench_async --base-url http://127.0.0.1:8000 --concurrency 50
+"""
+import functools
+
+from django.core.management.base import BaseCommand
+
+from core.bench import medir, peticion
+
+# (ruta síncrona, ruta async)
+RUTAS = [
+    ('/inventario/api/productos/', '/inventario/api/async/productos/'),
+    ('/inventario/api/movimientos/', '/inventario/api/async/movimientos/'),
+    ('/ventas/api/ventas/', '/ventas/api/async/ventas/'),
+    ('/reportes/api/ventas/?agrupar=mes', '/reportes/api/async/ventas/?agrupar=mes'),
+]
+
+
+class Command(BaseCommand):
+    help = 'Benchmark de rutas de lectura síncronas vs async'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', default='http://127.0.0.1:8000')
+        parser.add_argument('--concurrency', type=int, default=20,
+                            help='Requests simultáneos (default: 20)')
+        parser.add_argument('--requests', type=int, default=200,
+                            help='Requests por ruta (default: 200)')
+
+    def handle(self, *args, **options):
+        base = options['base_url'].rstrip('/')
+        concurrency = options['concurrency']
+        total = options['requests']
+        ms = lambda v: f'{v:.1f}' if v is not None else '-'
+
+        self.stdout.write(f"{'ruta':45} {'modo':6} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'err':>4}")
+        for ruta_sync, ruta_async in RUTAS:
+            for modo, ruta in (('sync', ruta_sync), ('async', ruta_async)):
+                r = medir([functools.partial(peticion, base + ruta)] * total, concurrency)
+                self.stdout.write(
+                    f"{ruta_sync:45} {modo:6} {r['req_s']:8.1f} {ms(r['p50_ms']):>8} "
+                    f"{ms(r['p95_ms']):>8} {r['errores']:4}"
+                )
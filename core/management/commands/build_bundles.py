@@ -0,0 +1,36 @@
+"""
+Arma los bundles de JS/CSS por página (core.bundles) y los publica con hash
+en el nombre vía collectstatic (ManifestStaticFilesStorage):
+
+    python manage.py build_bundles
+    python manage.py build_bundles --pagina inventario --sin-collectstatic
+
+Correr en cada despliegue, antes de reiniciar los workers: las plantillas
+toman los nombres con hash de STATIC_ROOT/staticfiles.json al arrancar.
+"""
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+
+from core import bundles
+
+
+class Command(BaseCommand):
+    help = 'Concatena y minifica los JS/CSS de cada página y los publica con hash (collectstatic)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pagina', action='append', choices=list(bundles.BUNDLES),
+                            help='Armar solo esta página (se puede repetir)')
+        parser.add_argument('--sin-collectstatic', action='store_true',
+                            help='Solo escribir los bundles en STATIC_BUNDLES_DIR')
+
+    def handle(self, *args, **options):
+        try:
+            escritos = bundles.escribir_bundles(options['pagina'])
+        except bundles.BundleError as e:
+            raise CommandError(str(e))
+        for nombre, original, minificado in escritos:
+            self.stdout.write(f'  {nombre:32} {original / 1024:8.1f} KB -> {minificado / 1024:8.1f} KB')
+
+        if not options['sin_collectstatic']:
+            call_command('collectstatic', interactive=False, verbosity=options['verbosity'] - 1)
+        self.stdout.write(self.style.SUCCESS(f'{len(escritos)} bundles generados'))
@@ -0,0 +1,16 @@
+"""
+Invalida el registro de esquema (core.schema) tras un cambio de columnas:
+
+    python manage.py refresh_schema_cache
+"""
+from django.core.management.base import BaseCommand
+
+from core.schema import bump_schema_version
+
+
+class Command(BaseCommand):
+    help = 'Invalida las columnas y sentencias SQL cacheadas por core.schema'
+
+    def handle(self, *args, **options):
+        version = bump_schema_version()
+        self.stdout.write(self.style.SUCCESS(f'Registro de esquema invalidado (versión {version})'))
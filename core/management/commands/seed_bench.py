@@ -0,0 +1,223 @@
+"""
+Carga un conjunto de datos sintético para benchmarks en la base configurada
+(una instancia local de pruebas, nunca producción):
+
+    python manage.py seed_bench --escala 10k
+    python manage.py seed_bench --escala 1m --semilla 7
+    python manage.py seed_bench --limpiar
+
+Todas las filas llevan el prefijo BENCH- en NOMBRE (las ventas, el usuario
+`bench`), así que --limpiar las borra sin tocar los datos reales: también el
+usuario `bench` y lo que dejaron las cargas y los benchmarks (bench_api) en
+CAMBIOS, STOCK_DELTAS, STOCK_SNAPSHOT_DETALLE y RESUMEN_*_DIA. Solo se
+llenan las columnas que existen en cada tabla (core.schema). Reiniciar el
+servidor después de cargar: los caches de catálogo y búsqueda son por proceso.
+"""
+import random
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from core.bench import BENCH_PREFIJO, BENCH_USUARIO, ESCALAS
+from core.ids import SECUENCIAS, insert_returning_id, reserve_ids
+from core.schema import bump_schema_version, registry
+
+# Filas por executemany / commit
+LOTE = 5000
+
+METODOS_PAGO = ['EFECTIVO', 'DEBITO', 'CREDITO', 'TRANSFERENCIA']
+PALABRAS = ['cable', 'mouse', 'teclado', 'monitor', 'parlante', 'cargador', 'audifono',
+            'router', 'disco', 'memoria', 'notebook', 'tablet', 'impresora', 'camara']
+
+
+def _insertar(cursor, tabla, filas, columnas_ids=True):
+    """INSERT de un lote de `filas` (dicts columna -> valor) usando solo las
+    columnas que existen en la tabla. Con columnas_ids=False el ID sale de la
+    secuencia de la tabla dentro del INSERT."""
+    if not filas:
+        return
+    disponibles = registry.columns(cursor, tabla)
+    columnas = [c for c in filas[0] if c in disponibles]
+    valores = ['%s'] * len(columnas)
+    if not columnas_ids:
+        columna_id, secuencia = SECUENCIAS[tabla]
+        columnas.insert(0, columna_id)
+        valores.insert(0, f'{secuencia}.NEXTVAL')
+    sql = f"INSERT INTO {tabla} ({', '.join(columnas)}) VALUES ({', '.join(valores)})"
+    campos = [c for c in columnas if c in filas[0]]
+    with transaction.atomic():
+        cursor.executemany(sql, [[f[c] for c in campos] for f in filas])
+
+
+class Command(BaseCommand):
+    help = 'Carga (o borra) datos sintéticos BENCH- para benchmarks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--escala', choices=list(ESCALAS), default='10k')
+        parser.add_argument('--semilla', type=int, default=42)
+        parser.add_argument('--limpiar', action='store_true',
+                            help='Borrar los datos BENCH- en vez de cargarlos')
+        parser.add_argument('--forzar', action='store_true',
+                            help='Permitir la carga con DEBUG = False')
+
+    def handle(self, *args, **options):
+        if not settings.DEBUG and not options['forzar']:
+            raise CommandError('DEBUG = False: use --forzar si de verdad es una base de pruebas')
+
+        bump_schema_version()
+        cursor = connection.cursor()
+        if options['limpiar']:
+            self._limpiar(cursor)
+        else:
+            self._cargar(cursor, ESCALAS[options['escala']], random.Random(options['semilla']))
+        cursor.close()
+        self.stdout.write('Reiniciar el servidor para descartar los caches por proceso')
+
+    def _id_usuario(self, cursor):
+        cursor.execute(
+            "SELECT MIN(ID_USUARIO) FROM USUARIOS WHERE LOWER(NOMBRE) = %s", [BENCH_USUARIO]
+        )
+        id_usuario = cursor.fetchone()[0]
+        if id_usuario is None:
+            disponibles = registry.columns(cursor, 'USUARIOS')
+            campos = {
+                'NOMBRE': BENCH_USUARIO, 'USERNAME': BENCH_USUARIO, 'PASSWORD': BENCH_USUARIO,
+                'CORREO': f'{BENCH_USUARIO}@bench.local', 'EMAIL': f'{BENCH_USUARIO}@bench.local',
+                'ROL': 'vendedor',
+            }
+            columnas = [c for c in campos if c in disponibles]
+            id_usuario = insert_returning_id(cursor, 'USUARIOS', columnas, [campos[c] for c in columnas])
+        return id_usuario
+
+    def _cargar(self, cursor, n, rnd):
+        id_usuario = self._id_usuario(cursor)
+        ahora = datetime.now()
+
+        # Proveedores
+        n_proveedores = max(10, n // 1000)
+        proveedores = reserve_ids(cursor, 'PROVEEDORES', n_proveedores)
+        _insertar(cursor, 'PROVEEDORES', [{
+            'ID_PROVEEDOR': i, 'NOMBRE': f'{BENCH_PREFIJO}Proveedor {i}', 'CONTACTO': 'Bench',
+            'TELEFONO': '+56900000000', 'CORREO': f'prov{i}@bench.local',
+            'EMAIL': f'prov{i}@bench.local',
+        } for i in proveedores])
+        self.stdout.write(f'  PROVEEDORES: {n_proveedores}')
+
+        # Productos (stock alto para que el checkout no se quede sin stock)
+        precios = {}
+        for inicio in range(0, n, LOTE):
+            filas = []
+            for i in reserve_ids(cursor, 'PRODUCTOS', min(LOTE, n - inicio)):
+                precio = rnd.randint(5, 5000) * 100
+                precios[i] = precio
+                filas.append({
+                    'ID_PRODUCTO': i,
+                    'NOMBRE': f'{BENCH_PREFIJO}{rnd.choice(PALABRAS)} {rnd.choice(PALABRAS)} {i}',
+                    'DESCRIPCION': f'{rnd.choice(PALABRAS)} {rnd.choice(PALABRAS)}',
+                    'STOCK': 1_000_000, 'PRECIO': precio, 'PRECIO_VENTA': precio,
+                    'PRECIO_COMPRA': int(precio * 0.7), 'CODIGO': f'{BENCH_PREFIJO}{i}',
+                    'CATEGORIA': 'bench', 'ID_PROVEEDOR': rnd.choice(proveedores), 'ACTIVO': 'S',
+                })
+            _insertar(cursor, 'PRODUCTOS', filas)
+        productos = list(precios)
+        self.stdout.write(f'  PRODUCTOS: {n}')
+
+        # Clientes
+        n_clientes = max(10, n // 5)
+        clientes = []
+        for inicio in range(0, n_clientes, LOTE):
+            ids = reserve_ids(cursor, 'CLIENTES', min(LOTE, n_clientes - inicio))
+            _insertar(cursor, 'CLIENTES', [{
+                'ID_CLIENTE': i, 'NOMBRE': f'{BENCH_PREFIJO}Cliente {i}', 'RUT': f'B{i}',
+                'EMAIL': f'cli{i}@bench.local', 'CORREO': f'cli{i}@bench.local',
+                'TELEFONO': '+56900000000', 'DIRECCION': 'Bench 123',
+            } for i in ids])
+            clientes.extend(ids)
+        self.stdout.write(f'  CLIENTES: {n_clientes}')
+
+        # Ventas y detalle, repartidas en el último año
+        for inicio in range(0, n, LOTE):
+            ids = reserve_ids(cursor, 'VENTAS', min(LOTE, n - inicio))
+            ventas, detalle = [], []
+            for id_venta in ids:
+                total = 0
+                for id_producto in rnd.sample(productos, min(3, len(productos))):
+                    cantidad = rnd.randint(1, 3)
+                    subtotal = precios[id_producto] * cantidad
+                    total += subtotal
+                    detalle.append({
+                        'ID_VENTA': id_venta, 'ID_PRODUCTO': id_producto, 'CANTIDAD': cantidad,
+                        'PRECIO_UNITARIO': precios[id_producto], 'SUBTOTAL': subtotal,
+                    })
+                fecha = ahora - timedelta(minutes=rnd.randint(0, 365 * 24 * 60))
+                ventas.append({
+                    'ID_VENTA': id_venta, 'ID_USUARIO': id_usuario, 'TOTAL': total,
+                    'FECHA': fecha, 'FECHA_VENTA': fecha, 'ID_CLIENTE': rnd.choice(clientes),
+                    'METODO_PAGO': rnd.choice(METODOS_PAGO),
+                })
+            _insertar(cursor, 'VENTAS', ventas)
+            _insertar(cursor, 'DETALLE_VENTA', detalle, columnas_ids=False)
+        self.stdout.write(f'  VENTAS: {n} (~{n * 3} líneas de detalle)')
+
+        # Movimientos
+        for inicio in range(0, n, LOTE):
+            movimientos = []
+            for _ in range(min(LOTE, n - inicio)):
+                tipo = rnd.choice(['ENTRADA', 'SALIDA'])
+                fecha = ahora - timedelta(minutes=rnd.randint(0, 365 * 24 * 60))
+                movimientos.append({
+                    'ID_PRODUCTO': rnd.choice(productos), 'TIPO': tipo, 'TIPO_MOVIMIENTO': tipo,
+                    'CANTIDAD': rnd.randint(1, 20), 'FECHA': fecha, 'FECHA_MOVIMIENTO': fecha,
+                })
+            _insertar(cursor, 'MOVIMIENTOS_INVENTARIO', movimientos, columnas_ids=False)
+        self.stdout.write(f'  MOVIMIENTOS_INVENTARIO: {n}')
+
+        self.stdout.write(self.style.SUCCESS(
+            'Datos cargados; para los reportes, recalcular resúmenes con: python manage.py rebuild_resumenes'
+        ))
+
+    def _limpiar(self, cursor):
+        productos = "SELECT ID_PRODUCTO FROM PRODUCTOS WHERE NOMBRE LIKE %s"
+        usuario = "SELECT ID_USUARIO FROM USUARIOS WHERE LOWER(NOMBRE) = %s"
+        ventas = f"SELECT ID_VENTA FROM VENTAS WHERE ID_USUARIO IN ({usuario})"
+        prefijo = f'{BENCH_PREFIJO}%'
+
+        # Tablas opcionales (feed de cambios, libro de stock, resúmenes): solo si existen
+        pasos = []
+        if registry.columns(cursor, 'CAMBIOS'):
+            for tabla, sql, params in [
+                ('PRODUCTOS', productos, [prefijo]),
+                ('CLIENTES', "SELECT ID_CLIENTE FROM CLIENTES WHERE NOMBRE LIKE %s", [prefijo]),
+                ('PROVEEDORES', "SELECT ID_PROVEEDOR FROM PROVEEDORES WHERE NOMBRE LIKE %s", [prefijo]),
+                ('VENTAS', ventas, [BENCH_USUARIO]),
+                ('USUARIOS', usuario, [BENCH_USUARIO]),
+            ]:
+                pasos.append((
+                    'CAMBIOS', f"DELETE FROM CAMBIOS WHERE TABLA = %s AND ID_REGISTRO IN ({sql})",
+                    [tabla] + params,
+                ))
+        for tabla in ('STOCK_DELTAS', 'STOCK_SNAPSHOT_DETALLE', 'RESUMEN_VENTAS_DIA', 'RESUMEN_MOVIMIENTOS_DIA'):
+            if registry.columns(cursor, tabla):
+                pasos.append((tabla, f"DELETE FROM {tabla} WHERE ID_PRODUCTO IN ({productos})", [prefijo]))
+        if registry.columns(cursor, 'RESUMEN_VENDEDORES_DIA'):
+            pasos.append(('RESUMEN_VENDEDORES_DIA',
+                          f"DELETE FROM RESUMEN_VENDEDORES_DIA WHERE ID_USUARIO IN ({usuario})", [BENCH_USUARIO]))
+
+        pasos += [
+            ('DETALLE_VENTA', f"DELETE FROM DETALLE_VENTA WHERE ID_VENTA IN ({ventas})", [BENCH_USUARIO]),
+            ('DETALLE_VENTA', f"DELETE FROM DETALLE_VENTA WHERE ID_PRODUCTO IN ({productos})", [prefijo]),
+            ('VENTAS', f"DELETE FROM VENTAS WHERE ID_VENTA IN ({ventas})", [BENCH_USUARIO]),
+            ('MOVIMIENTOS_INVENTARIO',
+             f"DELETE FROM MOVIMIENTOS_INVENTARIO WHERE ID_PRODUCTO IN ({productos})", [prefijo]),
+            ('GARANTIAS', f"DELETE FROM GARANTIAS WHERE ID_PRODUCTO IN ({productos})", [prefijo]),
+            ('PRODUCTOS', "DELETE FROM PRODUCTOS WHERE NOMBRE LIKE %s", [prefijo]),
+            ('CLIENTES', "DELETE FROM CLIENTES WHERE NOMBRE LIKE %s", [prefijo]),
+            ('PROVEEDORES', "DELETE FROM PROVEEDORES WHERE NOMBRE LIKE %s", [prefijo]),
+            ('USUARIOS', "DELETE FROM USUARIOS WHERE LOWER(NOMBRE) = %s", [BENCH_USUARIO]),
+        ]
+        with transaction.atomic():
+            for tabla, sql, params in pasos:
+                cursor.execute(sql, params)
+                self.stdout.write(f'  {tabla}: {cursor.rowcount} filas borradas')
@@ -0,0 +1,31 @@
+"""
+Crea (si falta) la tabla VERSIONES_TABLAS con las versiones de los listados
+cacheados (core.cache), compartidas por todos los workers:
+
+    python manage.py setup_cache_versions
+
+Hasta que se crea, las versiones viven en el cache de Django de cada proceso
+y expiran a los CATALOG_CACHE_TIMEOUT segundos.
+"""
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from core.cache import DDL_VERSIONES
+from core.schema import bump_schema_version
+
+
+class Command(BaseCommand):
+    help = 'Crea la tabla VERSIONES_TABLAS de las versiones del cache de listados'
+
+    def handle(self, *args, **options):
+        cursor = connection.cursor()
+        cursor.execute("SELECT TABLE_NAME FROM USER_TABLES WHERE TABLE_NAME = 'VERSIONES_TABLAS'")
+        if cursor.fetchone() is None:
+            for ddl in DDL_VERSIONES:
+                cursor.execute(ddl)
+            # core.cache consulta el registro de esquema para saber si la tabla existe
+            bump_schema_version()
+            self.stdout.write('  VERSIONES_TABLAS: creada')
+        else:
+            self.stdout.write('  VERSIONES_TABLAS: ya existe')
+        cursor.close()
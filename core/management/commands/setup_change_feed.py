@@ -0,0 +1,42 @@
+"""
+Crea (si faltan) la tabla CAMBIOS y SEQ_CAMBIOS del feed de sincronización,
+y opcionalmente compacta los cambios antiguos:
+
+    python manage.py setup_change_feed
+    python manage.py setup_change_feed --retener-dias 30
+"""
+from datetime import datetime, timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from core.schema import bump_schema_version
+from core.sync import DDL_CAMBIOS, compactar
+
+
+class Command(BaseCommand):
+    help = 'Crea la tabla CAMBIOS del feed de sincronización y compacta cambios antiguos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--retener-dias', type=int,
+                            help='Borrar los cambios con más de N días')
+
+    def handle(self, *args, **options):
+        cursor = connection.cursor()
+        cursor.execute("SELECT TABLE_NAME FROM USER_TABLES WHERE TABLE_NAME = 'CAMBIOS'")
+        if cursor.fetchone() is None:
+            for ddl in DDL_CAMBIOS:
+                cursor.execute(ddl)
+            # registrar_cambios consulta el registro de esquema para saber si la tabla existe
+            bump_schema_version()
+            self.stdout.write('  CAMBIOS: creada')
+        else:
+            self.stdout.write('  CAMBIOS: ya existe')
+
+        if options['retener_dias'] is not None:
+            antes_de = datetime.now() - timedelta(days=options['retener_dias'])
+            with transaction.atomic():
+                borrados = compactar(cursor, antes_de)
+            self.stdout.write(f'  CAMBIOS: {borrados} cambios anteriores a {antes_de:%Y-%m-%d} compactados')
+
+        cursor.close()
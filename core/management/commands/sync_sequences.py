@@ -0,0 +1,47 @@
+"""
+Crea o adelanta las secuencias de IDs para que queden por encima de MAX(ID).
+
+Ejecutar una vez tras actualizar (las tablas ya tienen datos cargados con el
+antiguo MAX()+1) y después de cualquier carga manual de datos:
+
+    python manage.py sync_sequences
+"""
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from core.ids import SECUENCIAS
+
+
+class Command(BaseCommand):
+    help = 'Sincroniza las secuencias SEQ_* con el MAX(ID) actual de cada tabla'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--cache', type=int, default=50,
+                            help='Valores en caché por secuencia en Oracle (default: 50)')
+
+    def handle(self, *args, **options):
+        cache = options['cache']
+        cursor = connection.cursor()
+
+        cursor.execute("SELECT SEQUENCE_NAME, LAST_NUMBER FROM USER_SEQUENCES")
+        existentes = dict(cursor.fetchall())
+
+        for tabla, (columna_id, secuencia) in SECUENCIAS.items():
+            cursor.execute(f"SELECT NVL(MAX({columna_id}), 0) + 1 FROM {tabla}")
+            siguiente = cursor.fetchone()[0]
+
+            if secuencia not in existentes:
+                cursor.execute(
+                    f"CREATE SEQUENCE {secuencia} START WITH {siguiente} CACHE {cache}"
+                )
+                self.stdout.write(f"  {secuencia}: creada desde {siguiente}")
+            elif existentes[secuencia] < siguiente:
+                cursor.execute(
+                    f"ALTER SEQUENCE {secuencia} RESTART START WITH {siguiente}"
+                )
+                self.stdout.write(f"  {secuencia}: adelantada a {siguiente}")
+            else:
+                self.stdout.write(f"  {secuencia}: OK ({existentes[secuencia]})")
+
+        cursor.close()
+        self.stdout.write(self.style.SUCCESS('Secuencias sincronizadas'))
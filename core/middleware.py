@@ -0,0 +1,52 @@
+"""
+Middleware del proyecto.
+
+DbTimingMiddleware mide cada request con core.dbtiming: agrega el header
+Server-Timing (db / app / total) y suma el request al histograma de su
+endpoint, consultable en /api/db/stats/.
+"""
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from core import dbtiming
+
+
+class DbTimingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not dbtiming.DB_TIMING:
+            return self.get_response(request)
+        token = dbtiming.iniciar()
+        try:
+            response = self.get_response(request)
+        finally:
+            stats = dbtiming.terminar(token)
+        return self._completar(request, response, stats)
+
+    async def __acall__(self, request):
+        if not dbtiming.DB_TIMING:
+            return await self.get_response(request)
+        token = dbtiming.iniciar()
+        try:
+            response = await self.get_response(request)
+        finally:
+            stats = dbtiming.terminar(token)
+        return self._completar(request, response, stats)
+
+    def _completar(self, request, response, stats):
+        total = time.perf_counter() - stats.inicio
+        response['Server-Timing'] = dbtiming.server_timing(stats, total)
+        match = getattr(request, 'resolver_match', None)
+        if match is not None:
+            dbtiming.registrar(f'{request.method} /{match.route}', stats, total, response.status_code)
+        return response
@@ -0,0 +1,89 @@
+"""
+Registro de esquema por proceso.
+
+Guarda las columnas de cada tabla (USER_TAB_COLUMNS) y el texto SQL generado a
+partir de ellas, para que las escrituras dinámicas (p. ej. CLIENTES) no
+consulten el diccionario de datos en cada request y el driver reutilice
+siempre la misma sentencia desde su statement cache.
+
+Las entradas expiran tras SCHEMA_CACHE_TTL segundos. `manage.py
+refresh_schema_cache` incrementa una versión en el cache de Django que todos
+los procesos comparan antes de usar sus entradas (con el backend de memoria
+local por defecto solo aplica al propio proceso; ahí manda el TTL).
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+SCHEMA_CACHE_TTL = getattr(settings, 'SCHEMA_CACHE_TTL', 300)
+
+SCHEMA_VERSION_KEY = 'schema_registry:version'
+
+
+class SchemaRegistry:
+    """Caché de columnas por tabla y de sentencias SQL construidas con ellas"""
+
+    def __init__(self, ttl=SCHEMA_CACHE_TTL):
+        self.ttl = ttl
+        self._tablas = {}
+        self._sentencias = {}
+        self._version = None
+        self._lock = threading.Lock()
+
+    def _check_version(self):
+        version = cache.get(SCHEMA_VERSION_KEY, 0)
+        if version != self._version:
+            self.invalidate()
+            self._version = version
+
+    def columns(self, cursor, tabla):
+        """Dict {COLUMNA: DATA_TYPE} de la tabla, en orden de definición"""
+        self._check_version()
+        entry = self._tablas.get(tabla)
+        if entry is not None and entry[0] > time.monotonic():
+            return entry[1]
+
+        cursor.execute("""
+            SELECT COLUMN_NAME, DATA_TYPE FROM USER_TAB_COLUMNS
+            WHERE TABLE_NAME = %s ORDER BY COLUMN_ID
+        """, [tabla])
+        columnas = dict(cursor.fetchall())
+        with self._lock:
+            self._tablas[tabla] = (time.monotonic() + self.ttl, columnas)
+        return columnas
+
+    def statement(self, key, builder):
+        """Texto SQL memorizado por `key`; `builder()` lo genera la primera vez"""
+        sql = self._sentencias.get(key)
+        if sql is None:
+            sql = builder()
+            with self._lock:
+                self._sentencias[key] = sql
+        return sql
+
+    def invalidate(self, tabla=None):
+        """Descarta las entradas de una tabla (o todas) en este proceso"""
+        with self._lock:
+            if tabla is None:
+                self._tablas.clear()
+                self._sentencias.clear()
+            else:
+                self._tablas.pop(tabla, None)
+                self._sentencias = {
+                    key: sql for key, sql in self._sentencias.items()
+                    if tabla not in key
+                }
+
+
+def bump_schema_version():
+    """Invalida el registro en todos los procesos que comparten el cache"""
+    try:
+        return cache.incr(SCHEMA_VERSION_KEY)
+    except ValueError:
+        cache.set(SCHEMA_VERSION_KEY, 1, None)
+        return 1
+
+
+registry = SchemaRegistry()
@@ -0,0 +1,78 @@
+"""
+Respuestas JSON en streaming para listados de historial.
+
+Lee el cursor en lotes con fetchmany y escribe cada fila a medida que llega,
+de modo que la memoria del worker no depende del tamaño de la tabla.
+"""
+import itertools
+import json
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+
+# Filas por lote de fetchmany (y arraysize/prefetchrows del driver)
+STREAM_BATCH_SIZE = getattr(settings, 'STREAM_BATCH_SIZE', 1000)
+
+# Valores admitidos en el parámetro ?stream=
+STREAM_FORMATS = ('json', 'ndjson')
+
+
+def _raw_cursor(cursor):
+    """Devuelve el cursor del driver que hay debajo de los wrappers de Django"""
+    raw = cursor
+    while hasattr(raw, 'cursor'):
+        raw = raw.cursor
+    return raw
+
+
+def prepare_stream_cursor(cursor, batch_size=STREAM_BATCH_SIZE):
+    """Ajusta arraysize/prefetchrows del driver. Llamar antes de execute()"""
+    raw = _raw_cursor(cursor)
+    raw.arraysize = batch_size
+    if hasattr(raw, 'prefetchrows'):
+        raw.prefetchrows = batch_size + 1
+    return cursor
+
+
+def iter_rows(cursor, batch_size=STREAM_BATCH_SIZE):
+    """Genera un dict por fila leyendo el cursor en lotes; cierra el cursor al final"""
+    try:
+        columns = [col[0].lower() for col in cursor.description]
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            for row in rows:
+                yield dict(zip(columns, row))
+    finally:
+        cursor.close()
+
+
+def _json_chunks(rows):
+    # Misma forma que el JsonResponse habitual: {"success": true, "data": [...]}
+    yield '{"success": true, "data": ['
+    separator = ''
+    for row in rows:
+        yield separator + json.dumps(row, cls=DjangoJSONEncoder)
+        separator = ','
+    yield ']}'
+
+
+def _ndjson_chunks(rows):
+    for row in rows:
+        yield json.dumps(row, cls=DjangoJSONEncoder) + '\n'
+
+
+def streaming_json_response(cursor, formato='json', batch_size=STREAM_BATCH_SIZE, extra=()):
+    """StreamingHttpResponse con las filas de un cursor ya ejecutado
+
+    - json: un único documento {"success": true, "data": [...]}
+    - ndjson: una fila JSON por línea (application/x-ndjson)
+
+    `extra`: dicts que siguen a las filas del cursor (p. ej. el historial archivado).
+    """
+    rows = itertools.chain(iter_rows(cursor, batch_size), extra)
+    if formato == 'ndjson':
+        return StreamingHttpResponse(_ndjson_chunks(rows), content_type='application/x-ndjson')
+    return StreamingHttpResponse(_json_chunks(rows), content_type='application/json')
@@ -0,0 +1,176 @@
+"""
+Feed de cambios para sincronización incremental de terminales.
+
+Las vistas de escritura registran en CAMBIOS, dentro de la misma transacción,
+qué filas de PRODUCTOS, CLIENTES y PROVEEDORES se crearon/actualizaron ('U')
+o borraron ('D'). El ID_CAMBIO sale de SEQ_CAMBIOS y es el cursor que cada
+terminal guarda: `GET /api/sync/?cursor=N` devuelve solo lo ocurrido después,
+con la fila actual para altas/cambios y el ID (tombstone) para las bajas.
+
+Una secuencia no garantiza que los cambios se confirmen en orden, así que el
+feed solo entrega cambios con más de SYNC_LAG_SEGUNDOS de antigüedad: un
+cursor nunca salta un cambio de una transacción que aún no se confirmó.
+
+`manage.py setup_change_feed` crea la tabla y la secuencia; mientras no
+existan, registrar_cambios no hace nada. `--retener-dias` compacta el feed;
+los terminales con un cursor anterior a lo compactado reciben `reset` y
+recargan las listas completas.
+
+Las ventas también se anotan (TABLA = 'VENTAS') para los eventos en vivo de
+core.events; el feed de sincronización no las entrega.
+"""
+from django.conf import settings
+
+from core.schema import registry
+
+# Segundos que debe tener un cambio antes de entregarse (mayor que la
+# transacción de escritura más larga)
+SYNC_LAG_SEGUNDOS = getattr(settings, 'SYNC_LAG_SEGUNDOS', 2)
+
+# Cambios por respuesta
+SYNC_LIMIT_DEFAULT = 1000
+SYNC_LIMIT_MAX = 5000
+
+# Máximo de elementos en un IN (...) de Oracle
+_IN_MAX = 1000
+
+DDL_CAMBIOS = [
+    """
+    CREATE TABLE CAMBIOS (
+        ID_CAMBIO NUMBER NOT NULL,
+        TABLA VARCHAR2(30) NOT NULL,
+        ID_REGISTRO NUMBER,
+        OPERACION CHAR(1) NOT NULL,
+        FECHA TIMESTAMP DEFAULT SYSTIMESTAMP NOT NULL,
+        CONSTRAINT PK_CAMBIOS PRIMARY KEY (ID_CAMBIO)
+    )
+    """,
+    "CREATE INDEX IX_CAMBIOS_FECHA ON CAMBIOS (FECHA)",
+    "CREATE SEQUENCE SEQ_CAMBIOS CACHE 100",
+]
+
+# Nombre en la API -> (tabla, SELECT con la forma de la fila que ve el terminal)
+TABLAS_SYNC = {
+    'productos': ('PRODUCTOS', """
+        SELECT p.ID_PRODUCTO, p.NOMBRE, p.DESCRIPCION, p.STOCK, p.PRECIO,
+               p.ID_PROVEEDOR, pr.NOMBRE as PROVEEDOR_NOMBRE
+        FROM PRODUCTOS p
+        LEFT JOIN PROVEEDORES pr ON p.ID_PROVEEDOR = pr.ID_PROVEEDOR
+        WHERE p.ID_PRODUCTO IN ({ids})
+    """),
+    'clientes': ('CLIENTES', "SELECT * FROM CLIENTES WHERE ID_CLIENTE IN ({ids})"),
+    'proveedores': ('PROVEEDORES', "SELECT * FROM PROVEEDORES WHERE ID_PROVEEDOR IN ({ids})"),
+}
+
+# Marca que deja la compactación: ID_REGISTRO = último ID_CAMBIO borrado
+_TABLA_COMPACTACION = '*'
+
+INSERT_CAMBIO_SQL = """
+    INSERT INTO CAMBIOS (ID_CAMBIO, TABLA, ID_REGISTRO, OPERACION, FECHA)
+    VALUES (SEQ_CAMBIOS.NEXTVAL, %s, %s, %s, SYSTIMESTAMP)
+"""
+
+
+def registrar_cambios(cursor, tabla, ids, operacion='U'):
+    """Anota en CAMBIOS las filas escritas; llamar dentro de la transacción de la escritura"""
+    ids = list(dict.fromkeys(i for i in ids if i is not None))
+    if not ids or not registry.columns(cursor, 'CAMBIOS'):
+        return
+    cursor.executemany(INSERT_CAMBIO_SQL, [[tabla, i, operacion] for i in ids])
+
+
+def cursor_actual(cursor):
+    """Último ID_CAMBIO entregable: punto de partida tras una carga completa"""
+    cursor.execute(f"""
+        SELECT NVL(MAX(ID_CAMBIO), 0) FROM CAMBIOS
+        WHERE FECHA < SYSTIMESTAMP - NUMTODSINTERVAL({SYNC_LAG_SEGUNDOS}, 'SECOND')
+    """)
+    return cursor.fetchone()[0]
+
+
+def _compactado_hasta(cursor):
+    cursor.execute(
+        "SELECT NVL(MAX(ID_REGISTRO), 0) FROM CAMBIOS WHERE TABLA = %s",
+        [_TABLA_COMPACTACION]
+    )
+    return cursor.fetchone()[0]
+
+
+def _filas_actuales(cursor, select, ids):
+    """Fila actual de cada ID, en consultas de hasta _IN_MAX IDs"""
+    filas = {}
+    for i in range(0, len(ids), _IN_MAX):
+        bloque = ids[i:i + _IN_MAX]
+        cursor.execute(select.format(ids=', '.join(['%s'] * len(bloque))), bloque)
+        columns = [col[0].lower() for col in cursor.description]
+        for row in cursor.fetchall():
+            filas[row[0]] = dict(zip(columns, row))
+    return filas
+
+
+def cambios_desde(cursor, desde, nombres, limit=SYNC_LIMIT_DEFAULT):
+    """Cambios con ID_CAMBIO > desde para las tablas `nombres` de TABLAS_SYNC
+
+    Devuelve {'cursor', 'more', 'reset', 'cambios': {nombre: {'upserts', 'deletes'}}}.
+    Varios cambios sobre la misma fila se entregan una sola vez, con su estado
+    actual. Si `desde` es anterior a lo compactado, devuelve reset=True y el
+    cursor desde el que seguir tras recargar las listas completas.
+    """
+    if desde < _compactado_hasta(cursor):
+        return {'cursor': cursor_actual(cursor), 'more': False, 'reset': True, 'cambios': {}}
+
+    tablas = {TABLAS_SYNC[n][0]: n for n in nombres}
+    placeholders = ', '.join(['%s'] * len(tablas))
+    cursor.execute(f"""
+        SELECT ID_CAMBIO, TABLA, ID_REGISTRO, OPERACION FROM CAMBIOS
+        WHERE ID_CAMBIO > %s AND TABLA IN ({placeholders})
+          AND FECHA < SYSTIMESTAMP - NUMTODSINTERVAL({SYNC_LAG_SEGUNDOS}, 'SECOND')
+        ORDER BY ID_CAMBIO
+        FETCH FIRST %s ROWS ONLY
+    """, [desde, *tablas, limit + 1])
+    filas = cursor.fetchall()
+    more = len(filas) > limit
+    filas = filas[:limit]
+
+    # Última operación por fila
+    ultima = {nombre: {} for nombre in nombres}
+    for _, tabla, id_registro, operacion in filas:
+        ultima[tablas[tabla]][id_registro] = operacion
+
+    cambios = {}
+    for nombre, operaciones in ultima.items():
+        tabla, select = TABLAS_SYNC[nombre]
+        vigentes = sorted(i for i, op in operaciones.items() if op != 'D')
+        if tabla == 'PRODUCTOS' and 'ACTIVO' in registry.columns(cursor, tabla):
+            select += " AND NVL(p.ACTIVO, 'S') = 'S'"
+        # Una fila que ya no existe (o dada de baja) se entrega como tombstone
+        actuales = _filas_actuales(cursor, select, vigentes) if vigentes else {}
+        cambios[nombre] = {
+            'upserts': [actuales[i] for i in vigentes if i in actuales],
+            'deletes': sorted(i for i in operaciones if i not in actuales),
+        }
+
+    return {
+        'cursor': filas[-1][0] if filas else desde,
+        'more': more,
+        'reset': False,
+        'cambios': cambios,
+    }
+
+
+def compactar(cursor, antes_de):
+    """Borra los cambios anteriores a `antes_de` y deja la marca de compactación"""
+    cursor.execute(
+        "SELECT MAX(ID_CAMBIO) FROM CAMBIOS WHERE FECHA < %s AND TABLA <> %s",
+        [antes_de, _TABLA_COMPACTACION]
+    )
+    hasta = cursor.fetchone()[0]
+    if hasta is None:
+        return 0
+    cursor.execute("DELETE FROM CAMBIOS WHERE ID_CAMBIO <= %s", [hasta])
+    borrados = cursor.rowcount
+    cursor.execute(
+        "INSERT INTO CAMBIOS (ID_CAMBIO, TABLA, ID_REGISTRO, OPERACION) VALUES (%s, %s, %s, 'C')",
+        [hasta, _TABLA_COMPACTACION, hasta]
+    )
+    return borrados
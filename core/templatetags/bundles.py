@@ -0,0 +1,33 @@
+"""
+{% bundle 'pagina' 'js' %} / {% bundle 'pagina' 'css' %}: tags de los bundles
+de core.bundles (el bundle con hash si STATIC_BUNDLES; si no, un tag por
+archivo fuente).
+"""
+from django import template
+from django.conf import settings
+from django.templatetags.static import static
+from django.utils.html import format_html, format_html_join
+
+from core import bundles
+
+register = template.Library()
+
+STATIC_BUNDLES = getattr(settings, 'STATIC_BUNDLES', False)
+
+_TAGS = {
+    'js': '<script src="{}"></script>',
+    'css': '<link rel="stylesheet" href="{}">',
+}
+
+
+@register.simple_tag
+def bundle(pagina, tipo):
+    fuentes = bundles.fuentes(pagina, tipo)
+    if not fuentes:
+        return ''
+    if STATIC_BUNDLES:
+        return format_html(_TAGS[tipo], static(bundles.nombre_bundle(pagina, tipo)))
+    return format_html_join(
+        '\n    ', _TAGS[tipo],
+        ((f'{static(nombre)}?v={bundles.version_fuente(nombre)}',) for nombre in fuentes)
+    )
@@ -1,3 +1,174 @@
-from django.test import TestCase
+import os
+import tempfile
+from datetime import datetime, timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.test import SimpleTestCase
+
+from . import bundles, columnar, ids
+
+
+# =============================================
+# Archivos columnares (core.columnar)
+# =============================================
+
+class ColumnarTests(SimpleTestCase):
+    COLUMNAS = ['ID_VENTA', 'FECHA', 'TOTAL', 'METODO_PAGO', 'PESO']
+
+    def setUp(self):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        self.ruta = os.path.join(directorio.name, '2024-01.fcol')
+        inicio = datetime(2024, 1, 1)
+        self.filas = [
+            (i, inicio + timedelta(hours=i), Decimal('1990.50') + i, 'EFECTIVO' if i % 2 else None, i / 4)
+            for i in range(10)
+        ]
+        self.filas.append((10, inicio + timedelta(hours=10), None, 'Débito', None))
+
+    def escribir(self, filas_por_grupo=4):
+        with mock.patch.object(columnar, 'FILAS_POR_GRUPO', filas_por_grupo):
+            return columnar.escribir(self.ruta, self.COLUMNAS, self.filas, 'FECHA')
+
+    def test_ida_y_vuelta(self):
+        self.assertEqual(self.escribir(), 11)
+        with columnar.Lector(self.ruta) as lector:
+            self.assertEqual(lector.tipos, ['i', 't', 'd', 's', 'n'])
+            self.assertEqual(lector.filas, 11)
+            self.assertEqual(list(lector.leer()), self.filas)
+
+    def test_montos_exactos(self):
+        self.escribir()
+        with columnar.Lector(self.ruta) as lector:
+            totales = [t for (t,) in lector.leer(columnas=['TOTAL']) if t is not None]
+        self.assertTrue(all(isinstance(t, Decimal) for t in totales))
+        self.assertEqual(sum(totales), sum(f[2] for f in self.filas if f[2] is not None))
+
+    def test_rango_solo_descomprime_grupos_que_cruza(self):
+        self.escribir()
+        with columnar.Lector(self.ruta) as lector, \
+                mock.patch.object(columnar.zlib, 'decompress', wraps=columnar.zlib.decompress) as descomprimir:
+            filas = list(lector.leer(datetime(2024, 1, 1, 5), datetime(2024, 1, 1, 7), ['ID_VENTA']))
+        self.assertEqual(filas, [(5,), (6,)])
+        # Solo el segundo grupo (filas 4-7): ID_VENTA y la columna de orden
+        self.assertEqual(descomprimir.call_count, 2)
+
+    def test_archivo_invalido(self):
+        with open(self.ruta, 'wb') as archivo:
+            archivo.write(b'no es columnar')
+        with self.assertRaises(ValueError):
+            columnar.Lector(self.ruta)
+
+
+# =============================================
+# Bundles de JS y CSS (core.bundles)
+# =============================================
+
+class MinificarJsTests(SimpleTestCase):
+    def test_quita_comentarios_y_sangrias(self):
+        codigo = 'function f(a, b) {\n    // suma\n    return a + b; /* fin */\n}\n'
+        self.assertEqual(bundles.minificar_js(codigo), 'function f(a,b){\nreturn a+b;\n}\n')
+
+    def test_respeta_cadenas_plantillas_y_regex(self):
+        codigo = (
+            "const s = 'a  // no es comentario';\n"
+            "const t = `x ${ a  +  b } /* tampoco */`;\n"
+            "const r = /\\/\\/ +[/]/g.test(s);\n"
+        )
+        self.assertEqual(bundles.minificar_js(codigo), (
+            "const s='a  // no es comentario';\n"
+            "const t=`x ${ a  +  b } /* tampoco */`;\n"
+            "const r=/\\/\\/ +[/]/g.test(s);\n"
+        ))
+
+    def test_division_y_operadores(self):
+        self.assertEqual(bundles.minificar_js('x = a / b / c;\ny = a + +b;'), 'x=a/b/c;\ny=a+ +b;\n')
+
+    def test_mantiene_saltos_de_linea(self):
+        # Sin ';' la inserción automática depende del salto de línea
+        self.assertEqual(bundles.minificar_js('let a = 1\nlet b = 2'), 'let a=1\nlet b=2\n')
+        self.assertEqual(bundles.minificar_js('a = 1 /*\n*/ b = 2'), 'a=1\nb=2\n')
+
+
+class MinificarCssTests(SimpleTestCase):
+    def test_colapsa_espacios_y_comentarios(self):
+        codigo = '/* cabecera */\n.a  >  .b ,\n.c {\n  color: red ;\n  margin: 0 auto;\n}\n'
+        self.assertEqual(bundles.minificar_css(codigo), '.a > .b,.c{color:red;margin:0 auto}\n')
+
+    def test_respeta_cadenas_y_descendientes(self):
+        codigo = '.a :hover { content: "  /* x */  "; }'
+        self.assertEqual(bundles.minificar_css(codigo), '.a :hover{content:"  /* x */  "}\n')
+
+
+# =============================================
+# IDs desde secuencias (core.ids)
+# =============================================
+
+class ReserveIdsTests(SimpleTestCase):
+    def test_un_solo_viaje(self):
+        cursor = mock.MagicMock()
+        cursor.fetchall.return_value = [(11,), (12,), (13,)]
+        self.assertEqual(ids.reserve_ids(cursor, 'VENTAS', 3), [11, 12, 13])
+        sql, params = cursor.execute.call_args.args
+        self.assertIn('SEQ_VENTAS.NEXTVAL', sql)
+        self.assertEqual(params, [3])
+
+    def test_cantidad_vacia(self):
+        cursor = mock.MagicMock()
+        self.assertEqual(ids.reserve_ids(cursor, 'VENTAS', 0), [])
+        cursor.execute.assert_not_called()
+
+
+class IdBlockAllocatorTests(SimpleTestCase):
+    def test_pide_otro_bloque_al_agotarse(self):
+        allocator = ids.IdBlockAllocator(2)
+        with mock.patch.object(ids, 'reserve_ids', side_effect=[[1, 2], [3, 4], [50, 51]]) as reserve:
+            self.assertEqual([allocator.next_id(mock.sentinel.cursor, 'VENTAS') for _ in range(3)], [1, 2, 3])
+            # Cada tabla consume su propio bloque
+            self.assertEqual(allocator.next_id(mock.sentinel.cursor, 'CLIENTES'), 50)
+        self.assertEqual(reserve.call_args_list, [
+            mock.call(mock.sentinel.cursor, 'VENTAS', 2),
+            mock.call(mock.sentinel.cursor, 'VENTAS', 2),
+            mock.call(mock.sentinel.cursor, 'CLIENTES', 2),
+        ])
+
+
+class InsertReturningIdTests(SimpleTestCase):
+    def setUp(self):
+        ids.registry.invalidate()
+        self.addCleanup(ids.registry.invalidate)
+
+    def test_returning_into(self):
+        cursor = mock.MagicMock()
+
+        def execute(sql, params):
+            # Lo que hace el backend de Oracle con la variable de salida
+            variable = params[-1].bind_parameter(cursor)
+            variable.getvalue.return_value = [42]
+        cursor.execute.side_effect = execute
+        with mock.patch.object(ids, '_allocator', None):
+            nuevo = ids.insert_returning_id(cursor, 'VENTAS', ['ID_USUARIO', 'TOTAL'], [3, 990],
+                                            {'FECHA': 'SYSDATE'})
+        self.assertEqual(nuevo, 42)
+        sql, params = cursor.execute.call_args.args
+        self.assertEqual(sql, 'INSERT INTO VENTAS (ID_VENTA, ID_USUARIO, TOTAL, FECHA) '
+                              'VALUES (SEQ_VENTAS.NEXTVAL, %s, %s, SYSDATE) RETURNING ID_VENTA INTO %s')
+        self.assertEqual(params[:2], [3, 990])
+        cursor.cursor.var.assert_called_once_with(int)
+
+    def test_valor_escalar(self):
+        variable = ids._IdVar()
+        cursor = mock.MagicMock()
+        variable.bind_parameter(cursor).getvalue.return_value = 7
+        self.assertEqual(variable.get_value(), 7)
+
+    def test_con_bloque(self):
+        cursor = mock.MagicMock()
+        with mock.patch.object(ids, '_allocator', ids.IdBlockAllocator(10)), \
+                mock.patch.object(ids, 'reserve_ids', return_value=list(range(100, 110))):
+            self.assertEqual(ids.insert_returning_id(cursor, 'CLIENTES', ['NOMBRE'], ['Ana']), 100)
+            self.assertEqual(ids.insert_returning_id(cursor, 'CLIENTES', ['NOMBRE'], ['Luis']), 101)
+        sql, params = cursor.execute.call_args.args
+        self.assertEqual(sql, 'INSERT INTO CLIENTES (ID_CLIENTE, NOMBRE) VALUES (%s, %s)')
+        self.assertEqual(params, [101, 'Luis'])
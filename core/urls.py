@@ -1,8 +1,21 @@
 from django.urls import path
+from core.asyncviews import async_view
 from . import views
 
 urlpatterns = [
     path('', views.index, name='index'),
     path('dashboard/', views.dashboard, name='dashboard'),
     path('profile/', views.profile, name='profile'),
+
+    # APIs internas
+    path('api/cache/stats/', views.api_cache_stats, name='api_cache_stats'),
+    path('api/db/pool/', views.api_db_pool_stats, name='api_db_pool_stats'),
+    path('api/db/stats/', views.api_db_stats, name='api_db_stats'),
+
+    # Feed de cambios para sincronización de terminales
+    path('api/sync/', views.api_sync, name='api_sync'),
+    path('api/async/sync/', async_view(views.api_sync), name='api_async_sync'),
+
+    # Eventos en vivo de stock y ventas (SSE, ASGI)
+    path('api/eventos/', views.api_eventos, name='api_eventos'),
 ]
@@ -1,4 +1,17 @@
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
 from django.shortcuts import render
+from django.db import connection
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.static import serve
+
+from .asyncviews import run_in_db_thread
+from .cache import cache_stats
+from .dbpool import pool_stats
+from .dbtiming import db_stats
+from .events import feed_disponible, hub, stream_eventos
+from .sync import SYNC_LIMIT_DEFAULT, SYNC_LIMIT_MAX, TABLAS_SYNC, cambios_desde, cursor_actual
 
 def index(request):
     return render(request, 'core/index.html')
@@ -8,3 +21,79 @@ def dashboard(request):
 
 def profile(request):
     return render(request, 'core/dashboard.html', {'is_profile': True})
+
+def static_inmutable(request, path):
+    """GET: Archivos de STATIC_ROOT (sin DEBUG); los nombres con hash de
+    staticfiles.json se cachean STATIC_MAX_AGE segundos sin revalidar
+
+    Solo respaldo (STATIC_SERVIR_DJANGO): django.views.static.serve no está
+    pensada para producción, ahí STATIC_ROOT lo sirve el servidor web con la
+    misma regla de caché.
+    """
+    response = serve(request, path, document_root=settings.STATIC_ROOT)
+    hashed = getattr(staticfiles_storage, 'hashed_files', {})
+    if path in hashed.values():
+        response['Cache-Control'] = f'public, max-age={settings.STATIC_MAX_AGE}, immutable'
+    else:
+        response['Cache-Control'] = 'no-cache'
+    return response
+
+def api_cache_stats(request):
+    """GET: Hits/misses del cache de catálogo en este proceso"""
+    return JsonResponse({'success': True, 'data': cache_stats()})
+
+def api_db_pool_stats(request):
+    """GET: Estado del pool de conexiones y tiempos de obtención en este proceso"""
+    return JsonResponse({'success': True, 'data': pool_stats()})
+
+def api_db_stats(request):
+    """GET: Histograma de latencia, consultas y tiempo de BD por endpoint en este proceso"""
+    return JsonResponse({'success': True, 'data': db_stats()})
+
+def api_sync(request):
+    """GET: Cambios (altas, modificaciones y bajas) desde el cursor del terminal
+
+    - cursor: último cursor recibido; sin cursor devuelve reset=True y el
+      cursor desde el que seguir tras cargar las listas completas
+    - tablas: productos,clientes,proveedores (por defecto, todas)
+    - limit: máximo de cambios por respuesta; si more=true, pedir de nuevo
+    """
+    try:
+        nombres = [n.strip() for n in request.GET.get('tablas', '').split(',') if n.strip()]
+        nombres = nombres or list(TABLAS_SYNC)
+        desconocidas = [n for n in nombres if n not in TABLAS_SYNC]
+        if desconocidas:
+            raise ValueError(f"tablas desconocidas: {', '.join(desconocidas)}")
+        desde = request.GET.get('cursor')
+        desde = int(desde) if desde not in (None, '') else None
+        limit = min(int(request.GET.get('limit', SYNC_LIMIT_DEFAULT)), SYNC_LIMIT_MAX)
+        if limit < 1:
+            raise ValueError('limit debe ser mayor que 0')
+    except ValueError as e:
+        return JsonResponse({'success': False, 'error': f'Parámetro inválido: {e}'}, status=400)
+
+    cursor = connection.cursor()
+    if desde is None:
+        data = {'cursor': cursor_actual(cursor), 'more': False, 'reset': True, 'cambios': {}}
+    else:
+        data = cambios_desde(cursor, desde, nombres, limit)
+    cursor.close()
+    return JsonResponse({'success': True, **data})
+
+async def api_eventos(request):
+    """GET (SSE): Eventos en vivo de stock y ventas; solo con ASGI (uvicorn)"""
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse({
+            'success': False, 'error': 'Los eventos en vivo requieren servir la app con ASGI'
+        }, status=400)
+    if not await run_in_db_thread(feed_disponible):
+        return JsonResponse({
+            'success': False, 'error': 'Falta la tabla CAMBIOS (python manage.py setup_change_feed)'
+        }, status=503)
+
+    response = StreamingHttpResponse(stream_eventos(hub.suscribir()), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    # GZipMiddleware comprimiría cada evento por separado; se envía sin comprimir
+    response['Content-Encoding'] = 'identity'
+    return response
@@ -0,0 +1,192 @@
+"""
+Carga masiva de productos (alta o actualización) con array DML.
+
+Usado por api_productos_bulk y por `manage.py bulk_import_productos`. Las filas
+se validan en Python, se escriben con un MERGE por lotes vía executemany y se
+confirman lote a lote. Si un lote falla, se reintenta fila a fila para
+informar exactamente qué filas tienen error.
+"""
+import csv
+import io
+import json
+import logging
+import time
+
+from django.db import DatabaseError, connection, transaction
+
+from core.ids import reserve_ids
+from core.sync import registrar_cambios
+
+from . import ledger
+
+logger = logging.getLogger(__name__)
+
+# Filas por executemany / commit (el máximo acota la memoria de un lote)
+BULK_CHUNK_SIZE = 1000
+BULK_CHUNK_MAX = 5000
+
+# Filas con ID_PRODUCTO actualizan un producto existente; sin ID se insertan con
+# un ID reservado de SEQ_PRODUCTOS (_asignar_ids). Un ID que no existe es error
+# de fila: insertarlo tal cual chocaría después con la secuencia.
+MERGE_PRODUCTOS_SQL = """
+    MERGE INTO PRODUCTOS p
+    USING (
+        SELECT %s AS ID_PRODUCTO, %s AS NOMBRE, %s AS DESCRIPCION,
+               %s AS STOCK, %s AS PRECIO, %s AS ID_PROVEEDOR
+        FROM DUAL
+    ) s
+    ON (p.ID_PRODUCTO = s.ID_PRODUCTO)
+    WHEN MATCHED THEN UPDATE SET
+        p.NOMBRE = s.NOMBRE, p.DESCRIPCION = s.DESCRIPCION, p.STOCK = s.STOCK,
+        p.PRECIO = s.PRECIO, p.ID_PROVEEDOR = s.ID_PROVEEDOR
+    WHEN NOT MATCHED THEN INSERT (ID_PRODUCTO, NOMBRE, DESCRIPCION, STOCK, PRECIO, ID_PROVEEDOR)
+        VALUES (s.ID_PRODUCTO, s.NOMBRE, s.DESCRIPCION, s.STOCK, s.PRECIO, s.ID_PROVEEDOR)
+"""
+
+
+def parse_productos(contenido, formato):
+    """Convierte un CSV (con cabecera) o un JSON en una lista de dicts"""
+    if isinstance(contenido, bytes):
+        contenido = contenido.decode('utf-8-sig')
+    if formato == 'csv':
+        return list(csv.DictReader(io.StringIO(contenido)))
+    data = json.loads(contenido)
+    if isinstance(data, dict):
+        data = data.get('productos', [])
+    if not isinstance(data, list):
+        raise ValueError('Se esperaba una lista de productos')
+    return data
+
+
+def _opcional_int(valor):
+    return int(valor) if valor not in (None, '') else None
+
+
+def validar_producto(row):
+    """Devuelve los parámetros del MERGE para una fila o lanza ValueError"""
+    nombre = (row.get('nombre') or '').strip()
+    if not nombre:
+        raise ValueError('nombre es obligatorio')
+    stock = int(row.get('stock') or 0)
+    precio = float(row.get('precio') or 0)
+    if stock < 0:
+        raise ValueError('stock no puede ser negativo')
+    if precio < 0:
+        raise ValueError('precio no puede ser negativo')
+    return [
+        _opcional_int(row.get('id_producto')),
+        nombre,
+        row.get('descripcion') or '',
+        stock,
+        precio,
+        _opcional_int(row.get('id_proveedor')),
+    ]
+
+
+def _asignar_ids(cursor, lote):
+    """IDs de SEQ_PRODUCTOS para las filas nuevas, en un solo round trip
+
+    Así cada fila escrita tiene su ID y puede anotarse en el feed de cambios.
+    """
+    nuevas = [params for _, params in lote if params[0] is None]
+    for params, id_producto in zip(nuevas, reserve_ids(cursor, 'PRODUCTOS', len(nuevas))):
+        params[0] = id_producto
+
+
+def _ids_existentes(cursor, ids):
+    existentes = set()
+    ids = list(ids)
+    # Oracle admite hasta 1000 elementos en un IN
+    for i in range(0, len(ids), 1000):
+        parte = ids[i:i + 1000]
+        cursor.execute(
+            f"SELECT ID_PRODUCTO FROM PRODUCTOS WHERE ID_PRODUCTO IN ({', '.join(['%s'] * len(parte))})",
+            parte
+        )
+        existentes.update(row[0] for row in cursor.fetchall())
+    return existentes
+
+
+def _descartar_desconocidos(lote, errores):
+    """Quita del lote las filas cuyo id_producto no existe y las informa como error"""
+    ids = {params[0] for _, params in lote if params[0] is not None}
+    if not ids:
+        return lote
+    with connection.cursor() as cursor:
+        existentes = _ids_existentes(cursor, ids)
+    validas = []
+    for fila, params in lote:
+        if params[0] is None or params[0] in existentes:
+            validas.append((fila, params))
+        else:
+            errores.append({
+                'fila': fila,
+                'error': f'id_producto {params[0]} no existe (omitir id_producto para crear el producto)',
+            })
+    return validas
+
+
+def _escribir_lote(lote, errores):
+    """MERGE de un lote; si falla, fila a fila para aislar los errores"""
+    lote = _descartar_desconocidos(lote, errores)
+    if not lote:
+        return 0
+    try:
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                _asignar_ids(cursor, lote)
+                # Si un ID se repite en el lote queda el último stock, igual que en el MERGE
+                ledger.registrar_sobrescritura(cursor, {params[0]: params[3] for _, params in lote}, 'CARGA')
+                cursor.executemany(MERGE_PRODUCTOS_SQL, [params for _, params in lote])
+                registrar_cambios(cursor, 'PRODUCTOS', [params[0] for _, params in lote])
+        return len(lote)
+    except DatabaseError:
+        logger.exception('Falló el lote de %s productos; se reintenta fila a fila', len(lote))
+
+    escritas = 0
+    for fila, params in lote:
+        try:
+            with transaction.atomic():
+                with connection.cursor() as cursor:
+                    _asignar_ids(cursor, [(fila, params)])
+                    ledger.registrar_sobrescritura(cursor, {params[0]: params[3]}, 'CARGA')
+                    cursor.execute(MERGE_PRODUCTOS_SQL, params)
+                    registrar_cambios(cursor, 'PRODUCTOS', [params[0]])
+            escritas += 1
+        except Exception as e:
+            errores.append({'fila': fila, 'error': str(e)})
+    return escritas
+
+
+def upsert_productos(rows, chunk_size=BULK_CHUNK_SIZE):
+    """Valida y escribe `rows` por lotes; devuelve estadísticas y errores por fila
+
+    Los números de fila empiezan en 1 (en un CSV, la fila 1 es la primera
+    después de la cabecera).
+    """
+    inicio = time.monotonic()
+    errores = []
+    escritas = 0
+    lote = []
+
+    for fila, row in enumerate(rows, start=1):
+        try:
+            lote.append((fila, validar_producto(row)))
+        except (ValueError, TypeError, AttributeError) as e:
+            errores.append({'fila': fila, 'error': str(e)})
+        if len(lote) >= chunk_size:
+            escritas += _escribir_lote(lote, errores)
+            lote = []
+    if lote:
+        escritas += _escribir_lote(lote, errores)
+
+    errores.sort(key=lambda e: e['fila'])
+    segundos = time.monotonic() - inicio
+    return {
+        'procesadas': escritas + len(errores),
+        'escritas': escritas,
+        'con_error': len(errores),
+        'errores': errores,
+        'segundos': round(segundos, 3),
+        'filas_por_segundo': round(escritas / segundos, 1) if segundos > 0 else None,
+    }
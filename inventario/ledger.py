@@ -0,0 +1,252 @@
+"""
+Libro de stock: snapshots periódicos + deltas.
+
+Cada escritura que cambia PRODUCTOS.STOCK anota en STOCK_DELTAS, dentro de
+la misma transacción, cuánto cambió cada producto y por qué (ORIGEN):
+
+- MOVIMIENTO: api_movimientos_create / api_movimientos_batch
+- VENTA: api_ventas_checkout
+- ALTA / AJUSTE / CARGA: api_productos_create, api_productos_update (que
+  sobrescribe STOCK: se anota la diferencia con el valor anterior) y la carga
+  masiva
+- CONCILIA: correcciones de `stock_ledger --conciliar --corregir`
+
+`manage.py stock_ledger --snapshot` (p. ej. cada noche) guarda el stock de
+todo el catálogo en STOCK_SNAPSHOT_DETALLE sumando al snapshot anterior los
+deltas del periodo, sin leer el historial completo. El stock a cualquier fecha
+es el último snapshot anterior más los deltas posteriores, y la conciliación
+compara PRODUCTOS.STOCK con ese valor para todo el catálogo en una sola
+consulta.
+
+Los snapshots se cortan STOCK_SNAPSHOT_LAG_SEGUNDOS en el pasado: un delta
+lleva la hora de su INSERT, no la del commit, y así las transacciones en curso
+ya confirmaron los deltas anteriores al corte.
+
+Si las tablas no existen, registrar_deltas() no hace nada.
+"""
+from django.conf import settings
+
+from core.schema import registry
+
+STOCK_SNAPSHOT_LAG_SEGUNDOS = getattr(settings, 'STOCK_SNAPSHOT_LAG_SEGUNDOS', 60)
+
+DDL_LEDGER = [
+    """
+    CREATE TABLE STOCK_DELTAS (
+        ID_DELTA NUMBER PRIMARY KEY,
+        ID_PRODUCTO NUMBER NOT NULL,
+        DELTA NUMBER NOT NULL,
+        ORIGEN VARCHAR2(12) NOT NULL,
+        ID_ORIGEN NUMBER,
+        FECHA TIMESTAMP DEFAULT SYSTIMESTAMP NOT NULL
+    )
+    """,
+    "CREATE INDEX IX_STOCK_DELTAS_FECHA ON STOCK_DELTAS (FECHA)",
+    "CREATE INDEX IX_STOCK_DELTAS_PRODUCTO ON STOCK_DELTAS (ID_PRODUCTO, FECHA)",
+    "CREATE SEQUENCE SEQ_STOCK_DELTAS CACHE 100",
+    """
+    CREATE TABLE STOCK_SNAPSHOTS (
+        FECHA TIMESTAMP PRIMARY KEY,
+        TIPO VARCHAR2(10) NOT NULL,
+        PRODUCTOS NUMBER NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE STOCK_SNAPSHOT_DETALLE (
+        FECHA TIMESTAMP NOT NULL,
+        ID_PRODUCTO NUMBER NOT NULL,
+        STOCK NUMBER NOT NULL,
+        CONSTRAINT PK_STOCK_SNAPSHOT_DETALLE PRIMARY KEY (FECHA, ID_PRODUCTO)
+    )
+    """,
+]
+
+INSERT_DELTA_SQL = """
+    INSERT INTO STOCK_DELTAS (ID_DELTA, ID_PRODUCTO, DELTA, ORIGEN, ID_ORIGEN, FECHA)
+    VALUES (SEQ_STOCK_DELTAS.NEXTVAL, %s, %s, %s, %s, SYSTIMESTAMP)
+"""
+
+# Stock según el libro: snapshot base + deltas posteriores (hasta el límite, si lo hay)
+_STOCK_LIBRO_SQL = """
+    SELECT l.ID_PRODUCTO, SUM(l.STOCK) AS STOCK FROM (
+        SELECT ID_PRODUCTO, STOCK FROM STOCK_SNAPSHOT_DETALLE WHERE FECHA = %s {ids}
+        UNION ALL
+        SELECT ID_PRODUCTO, DELTA FROM STOCK_DELTAS WHERE FECHA > %s {hasta} {ids}
+    ) l
+    GROUP BY l.ID_PRODUCTO
+"""
+
+
+def activo(cursor):
+    """True si existen las tablas del libro (python manage.py stock_ledger)"""
+    return bool(registry.columns(cursor, 'STOCK_DELTAS'))
+
+
+def registrar_deltas(cursor, deltas, origen, id_origen=None):
+    """Anota cambios de stock; llamar dentro de la transacción de la escritura
+
+    `deltas`: [(id_producto, cambio_con_signo), ...] o {id_producto: cambio}.
+    """
+    if isinstance(deltas, dict):
+        deltas = deltas.items()
+    filas = [[i, d, origen, id_origen] for i, d in deltas if i is not None and d]
+    if not filas or not activo(cursor):
+        return
+    cursor.executemany(INSERT_DELTA_SQL, filas)
+
+
+def registrar_sobrescritura(cursor, nuevos, origen):
+    """Anota la diferencia entre el stock actual y el que se va a escribir
+
+    Para las escrituras que fijan STOCK en vez de sumarle (update, carga
+    masiva). Llamar justo antes del UPDATE/MERGE, en la misma transacción: bloquea
+    las filas para que nadie cambie el stock entre la lectura y la escritura.
+    `nuevos`: {id_producto: stock}; los IDs que todavía no existen cuentan
+    desde 0.
+    """
+    nuevos = {i: int(s or 0) for i, s in nuevos.items() if i is not None}
+    if not nuevos or not activo(cursor):
+        return
+    ids = sorted(nuevos)
+    actuales = {}
+    for inicio in range(0, len(ids), 1000):
+        parte = ids[inicio:inicio + 1000]
+        cursor.execute(f"""
+            SELECT ID_PRODUCTO, NVL(STOCK, 0) FROM PRODUCTOS
+            WHERE ID_PRODUCTO IN ({', '.join(['%s'] * len(parte))})
+            FOR UPDATE
+        """, parte)
+        actuales.update(cursor.fetchall())
+    registrar_deltas(cursor, [(i, nuevos[i] - actuales.get(i, 0)) for i in ids], origen)
+
+
+# =============================================
+# Snapshots
+# =============================================
+
+def _corte(cursor):
+    """Instante de corte de un snapshot nuevo, con el reloj de la base"""
+    cursor.execute(
+        "SELECT CAST(SYSTIMESTAMP - NUMTODSINTERVAL(%s, 'SECOND') AS TIMESTAMP) FROM DUAL",
+        [STOCK_SNAPSHOT_LAG_SEGUNDOS]
+    )
+    return cursor.fetchone()[0]
+
+
+def snapshot_anterior(cursor, antes_de=None):
+    """FECHA del último snapshot (anterior a `antes_de`, si se indica) o None"""
+    if antes_de is None:
+        cursor.execute("SELECT MAX(FECHA) FROM STOCK_SNAPSHOTS")
+    else:
+        cursor.execute("SELECT MAX(FECHA) FROM STOCK_SNAPSHOTS WHERE FECHA < %s", [antes_de])
+    return cursor.fetchone()[0]
+
+
+def _cabecera(cursor, fecha, tipo):
+    cursor.execute("SELECT COUNT(*) FROM STOCK_SNAPSHOT_DETALLE WHERE FECHA = %s", [fecha])
+    productos = cursor.fetchone()[0]
+    cursor.execute(
+        "INSERT INTO STOCK_SNAPSHOTS (FECHA, TIPO, PRODUCTOS) VALUES (%s, %s, %s)",
+        [fecha, tipo, productos]
+    )
+    return {'fecha': fecha, 'tipo': tipo, 'productos': productos}
+
+
+def tomar_snapshot(cursor):
+    """Guarda el stock de todo el catálogo al corte actual; llamar dentro de una transacción
+
+    El primero (BASE) parte de PRODUCTOS.STOCK menos los deltas posteriores al
+    corte, leídos en la misma consulta. Los siguientes (ACUMULADO) suman al
+    snapshot anterior los deltas del periodo. Devuelve None si el corte no es
+    posterior al último snapshot.
+    """
+    corte = _corte(cursor)
+    anterior = snapshot_anterior(cursor)
+    if anterior is None:
+        cursor.execute("""
+            INSERT INTO STOCK_SNAPSHOT_DETALLE (FECHA, ID_PRODUCTO, STOCK)
+            SELECT %s, p.ID_PRODUCTO, NVL(p.STOCK, 0) - NVL(d.DELTA, 0)
+            FROM PRODUCTOS p
+            LEFT JOIN (
+                SELECT ID_PRODUCTO, SUM(DELTA) AS DELTA FROM STOCK_DELTAS
+                WHERE FECHA > %s GROUP BY ID_PRODUCTO
+            ) d ON d.ID_PRODUCTO = p.ID_PRODUCTO
+        """, [corte, corte])
+        return _cabecera(cursor, corte, 'BASE')
+
+    if corte <= anterior:
+        return None
+    # Solo productos que siguen existiendo: los borrados no pasan al snapshot nuevo
+    cursor.execute(f"""
+        INSERT INTO STOCK_SNAPSHOT_DETALLE (FECHA, ID_PRODUCTO, STOCK)
+        SELECT %s, l.ID_PRODUCTO, l.STOCK
+        FROM ({_STOCK_LIBRO_SQL.format(hasta='AND FECHA <= %s', ids='')}) l
+        JOIN PRODUCTOS p ON p.ID_PRODUCTO = l.ID_PRODUCTO
+    """, [corte, anterior, anterior, corte])
+    return _cabecera(cursor, corte, 'ACUMULADO')
+
+
+def compactar(cursor, antes_de):
+    """Borra snapshots y deltas que ya no hacen falta para consultar desde `antes_de`
+
+    Se conserva el último snapshot anterior a `antes_de` (base de las consultas
+    a esa fecha) y los deltas posteriores a él. Devuelve (snapshots, deltas) borrados.
+    """
+    base = snapshot_anterior(cursor, antes_de)
+    if base is None:
+        return 0, 0
+    cursor.execute("DELETE FROM STOCK_SNAPSHOT_DETALLE WHERE FECHA < %s", [base])
+    cursor.execute("DELETE FROM STOCK_SNAPSHOTS WHERE FECHA < %s", [base])
+    snapshots = cursor.rowcount
+    cursor.execute("DELETE FROM STOCK_DELTAS WHERE FECHA <= %s", [base])
+    return snapshots, cursor.rowcount
+
+
+# =============================================
+# Consultas
+# =============================================
+
+class SinSnapshot(Exception):
+    """No hay snapshot anterior a la fecha pedida"""
+
+
+def stock_sql(cursor, hasta=None, ids=None):
+    """SQL y parámetros del stock por producto según el libro
+
+    - hasta: stock al instante `hasta` (deltas anteriores, exclusivo); None = actual
+    - ids: limitar a esos productos (máximo 1000)
+    Lanza SinSnapshot si no hay snapshot anterior a `hasta`.
+    """
+    base = snapshot_anterior(cursor, hasta)
+    if base is None:
+        raise SinSnapshot('No hay snapshot de stock anterior a la fecha pedida')
+    filtro_ids = f"AND ID_PRODUCTO IN ({', '.join(['%s'] * len(ids))})" if ids else ''
+    sql = _STOCK_LIBRO_SQL.format(
+        hasta='AND FECHA < %s' if hasta is not None else '', ids=filtro_ids
+    ) + " ORDER BY l.ID_PRODUCTO"
+    params = [base] + list(ids or []) + [base]
+    if hasta is not None:
+        params.append(hasta)
+    return sql, params + list(ids or [])
+
+
+def conciliar(cursor):
+    """Productos cuyo PRODUCTOS.STOCK no coincide con el libro, en una sola consulta
+
+    Stock y deltas se leen en la misma sentencia (lectura consistente), así
+    que las transacciones en curso no aparecen como diferencias.
+    """
+    base = snapshot_anterior(cursor)
+    if base is None:
+        raise SinSnapshot('No hay snapshots: ejecutar stock_ledger --snapshot')
+    cursor.execute(f"""
+        SELECT p.ID_PRODUCTO, p.NOMBRE, NVL(p.STOCK, 0) AS STOCK, NVL(l.STOCK, 0) AS LIBRO
+        FROM PRODUCTOS p
+        LEFT JOIN ({_STOCK_LIBRO_SQL.format(hasta='', ids='')}) l ON l.ID_PRODUCTO = p.ID_PRODUCTO
+        WHERE NVL(p.STOCK, 0) <> NVL(l.STOCK, 0)
+        ORDER BY p.ID_PRODUCTO
+    """, [base, base])
+    return [
+        {'id_producto': i, 'nombre': nombre, 'stock': stock, 'libro': libro, 'diferencia': stock - libro}
+        for i, nombre, stock, libro in cursor.fetchall()
+    ]
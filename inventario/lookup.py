@@ -0,0 +1,183 @@
+"""
+Cache LRU para la consulta de productos por ID o código al escanear en caja.
+
+Guarda precio y stock por producto en memoria del proceso, con tamaño máximo
+(LOOKUP_CACHE_SIZE) y vida máxima (LOOKUP_CACHE_TTL). Las escrituras que
+cambian un producto (actualización, movimientos, venta) lo invalidan al
+confirmar: en el proceso local directamente y en los demás mediante una
+versión por producto guardada en el cache de Django.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection, transaction
+
+from core.cache import CATALOG_CACHE
+from core.schema import registry
+
+LOOKUP_CACHE_SIZE = getattr(settings, 'LOOKUP_CACHE_SIZE', 5000)
+LOOKUP_CACHE_TTL = getattr(settings, 'LOOKUP_CACHE_TTL', 60)
+
+# Máximo de productos por consulta en lote (un carrito)
+LOOKUP_BATCH_MAX = 200
+
+COLUMNAS = ['ID_PRODUCTO', 'NOMBRE', 'DESCRIPCION', 'STOCK', 'PRECIO', 'ID_PROVEEDOR']
+
+
+def _version_key(id_producto):
+    return f'producto:version:{id_producto}'
+
+
+class LRUCache:
+    """Diccionario acotado con expiración; el menos usado sale primero"""
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        consultas = self.hits + self.misses
+        return {
+            'size': len(self._data),
+            'maxsize': self.maxsize,
+            'ttl': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': round(self.hits / consultas, 3) if consultas else None,
+        }
+
+
+productos = LRUCache(LOOKUP_CACHE_SIZE, LOOKUP_CACHE_TTL)
+codigos = LRUCache(LOOKUP_CACHE_SIZE, LOOKUP_CACHE_TTL)
+
+
+def _columnas(cursor):
+    columnas = list(COLUMNAS)
+    if 'CODIGO' in registry.columns(cursor, 'PRODUCTOS'):
+        columnas.append('CODIGO')
+    return columnas
+
+
+def _filtro_activo(cursor):
+    # Los productos dados de baja (pendientes de purga) no se venden ni se consultan
+    return " AND NVL(ACTIVO, 'S') = 'S'" if 'ACTIVO' in registry.columns(cursor, 'PRODUCTOS') else ''
+
+
+def _fetch(cursor, columna, valores):
+    columnas = _columnas(cursor)
+    placeholders = ', '.join(['%s'] * len(valores))
+    cursor.execute(
+        f"SELECT {', '.join(columnas)} FROM PRODUCTOS WHERE {columna} IN ({placeholders}){_filtro_activo(cursor)}",
+        list(valores)
+    )
+    return [dict(zip([c.lower() for c in columnas], row)) for row in cursor.fetchall()]
+
+
+def get_productos(ids):
+    """Productos por ID ({id: producto}); los que faltan se leen en una sola consulta"""
+    ids = list(dict.fromkeys(ids))
+    versiones = caches[CATALOG_CACHE].get_many([_version_key(i) for i in ids])
+
+    encontrados = {}
+    faltantes = []
+    for id_producto in ids:
+        entry = productos.get(id_producto)
+        version = versiones.get(_version_key(id_producto), 0)
+        if entry is not None and entry[0] == version:
+            encontrados[id_producto] = entry[1]
+        else:
+            faltantes.append(id_producto)
+
+    if faltantes:
+        with connection.cursor() as cursor:
+            for producto in _fetch(cursor, 'ID_PRODUCTO', faltantes):
+                id_producto = producto['id_producto']
+                version = versiones.get(_version_key(id_producto), 0)
+                productos.set(id_producto, (version, producto))
+                if producto.get('codigo'):
+                    codigos.set(producto['codigo'], id_producto)
+                encontrados[id_producto] = producto
+    return encontrados
+
+
+def get_productos_por_codigo(lista_codigos):
+    """Productos por código ({codigo: producto}); None si PRODUCTOS no tiene CODIGO"""
+    lista_codigos = list(dict.fromkeys(lista_codigos))
+    ids = {}
+    faltantes = []
+    for codigo in lista_codigos:
+        id_producto = codigos.get(codigo)
+        if id_producto is None:
+            faltantes.append(codigo)
+        else:
+            ids[codigo] = id_producto
+
+    if faltantes:
+        with connection.cursor() as cursor:
+            if 'CODIGO' not in registry.columns(cursor, 'PRODUCTOS'):
+                return None
+            placeholders = ', '.join(['%s'] * len(faltantes))
+            cursor.execute(
+                f"SELECT CODIGO, ID_PRODUCTO FROM PRODUCTOS WHERE CODIGO IN ({placeholders}){_filtro_activo(cursor)}",
+                faltantes
+            )
+            for codigo, id_producto in cursor.fetchall():
+                codigos.set(codigo, id_producto)
+                ids[codigo] = id_producto
+
+    por_id = get_productos(ids.values()) if ids else {}
+    return {codigo: por_id[i] for codigo, i in ids.items() if i in por_id}
+
+
+def invalidar(*ids):
+    """Descarta productos del cache (al confirmar la transacción actual)"""
+    def _on_commit():
+        cache = caches[CATALOG_CACHE]
+        for id_producto in ids:
+            productos.delete(id_producto)
+            try:
+                cache.incr(_version_key(id_producto))
+            except ValueError:
+                cache.set(_version_key(id_producto), time.time_ns(), LOOKUP_CACHE_TTL * 10)
+    transaction.on_commit(_on_commit)
+
+
+def invalidar_todo():
+    """Vacía el cache local (cargas masivas); los demás procesos expiran por TTL"""
+    transaction.on_commit(lambda: (productos.clear(), codigos.clear()))
+
+
+def lookup_stats():
+    return {'productos': productos.stats(), 'codigos': codigos.stats()}
@@ -0,0 +1,44 @@
+"""
+Importa productos desde un archivo CSV o JSON:
+
+    python manage.py bulk_import_productos productos.csv
+    python manage.py bulk_import_productos productos.json --chunk 2000
+"""
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from inventario.bulk import BULK_CHUNK_MAX, BULK_CHUNK_SIZE, parse_productos, upsert_productos
+
+
+class Command(BaseCommand):
+    help = 'Alta/actualización masiva de PRODUCTOS desde CSV o JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo', help='Ruta al archivo .csv o .json')
+        parser.add_argument('--formato', choices=['csv', 'json'],
+                            help='Formato del archivo (por defecto, según la extensión)')
+        parser.add_argument('--chunk', type=int, default=BULK_CHUNK_SIZE,
+                            help=f'Filas por lote, de 1 a {BULK_CHUNK_MAX} (default: {BULK_CHUNK_SIZE})')
+
+    def handle(self, *args, **options):
+        if not 1 <= options['chunk'] <= BULK_CHUNK_MAX:
+            raise CommandError(f'--chunk debe estar entre 1 y {BULK_CHUNK_MAX}')
+        ruta = Path(options['archivo'])
+        if not ruta.exists():
+            raise CommandError(f'No existe el archivo {ruta}')
+        formato = options['formato'] or ('csv' if ruta.suffix.lower() == '.csv' else 'json')
+
+        try:
+            rows = parse_productos(ruta.read_bytes(), formato)
+        except ValueError as e:
+            raise CommandError(f'Archivo inválido: {e}')
+
+        stats = upsert_productos(rows, options['chunk'])
+
+        for error in stats['errores']:
+            self.stderr.write(f"  fila {error['fila']}: {error['error']}")
+        self.stdout.write(self.style.SUCCESS(
+            f"{stats['escritas']} productos escritos, {stats['con_error']} con error "
+            f"en {stats['segundos']}s ({stats['filas_por_segundo']} filas/s)"
+        ))
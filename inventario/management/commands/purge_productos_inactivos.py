@@ -0,0 +1,30 @@
+"""
+Completa la purga de productos dados de baja (ACTIVO = 'N') que quedaron
+pendientes, p. ej. tras reiniciar el servidor:
+
+    python manage.py purge_productos_inactivos
+"""
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from inventario.purge import PURGE_CHUNK_SIZE, purgar
+
+
+class Command(BaseCommand):
+    help = 'Borra por lotes el historial y el registro de los productos inactivos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk', type=int, default=PURGE_CHUNK_SIZE,
+                            help=f'Filas por lote (default: {PURGE_CHUNK_SIZE})')
+
+    def handle(self, *args, **options):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT ID_PRODUCTO FROM PRODUCTOS WHERE ACTIVO = 'N'")
+            pendientes = [row[0] for row in cursor.fetchall()]
+
+        for id_producto in pendientes:
+            borrados = purgar(id_producto, chunk=options['chunk'])
+            detalle = ', '.join(f'{tabla}: {n}' for tabla, n in borrados.items())
+            self.stdout.write(f'  producto {id_producto}: {detalle}')
+
+        self.stdout.write(self.style.SUCCESS(f'{len(pendientes)} productos purgados'))
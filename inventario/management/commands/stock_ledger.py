@@ -0,0 +1,88 @@
+"""
+Libro de stock (inventario.ledger): crea las tablas, toma snapshots y concilia
+PRODUCTOS.STOCK contra snapshot + deltas para todo el catálogo:
+
+    python manage.py stock_ledger                          # crear tablas
+    python manage.py stock_ledger --snapshot               # p. ej. cada noche desde cron
+    python manage.py stock_ledger --conciliar
+    python manage.py stock_ledger --conciliar --corregir   # anotar las diferencias como CONCILIA
+    python manage.py stock_ledger --retener-dias 90
+
+Tras crear las tablas, cada worker empieza a anotar deltas al refrescar el
+registro de esquema (hasta SCHEMA_CACHE_TTL segundos): tomar el primer
+snapshot pasado ese tiempo, o conciliar con --corregir después.
+"""
+from datetime import datetime, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from core.schema import bump_schema_version
+from inventario import ledger
+
+
+class Command(BaseCommand):
+    help = 'Snapshots de stock y conciliación de PRODUCTOS.STOCK contra el libro de deltas'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--snapshot', action='store_true',
+                            help='Guardar el stock de todo el catálogo (el primero parte de PRODUCTOS.STOCK)')
+        parser.add_argument('--conciliar', action='store_true',
+                            help='Listar los productos cuyo STOCK no coincide con el libro')
+        parser.add_argument('--corregir', action='store_true',
+                            help='Con --conciliar: anotar cada diferencia como delta CONCILIA '
+                                 '(PRODUCTOS.STOCK queda como valor correcto)')
+        parser.add_argument('--retener-dias', type=int,
+                            help='Borrar snapshots y deltas que no hacen falta para consultar los últimos N días')
+
+    def handle(self, *args, **options):
+        if options['corregir'] and not options['conciliar']:
+            raise CommandError('--corregir requiere --conciliar')
+
+        cursor = connection.cursor()
+        cursor.execute("SELECT TABLE_NAME FROM USER_TABLES WHERE TABLE_NAME = 'STOCK_DELTAS'")
+        if cursor.fetchone() is None:
+            for ddl in ledger.DDL_LEDGER:
+                cursor.execute(ddl)
+            # registrar_deltas consulta el registro de esquema para saber si la tabla existe
+            bump_schema_version()
+            self.stdout.write('  STOCK_DELTAS / STOCK_SNAPSHOTS: creadas')
+        else:
+            self.stdout.write('  STOCK_DELTAS / STOCK_SNAPSHOTS: ya existen')
+
+        if options['snapshot']:
+            with transaction.atomic():
+                snapshot = ledger.tomar_snapshot(cursor)
+            if snapshot is None:
+                self.stdout.write('  Snapshot: el último es más reciente que el corte, no se tomó otro')
+            else:
+                self.stdout.write(
+                    f"  Snapshot {snapshot['tipo']} al {snapshot['fecha']:%Y-%m-%d %H:%M:%S}: "
+                    f"{snapshot['productos']} productos"
+                )
+
+        if options['conciliar']:
+            try:
+                diferencias = ledger.conciliar(cursor)
+            except ledger.SinSnapshot as e:
+                raise CommandError(str(e))
+            for d in diferencias:
+                self.stdout.write(
+                    f"  {d['id_producto']:>8} {str(d['nombre'])[:40]:40} "
+                    f"stock {d['stock']:>8} libro {d['libro']:>8} diferencia {d['diferencia']:>+8}"
+                )
+            self.stdout.write(f'  {len(diferencias)} productos con diferencias')
+            if diferencias and options['corregir']:
+                with transaction.atomic():
+                    ledger.registrar_deltas(
+                        cursor, [(d['id_producto'], d['diferencia']) for d in diferencias], 'CONCILIA'
+                    )
+                self.stdout.write(f'  {len(diferencias)} deltas CONCILIA anotados')
+
+        if options['retener_dias'] is not None:
+            antes_de = datetime.now() - timedelta(days=options['retener_dias'])
+            with transaction.atomic():
+                snapshots, deltas = ledger.compactar(cursor, antes_de)
+            self.stdout.write(f'  {snapshots} snapshots y {deltas} deltas anteriores a {antes_de:%Y-%m-%d} borrados')
+
+        cursor.close()
@@ -0,0 +1,130 @@
+"""
+Baja de productos en dos fases.
+
+1. La vista marca el producto como inactivo (ACTIVO = 'N'): desaparece del
+   catálogo al instante con un único UPDATE.
+2. Un hilo de fondo borra su historial dependiente (MOVIMIENTOS_INVENTARIO,
+   GARANTIAS, DETALLE_VENTA) y las filas derivadas de ese historial que
+   existan (resúmenes diarios RESUMEN_*_DIA y libro de stock STOCK_DELTAS /
+   STOCK_SNAPSHOT_DETALLE) en lotes pequeños, cada uno en su propia
+   transacción, y al final borra el producto. Así no se mantienen bloqueos
+   largos sobre tablas de alto tráfico, y los reportes por resumen coinciden
+   con los calculados desde el detalle. Al terminar invalida los listados y
+   el cache de consulta. La baja en CAMBIOS la anota la vista al marcarlo.
+
+Si el proceso se reinicia con purgas pendientes, `manage.py
+purge_productos_inactivos` las completa.
+"""
+import logging
+import queue
+import threading
+import time
+
+from django.conf import settings
+from django.db import connection, connections
+
+from core.cache import invalidate
+from core.schema import registry
+from . import lookup
+
+logger = logging.getLogger(__name__)
+
+PURGE_CHUNK_SIZE = getattr(settings, 'PURGE_CHUNK_SIZE', 500)
+
+# Pausa entre lotes para ceder los bloqueos a las transacciones de caja
+PURGE_PAUSA = getattr(settings, 'PURGE_PAUSA', 0.05)
+
+# Tablas dependientes, en orden de borrado
+DEPENDIENTES = ['MOVIMIENTOS_INVENTARIO', 'GARANTIAS', 'DETALLE_VENTA']
+
+# Resúmenes y libro de stock derivados del historial (solo si la tabla existe)
+DERIVADAS = ['RESUMEN_VENTAS_DIA', 'RESUMEN_MOVIMIENTOS_DIA', 'STOCK_DELTAS', 'STOCK_SNAPSHOT_DETALLE']
+
+IMPACTO_SQL = """
+    SELECT (SELECT NOMBRE FROM PRODUCTOS WHERE ID_PRODUCTO = %s),
+           (SELECT COUNT(*) FROM MOVIMIENTOS_INVENTARIO WHERE ID_PRODUCTO = %s),
+           (SELECT COUNT(*) FROM GARANTIAS WHERE ID_PRODUCTO = %s),
+           (SELECT COUNT(*) FROM DETALLE_VENTA WHERE ID_PRODUCTO = %s)
+    FROM DUAL
+"""
+
+
+def impacto(cursor, id_producto):
+    """Nombre y registros dependientes de un producto en una sola consulta"""
+    cursor.execute(IMPACTO_SQL, [id_producto] * 4)
+    nombre, movimientos, garantias, detalles = cursor.fetchone()
+    return nombre, {
+        'movimientos': movimientos,
+        'garantias': garantias,
+        'detalles_venta': detalles,
+    }
+
+
+def tablas_a_purgar(cursor):
+    """Tablas con filas por ID_PRODUCTO que se borran con el producto"""
+    return DEPENDIENTES + [tabla for tabla in DERIVADAS if registry.columns(cursor, tabla)]
+
+
+def purgar(id_producto, chunk=PURGE_CHUNK_SIZE, pausa=PURGE_PAUSA):
+    """Borra en lotes el historial de un producto inactivo y luego el producto
+
+    Devuelve las filas borradas por tabla. Cada lote confirma por separado
+    (autocommit), así que se puede interrumpir y retomar.
+    """
+    borrados = {}
+    with connection.cursor() as cursor:
+        for tabla in tablas_a_purgar(cursor):
+            borrados[tabla] = 0
+            while True:
+                cursor.execute(
+                    f"DELETE FROM {tabla} WHERE ID_PRODUCTO = %s AND ROWNUM <= %s",
+                    [id_producto, chunk]
+                )
+                borrados[tabla] += cursor.rowcount
+                if cursor.rowcount < chunk:
+                    break
+                time.sleep(pausa)
+        # Solo si sigue inactivo (no se reactivó mientras tanto)
+        cursor.execute(
+            "DELETE FROM PRODUCTOS WHERE ID_PRODUCTO = %s AND ACTIVO = 'N'", [id_producto]
+        )
+        borrados['PRODUCTOS'] = cursor.rowcount
+
+    # Los listados y ETags de los demás procesos siguen la versión de cada tabla
+    invalidate('MOVIMIENTOS_INVENTARIO', 'VENTAS', 'PRODUCTOS')
+    lookup.invalidar(id_producto)
+    return borrados
+
+
+class _PurgeWorker:
+    """Hilo único que procesa la cola de productos a purgar"""
+
+    def __init__(self):
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, id_producto):
+        self._queue.put(id_producto)
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='purge-productos', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                id_producto = self._queue.get(timeout=30)
+            except queue.Empty:
+                break
+            try:
+                borrados = purgar(id_producto)
+                logger.info('Producto %s purgado: %s', id_producto, borrados)
+            except Exception:
+                logger.exception('Error purgando el producto %s', id_producto)
+            finally:
+                # Devolver la conexión de este hilo al pool
+                connections.close_all()
+
+
+worker = _PurgeWorker()
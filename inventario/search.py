@@ -0,0 +1,250 @@
+"""
+Índice de búsqueda en memoria para el typeahead de productos (POS y RMA).
+
+Indexa NOMBRE y DESCRIPCION por trigramas normalizados (minúsculas, sin
+tildes: "Cañería" ~ "caneria") y ordena por cobertura de trigramas más un
+bonus por coincidencia de prefijo en el nombre.
+
+Cada proceso mantiene su índice. Los endpoints de escritura de productos
+llaman a producto_texto_cambiado(), que incrementa la versión PRODUCTOS_TEXTO
+en el cache y actualiza el índice local de forma incremental; los demás
+procesos ven la nueva versión y recargan el índice completo en un hilo
+aparte (uno a la vez por proceso), mientras siguen respondiendo con el índice
+anterior. Solo la primera carga del proceso hace esperar a la búsqueda. Los
+cambios de stock no afectan al índice.
+"""
+import heapq
+import logging
+import threading
+import time
+import unicodedata
+from collections import Counter
+
+from django.db import connection, connections, transaction
+
+from core.cache import invalidate, table_versions
+from core.schema import registry
+
+logger = logging.getLogger(__name__)
+
+# Versión del texto de productos (independiente de la de PRODUCTOS, que cambia con el stock)
+TEXT_VERSION = 'PRODUCTOS_TEXTO'
+
+# Peso de los trigramas de la descripción frente a los del nombre
+PESO_DESCRIPCION = 0.5
+
+# Fracción mínima de trigramas de la consulta que debe tener un candidato
+COBERTURA_MINIMA = 0.5
+
+# Candidatos (por cobertura) que se puntúan en detalle por cada resultado pedido
+CANDIDATOS_POR_RESULTADO = 5
+
+SEARCH_LIMIT_DEFAULT = 10
+
+
+def normalizar(texto):
+    """Minúsculas, sin tildes ni signos: 'Cañería 1/2"' -> 'caneria 1 2'"""
+    texto = unicodedata.normalize('NFKD', texto or '')
+    texto = ''.join(c for c in texto if not unicodedata.combining(c)).lower()
+    return ' '.join(''.join(c if c.isalnum() else ' ' for c in texto).split())
+
+
+def _trigramas(texto, completo=True):
+    # Relleno inicial para que 1-2 letras ya generen trigramas de prefijo;
+    # en la consulta la última palabra puede estar a medio escribir (sin relleno final)
+    grams = set()
+    for palabra in texto.split():
+        palabra = '  ' + palabra + (' ' if completo else '')
+        grams.update(palabra[i:i + 3] for i in range(len(palabra) - 2))
+    return grams
+
+
+class ProductSearchIndex:
+    """Índice invertido trigrama -> IDs de producto"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # Una sola reconstrucción a la vez
+        self._reload_lock = threading.Lock()
+        self._docs = {}
+        self._nombre = {}
+        self._descripcion = {}
+        self.version = None
+        self.cargado_en = None
+
+    def _add(self, docs, nombre, descripcion, row):
+        id_producto, texto_nombre, texto_descripcion, precio = row
+        norm = normalizar(texto_nombre)
+        desc_norm = normalizar(texto_descripcion)
+        grams_nombre = _trigramas(norm)
+        grams_descripcion = _trigramas(desc_norm)
+        docs[id_producto] = {
+            'id_producto': id_producto,
+            'nombre': texto_nombre,
+            'precio': precio,
+            '_norm': norm,
+            '_desc_norm': desc_norm,
+            '_grams': (grams_nombre, grams_descripcion),
+        }
+        for gram in grams_nombre:
+            nombre.setdefault(gram, set()).add(id_producto)
+        for gram in grams_descripcion:
+            descripcion.setdefault(gram, set()).add(id_producto)
+
+    def _remove(self, id_producto):
+        doc = self._docs.pop(id_producto, None)
+        if doc is None:
+            return
+        grams_nombre, grams_descripcion = doc['_grams']
+        for postings, grams in ((self._nombre, grams_nombre), (self._descripcion, grams_descripcion)):
+            for gram in grams:
+                ids = postings.get(gram)
+                if ids is not None:
+                    ids.discard(id_producto)
+                    if not ids:
+                        del postings[gram]
+
+    def reload(self):
+        """Reconstruye el índice completo desde PRODUCTOS"""
+        with self._reload_lock:
+            self._reload()
+
+    def _reload(self):
+        version = table_versions(TEXT_VERSION)[0]
+        docs, nombre, descripcion = {}, {}, {}
+        with connection.cursor() as cursor:
+            sql = "SELECT ID_PRODUCTO, NOMBRE, DESCRIPCION, PRECIO FROM PRODUCTOS"
+            if 'ACTIVO' in registry.columns(cursor, 'PRODUCTOS'):
+                sql += " WHERE NVL(ACTIVO, 'S') = 'S'"
+            cursor.execute(sql)
+            while True:
+                rows = cursor.fetchmany(1000)
+                if not rows:
+                    break
+                for row in rows:
+                    self._add(docs, nombre, descripcion, row)
+        with self._lock:
+            self._docs, self._nombre, self._descripcion = docs, nombre, descripcion
+            self.version = version
+            self.cargado_en = time.time()
+
+    def _reload_en_segundo_plano(self):
+        try:
+            self._reload()
+        except Exception:
+            logger.exception('Error recargando el índice de búsqueda de productos')
+        finally:
+            self._reload_lock.release()
+            # Devolver la conexión de este hilo al pool
+            connections.close_all()
+
+    def ensure_current(self):
+        """Recarga el índice si cambió la versión del texto de productos
+
+        La primera carga es síncrona; después la recarga corre en un hilo y las
+        búsquedas usan el índice anterior hasta que termina.
+        """
+        if self.version == table_versions(TEXT_VERSION)[0]:
+            return
+        if self.version is None:
+            with self._reload_lock:
+                if self.version is None:
+                    self._reload()
+            return
+        if not self._reload_lock.acquire(blocking=False):
+            return  # Ya hay una recarga en curso
+        try:
+            threading.Thread(target=self._reload_en_segundo_plano, name='indice-productos', daemon=True).start()
+        except Exception:
+            self._reload_lock.release()
+            raise
+
+    def apply_change(self, id_producto, version_anterior, version_nueva):
+        """Actualiza un producto en el índice local tras una escritura propia
+
+        Solo si nadie más cambió el texto entre medio (versión +1); si no, el
+        índice queda desactualizado y se recarga en la próxima búsqueda.
+        """
+        if self.version is None or self.version != version_anterior:
+            return
+        if version_nueva != version_anterior + 1:
+            return
+        row = None
+        if id_producto is not None:
+            with connection.cursor() as cursor:
+                sql = "SELECT ID_PRODUCTO, NOMBRE, DESCRIPCION, PRECIO FROM PRODUCTOS WHERE ID_PRODUCTO = %s"
+                if 'ACTIVO' in registry.columns(cursor, 'PRODUCTOS'):
+                    sql += " AND NVL(ACTIVO, 'S') = 'S'"
+                cursor.execute(sql, [id_producto])
+                row = cursor.fetchone()
+        with self._lock:
+            if id_producto is not None:
+                self._remove(id_producto)
+            if row is not None:
+                self._add(self._docs, self._nombre, self._descripcion, row)
+            self.version = version_nueva
+
+    def search(self, query, limit=SEARCH_LIMIT_DEFAULT):
+        """Top `limit` productos para `query`, ordenados por puntaje"""
+        self.ensure_current()
+        norm = normalizar(query)
+        grams = _trigramas(norm, completo=False)
+        if not grams:
+            return []
+
+        with self._lock:
+            # Conteo de trigramas compartidos por campo (Counter.update cuenta en C)
+            en_nombre = Counter()
+            en_descripcion = Counter()
+            for gram in grams:
+                en_nombre.update(self._nombre.get(gram, ()))
+                en_descripcion.update(self._descripcion.get(gram, ()))
+
+            total = len(grams)
+            minimo = COBERTURA_MINIMA * total
+            base = {}
+            for id_producto in en_nombre.keys() | en_descripcion.keys():
+                n = en_nombre.get(id_producto, 0)
+                d = en_descripcion.get(id_producto, 0)
+                if n >= minimo or d >= minimo:
+                    base[id_producto] = (n + PESO_DESCRIPCION * d) / total
+
+            # Bonus de prefijo solo para los mejores candidatos por cobertura
+            candidatos = heapq.nlargest(limit * CANDIDATOS_POR_RESULTADO, base.items(), key=lambda c: c[1])
+            palabras = norm.split()
+            resultados = []
+            for id_producto, score in candidatos:
+                doc = self._docs[id_producto]
+                if doc['_norm'].startswith(norm):
+                    score += 1
+                tokens = doc['_norm'].split()
+                score += 0.5 * sum(
+                    1 for palabra in palabras if any(t.startswith(palabra) for t in tokens)
+                ) / len(palabras)
+                tokens = doc['_desc_norm'].split()
+                if all(any(t.startswith(palabra) for t in tokens) for palabra in palabras):
+                    score += PESO_DESCRIPCION * 0.5
+                resultados.append((score, doc))
+
+        resultados.sort(key=lambda r: (-r[0], len(r[1]['nombre'] or '')))
+        return [
+            {'id_producto': doc['id_producto'], 'nombre': doc['nombre'],
+             'precio': doc['precio'], 'score': round(score, 3)}
+            for score, doc in resultados[:limit]
+        ]
+
+
+index = ProductSearchIndex()
+
+
+def producto_texto_cambiado(id_producto=None):
+    """Avisar de un alta/cambio/baja de producto (al confirmar la transacción)
+
+    Sin id_producto (cargas masivas) solo invalida: todos los procesos recargan.
+    """
+    def _on_commit():
+        anterior = table_versions(TEXT_VERSION)[0]
+        invalidate(TEXT_VERSION)
+        if id_producto is not None:
+            index.apply_change(id_producto, anterior, table_versions(TEXT_VERSION)[0])
+    transaction.on_commit(_on_commit)
@@ -1,3 +1,375 @@
-from django.test import TestCase
+import sqlite3
+from unittest import mock
 
-# Create your tests here.
+from django.test import RequestFactory, SimpleTestCase
+
+from . import bulk, ledger, lookup, purge, search, views
+
+
+# =============================================
+# Búsqueda (inventario.search)
+# =============================================
+
+class NormalizarTests(SimpleTestCase):
+    def test_quita_tildes_signos_y_mayusculas(self):
+        self.assertEqual(search.normalizar('Cañería 1/2"'), 'caneria 1 2')
+        self.assertEqual(search.normalizar('  Cámara   WEB  '), 'camara web')
+
+    def test_vacio(self):
+        self.assertEqual(search.normalizar(None), '')
+        self.assertEqual(search.normalizar('¿?'), '')
+
+    def test_trigramas_con_relleno(self):
+        self.assertEqual(search._trigramas('ab'), {'  a', ' ab', 'ab '})
+        # La última palabra de la consulta puede estar incompleta: sin relleno final
+        self.assertEqual(search._trigramas('ab', completo=False), {'  a', ' ab'})
+
+
+class ProductSearchIndexTests(SimpleTestCase):
+    PRODUCTOS = [
+        (1, 'Cañería PVC 1/2', 'tubo para agua', 1000),
+        (2, 'Cable HDMI', 'cable de video 2 metros', 5000),
+        (3, 'Mouse inalámbrico', 'periférico', 8000),
+        (4, 'Adaptador', 'convierte cable hdmi a vga', 3000),
+    ]
+
+    def setUp(self):
+        self.cursor = mock.MagicMock()
+        self.cursor.fetchmany.side_effect = [self.PRODUCTOS[:3], self.PRODUCTOS[3:], []]
+        for patcher in [
+            mock.patch.object(search, 'connection'),
+            mock.patch.object(search.registry, 'columns', return_value=['ID_PRODUCTO', 'ACTIVO']),
+            mock.patch.object(search, 'table_versions', return_value=[1]),
+        ]:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        search.connection.cursor.return_value.__enter__.return_value = self.cursor
+        self.index = search.ProductSearchIndex()
+        self.index.reload()
+
+    def ids(self, query, limit=10):
+        return [r['id_producto'] for r in self.index.search(query, limit)]
+
+    def test_carga_productos_activos(self):
+        sql = self.cursor.execute.call_args.args[0]
+        self.assertIn("NVL(ACTIVO, 'S') = 'S'", sql)
+        self.assertEqual(self.index.version, 1)
+        primero = self.index.search('hdmi')[0]
+        self.assertEqual((primero['id_producto'], primero['nombre'], primero['precio']), (2, 'Cable HDMI', 5000))
+
+    def test_sin_tildes_encuentra_con_tildes(self):
+        self.assertEqual(self.ids('caneria'), [1])
+        self.assertEqual(self.ids('inalambrico'), [3])
+
+    def test_prefijo_incompleto(self):
+        self.assertEqual(self.ids('mou'), [3])
+
+    def test_nombre_antes_que_descripcion(self):
+        self.assertEqual(self.ids('cable hdmi'), [2, 4])
+
+    def test_sin_coincidencias(self):
+        self.assertEqual(self.ids('zzzz'), [])
+        self.assertEqual(self.index.search(''), [])
+
+    def test_limite(self):
+        self.assertEqual(len(self.ids('cable', limit=1)), 1)
+
+    def test_apply_change_quita_producto(self):
+        self.cursor.fetchone.return_value = None
+        self.index.apply_change(3, 1, 2)
+        self.assertEqual(self.index.version, 2)
+        search.table_versions.return_value = [2]
+        self.assertEqual(self.ids('mouse'), [])
+
+    def test_apply_change_agrega_producto(self):
+        self.cursor.fetchone.return_value = (5, 'Teclado USB', 'teclado en español', 7000)
+        self.index.apply_change(5, 1, 2)
+        self.assertEqual(self.cursor.execute.call_args.args[1], [5])
+        search.table_versions.return_value = [2]
+        self.assertEqual(self.ids('teclado'), [5])
+
+    def test_apply_change_con_version_salteada_no_toca_el_indice(self):
+        ejecutadas = self.cursor.execute.call_count
+        for anterior, nueva in [(1, 3), (0, 1)]:
+            with self.subTest(anterior=anterior, nueva=nueva):
+                self.index.apply_change(3, anterior, nueva)
+                self.assertEqual(self.index.version, 1)
+                self.assertEqual(self.ids('mouse'), [3])
+        self.assertEqual(self.cursor.execute.call_count, ejecutadas)
+
+
+# =============================================
+# Cache de productos por ID/código (inventario.lookup)
+# =============================================
+
+class LRUCacheTests(SimpleTestCase):
+    def test_sale_el_menos_usado(self):
+        cache = lookup.LRUCache(maxsize=2, ttl=60)
+        cache.set(1, 'a')
+        cache.set(2, 'b')
+        self.assertEqual(cache.get(1), 'a')  # 2 queda como el menos usado
+        cache.set(3, 'c')
+        self.assertIsNone(cache.get(2))
+        self.assertEqual(cache.get(1), 'a')
+        self.assertEqual(cache.get(3), 'c')
+
+    def test_expira(self):
+        cache = lookup.LRUCache(maxsize=10, ttl=5)
+        with mock.patch.object(lookup.time, 'monotonic', return_value=100):
+            cache.set(1, 'a')
+        with mock.patch.object(lookup.time, 'monotonic', return_value=104):
+            self.assertEqual(cache.get(1), 'a')
+        with mock.patch.object(lookup.time, 'monotonic', return_value=106):
+            self.assertIsNone(cache.get(1))
+
+    def test_delete_clear_y_stats(self):
+        cache = lookup.LRUCache(maxsize=10, ttl=60)
+        cache.set(1, 'a')
+        cache.set(2, 'b')
+        cache.delete(1)
+        self.assertIsNone(cache.get(1))
+        self.assertEqual(cache.get(2), 'b')
+        stats = cache.stats()
+        self.assertEqual((stats['size'], stats['hits'], stats['misses'], stats['hit_ratio']), (1, 1, 1, 0.5))
+        cache.clear()
+        self.assertEqual(cache.stats()['size'], 0)
+
+
+# =============================================
+# Carga masiva (inventario.bulk)
+# =============================================
+
+class ParseProductosTests(SimpleTestCase):
+    def test_csv_con_bom(self):
+        contenido = '\ufeffnombre,stock,precio\nCable,3,990\nMouse,,\n'.encode('utf-8')
+        self.assertEqual(bulk.parse_productos(contenido, 'csv'), [
+            {'nombre': 'Cable', 'stock': '3', 'precio': '990'},
+            {'nombre': 'Mouse', 'stock': '', 'precio': ''},
+        ])
+
+    def test_json_lista_u_objeto(self):
+        filas = [{'nombre': 'Cable'}]
+        self.assertEqual(bulk.parse_productos('[{"nombre": "Cable"}]', 'json'), filas)
+        self.assertEqual(bulk.parse_productos('{"productos": [{"nombre": "Cable"}]}', 'json'), filas)
+
+    def test_json_no_lista(self):
+        with self.assertRaises(ValueError):
+            bulk.parse_productos('{"productos": 5}', 'json')
+
+
+class ValidarProductoTests(SimpleTestCase):
+    def test_parametros_del_merge(self):
+        self.assertEqual(
+            bulk.validar_producto({'id_producto': '7', 'nombre': ' Cable ', 'stock': '3',
+                                   'precio': '990.5', 'id_proveedor': ''}),
+            [7, 'Cable', '', 3, 990.5, None],
+        )
+
+    def test_valores_por_defecto(self):
+        self.assertEqual(bulk.validar_producto({'nombre': 'Mouse'}), [None, 'Mouse', '', 0, 0.0, None])
+
+    def test_errores(self):
+        for row in [{'nombre': ''}, {'nombre': 'x', 'stock': '-1'}, {'nombre': 'x', 'precio': '-5'},
+                    {'nombre': 'x', 'stock': 'diez'}]:
+            with self.subTest(row=row), self.assertRaises(ValueError):
+                bulk.validar_producto(row)
+
+    def test_upsert_informa_filas_invalidas(self):
+        with mock.patch.object(bulk, '_escribir_lote', return_value=1) as escribir:
+            resultado = bulk.upsert_productos([{'nombre': ''}, {'nombre': 'Cable'}])
+        escribir.assert_called_once()
+        self.assertEqual([fila for fila, _ in escribir.call_args.args[0]], [2])
+        self.assertEqual(resultado['errores'], [{'fila': 1, 'error': 'nombre es obligatorio'}])
+        self.assertEqual((resultado['procesadas'], resultado['escritas']), (2, 1))
+
+    def test_id_inexistente_es_error_de_fila(self):
+        cursor = mock.MagicMock()
+        cursor.fetchall.return_value = [(7,)]
+        lote = [(1, bulk.validar_producto({'id_producto': '7', 'nombre': 'a'})),
+                (2, bulk.validar_producto({'id_producto': '99', 'nombre': 'b'})),
+                (3, bulk.validar_producto({'nombre': 'c'}))]
+        errores = []
+        with mock.patch.object(bulk, 'connection') as connection:
+            connection.cursor.return_value.__enter__.return_value = cursor
+            validas = bulk._descartar_desconocidos(lote, errores)
+        self.assertEqual([fila for fila, _ in validas], [1, 3])
+        self.assertEqual([e['fila'] for e in errores], [2])
+
+    def test_chunk_fuera_de_rango(self):
+        for chunk in ['0', '-1', str(bulk.BULK_CHUNK_MAX + 1)]:
+            request = RequestFactory().post(f'/inventario/api/productos/bulk/?chunk={chunk}',
+                                            data='[]', content_type='application/json')
+            with self.subTest(chunk=chunk), mock.patch.object(views, 'upsert_productos') as upsert:
+                self.assertEqual(views.api_productos_bulk(request).status_code, 400)
+                upsert.assert_not_called()
+
+
+# =============================================
+# Movimientos en lote (inventario.views)
+# =============================================
+
+class MovimientosBatchTests(SimpleTestCase):
+    def post(self, movimientos):
+        request = RequestFactory().post('/inventario/api/movimientos/batch/',
+                                        data={'movimientos': movimientos}, content_type='application/json')
+        cursor = mock.MagicMock()
+        with mock.patch.object(views, 'connection') as connection, \
+                mock.patch.object(views, 'transaction'), \
+                mock.patch.object(views, 'registrar_movimientos'), \
+                mock.patch.object(views, 'registrar_cambios'), \
+                mock.patch.object(views, 'invalidate_on_commit'), \
+                mock.patch.object(views.ledger, 'registrar_deltas') as deltas, \
+                mock.patch.object(views.lookup, 'invalidar'):
+            connection.cursor.return_value = cursor
+            respuesta = views.api_movimientos_batch(request)
+        return respuesta, cursor, deltas
+
+    def test_un_update_por_producto_en_orden(self):
+        respuesta, cursor, deltas = self.post([
+            {'id_producto': 9, 'tipo': 'entrada', 'cantidad': 5},
+            {'id_producto': 3, 'tipo': 'SALIDA', 'cantidad': 2},
+            {'id_producto': 9, 'tipo': 'SALIDA', 'cantidad': 1},
+            {'id_producto': 4, 'tipo': 'ENTRADA', 'cantidad': 2},
+            {'id_producto': 4, 'tipo': 'SALIDA', 'cantidad': 2},
+        ])
+        self.assertEqual(respuesta.status_code, 200)
+        insert, update = cursor.executemany.call_args_list
+        self.assertEqual(len(insert.args[1]), 5)
+        # Neto por producto, ordenado por ID; el neto cero no se actualiza
+        self.assertEqual(update.args[1], [[-2, 3], [4, 9]])
+        deltas.assert_called_once_with(cursor, {3: -2, 9: 4}, 'MOVIMIENTO')
+
+    def test_movimiento_invalido(self):
+        respuesta, cursor, _ = self.post([{'id_producto': 1, 'cantidad': 2}, {'cantidad': 1}])
+        self.assertEqual(respuesta.status_code, 400)
+        cursor.executemany.assert_not_called()
+
+
+# =============================================
+# Purga de productos dados de baja (inventario.purge)
+# =============================================
+
+class PurgarTests(SimpleTestCase):
+    def test_borra_historial_y_derivadas_sin_repetir_la_baja(self):
+        cursor = mock.MagicMock()
+        cursor.rowcount = 0
+        existentes = {'RESUMEN_VENTAS_DIA': ['FECHA'], 'STOCK_DELTAS': ['ID_DELTA']}
+        with mock.patch.object(purge, 'connection') as connection, \
+                mock.patch.object(purge.registry, 'columns', side_effect=lambda c, t: existentes.get(t, [])), \
+                mock.patch.object(purge, 'invalidate') as invalidate, \
+                mock.patch.object(purge.lookup, 'invalidar') as invalidar:
+            connection.cursor.return_value.__enter__.return_value = cursor
+            borrados = purge.purgar(5, chunk=10, pausa=0)
+        self.assertEqual(list(borrados), [
+            'MOVIMIENTOS_INVENTARIO', 'GARANTIAS', 'DETALLE_VENTA',
+            'RESUMEN_VENTAS_DIA', 'STOCK_DELTAS', 'PRODUCTOS',
+        ])
+        sqls = [c.args[0] for c in cursor.execute.call_args_list]
+        # La baja en CAMBIOS la anota la vista al marcar el producto, no la purga
+        self.assertFalse(any('CAMBIOS' in sql for sql in sqls))
+        invalidate.assert_called_once()
+        invalidar.assert_called_once_with(5)
+
+
+# =============================================
+# Libro de stock (inventario.ledger)
+# =============================================
+
+class CursorSqlite:
+    """Cursor con parámetros %s sobre sqlite en memoria, para ejecutar el SQL del libro"""
+
+    def __init__(self):
+        self.db = sqlite3.connect(':memory:')
+        self.db.create_function('NVL', 2, lambda valor, defecto: defecto if valor is None else valor)
+        self.cursor = self.db.cursor()
+        self.cursor.executescript("""
+            CREATE TABLE PRODUCTOS (ID_PRODUCTO INTEGER PRIMARY KEY, NOMBRE TEXT, STOCK INTEGER);
+            CREATE TABLE STOCK_DELTAS (ID_PRODUCTO INTEGER, DELTA INTEGER, FECHA TEXT);
+            CREATE TABLE STOCK_SNAPSHOTS (FECHA TEXT PRIMARY KEY, TIPO TEXT, PRODUCTOS INTEGER);
+            CREATE TABLE STOCK_SNAPSHOT_DETALLE (FECHA TEXT, ID_PRODUCTO INTEGER, STOCK INTEGER);
+        """)
+
+    def execute(self, sql, params=()):
+        self.cursor.execute(sql.replace('%s', '?'), list(params))
+
+    def fetchone(self):
+        return self.cursor.fetchone()
+
+    def fetchall(self):
+        return self.cursor.fetchall()
+
+
+class LedgerTests(SimpleTestCase):
+    def setUp(self):
+        self.cursor = CursorSqlite()
+        self.cursor.cursor.executemany("INSERT INTO PRODUCTOS VALUES (?, ?, ?)",
+                                       [(1, 'Cable', 10), (2, 'Mouse', 5)])
+        # Venta anotada después del primer corte: PRODUCTOS.STOCK ya la incluye
+        self.delta(1, 3, '2024-01-01 00:00:30')
+
+    def delta(self, id_producto, cambio, fecha):
+        self.cursor.execute("INSERT INTO STOCK_DELTAS VALUES (%s, %s, %s)", [id_producto, cambio, fecha])
+        self.cursor.execute("UPDATE PRODUCTOS SET STOCK = STOCK + %s WHERE ID_PRODUCTO = %s",
+                            [cambio, id_producto])
+
+    def snapshot(self, corte):
+        with mock.patch.object(ledger, '_corte', return_value=corte):
+            return ledger.tomar_snapshot(self.cursor)
+
+    def stock(self, hasta=None, ids=None):
+        sql, params = ledger.stock_sql(self.cursor, hasta, ids)
+        self.cursor.execute(sql, params)
+        return dict(self.cursor.fetchall())
+
+    def test_snapshot_mas_deltas_es_el_stock_actual(self):
+        # El delta de setUp ya estaba en el stock: se descuenta del BASE
+        self.assertEqual(self.snapshot('2024-01-01 00:00:00'),
+                         {'fecha': '2024-01-01 00:00:00', 'tipo': 'BASE', 'productos': 2})
+        self.cursor.execute("SELECT ID_PRODUCTO, STOCK FROM STOCK_SNAPSHOT_DETALLE")
+        self.assertEqual(dict(self.cursor.fetchall()), {1: 10, 2: 5})
+        self.delta(2, -2, '2024-01-01 12:00:00')
+        self.assertEqual(self.stock(), {1: 13, 2: 3})
+        self.assertEqual(self.stock(ids=[2]), {2: 3})
+        self.assertEqual(self.stock(hasta='2024-01-01 06:00:00'), {1: 13, 2: 5})
+
+        self.assertEqual(self.snapshot('2024-01-02 00:00:00')['tipo'], 'ACUMULADO')
+        self.delta(1, 4, '2024-01-02 08:00:00')
+        self.assertEqual(self.stock(), {1: 17, 2: 3})
+        # Un corte que no avanza no escribe nada
+        self.assertIsNone(self.snapshot('2024-01-01 18:00:00'))
+
+    def test_sin_snapshot(self):
+        with self.assertRaises(ledger.SinSnapshot):
+            ledger.stock_sql(self.cursor)
+        with self.assertRaises(ledger.SinSnapshot):
+            ledger.conciliar(self.cursor)
+
+    def test_conciliar_reporta_diferencias(self):
+        self.snapshot('2024-01-01 00:00:00')
+        self.delta(1, -1, '2024-01-01 10:00:00')
+        self.assertEqual(ledger.conciliar(self.cursor), [])
+        # Escritura directa sin delta
+        self.cursor.execute("UPDATE PRODUCTOS SET STOCK = 9 WHERE ID_PRODUCTO = 2")
+        self.assertEqual(ledger.conciliar(self.cursor), [
+            {'id_producto': 2, 'nombre': 'Mouse', 'stock': 9, 'libro': 5, 'diferencia': 4},
+        ])
+
+    def test_sobrescritura_anota_la_diferencia(self):
+        cursor = mock.MagicMock()
+        cursor.fetchall.return_value = [(1, 10), (2, 4)]
+        with mock.patch.object(ledger.registry, 'columns', return_value=['ID_DELTA']):
+            ledger.registrar_sobrescritura(cursor, {2: '4', 1: 7, 3: 5, None: 1}, 'AJUSTE')
+        self.assertEqual(cursor.execute.call_args.args[1], [1, 2, 3])
+        # Sin cambio no hay delta; el ID nuevo cuenta desde 0
+        cursor.executemany.assert_called_once_with(ledger.INSERT_DELTA_SQL, [
+            [1, -3, 'AJUSTE', None],
+            [3, 5, 'AJUSTE', None],
+        ])
+
+    def test_sin_tablas_no_escribe(self):
+        cursor = mock.MagicMock()
+        with mock.patch.object(ledger.registry, 'columns', return_value=[]):
+            ledger.registrar_sobrescritura(cursor, {1: 7}, 'AJUSTE')
+            ledger.registrar_deltas(cursor, [(1, 2)], 'VENTA')
+        cursor.execute.assert_not_called()
+        cursor.executemany.assert_not_called()
@@ -1,4 +1,5 @@
 from django.urls import path
+from core.asyncviews import async_view
 from . import views
 
 urlpatterns = [
@@ -6,7 +7,13 @@ urlpatterns = [
     
     # APIs de Productos
     path('api/productos/', views.api_productos_list, name='api_productos_list'),
+    path('api/productos/buscar/', views.api_productos_buscar, name='api_productos_buscar'),
+    path('api/productos/lookup/', views.api_productos_lookup, name='api_productos_lookup'),
+    path('api/productos/lookup/stats/', views.api_productos_lookup_stats, name='api_productos_lookup_stats'),
+    path('api/productos/<int:id>/', views.api_productos_detalle, name='api_productos_detalle'),
+    path('api/productos/codigo/<str:codigo>/', views.api_productos_codigo, name='api_productos_codigo'),
     path('api/productos/create/', views.api_productos_create, name='api_productos_create'),
+    path('api/productos/bulk/', views.api_productos_bulk, name='api_productos_bulk'),
     path('api/productos/<int:id>/update/', views.api_productos_update, name='api_productos_update'),
     path('api/productos/<int:id>/delete/', views.api_productos_delete, name='api_productos_delete'),
     
@@ -17,4 +24,14 @@ urlpatterns = [
     # APIs de Movimientos
     path('api/movimientos/', views.api_movimientos_list, name='api_movimientos_list'),
     path('api/movimientos/create/', views.api_movimientos_create, name='api_movimientos_create'),
+    path('api/movimientos/batch/', views.api_movimientos_batch, name='api_movimientos_batch'),
+    
+    # Stock según el libro de snapshots + deltas (?fecha=&ids=)
+    path('api/stock/', views.api_stock, name='api_stock'),
+    
+    # APIs de lectura async (ASGI)
+    path('api/async/productos/', async_view(views.api_productos_list), name='api_async_productos_list'),
+    path('api/async/productos/lookup/', async_view(views.api_productos_lookup), name='api_async_productos_lookup'),
+    path('api/async/proveedores/', async_view(views.api_proveedores_list), name='api_async_proveedores_list'),
+    path('api/async/movimientos/', async_view(views.api_movimientos_list), name='api_async_movimientos_list'),
 ]
@@ -1,8 +1,24 @@
 from django.shortcuts import render
 from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
-from django.db import connection
+from django.db import connection, transaction
+import itertools
 import json
+import time
+from datetime import date, datetime, timedelta
+
+from core import archivo
+from core.cache import cached_list, conditional_list, invalidate_on_commit
+from core.ids import insert_returning_id
+from core.schema import registry
+from core.streaming import STREAM_FORMATS, prepare_stream_cursor, streaming_json_response
+from core.sync import registrar_cambios
+from reportes.exportar import rango_archivado, rango_historial
+from reportes.resumenes import registrar_movimientos
+
+from . import ledger, lookup, purge
+from .bulk import BULK_CHUNK_MAX, BULK_CHUNK_SIZE, parse_productos, upsert_productos
+from .search import SEARCH_LIMIT_DEFAULT, index as search_index, producto_texto_cambiado
 
 def inventario_view(request):
     return render(request, 'inventario/Inventario.html')
@@ -11,20 +27,177 @@ def inventario_view(request):
 # API REST para PRODUCTOS
 # =============================================
 
+# Filtros admitidos por api_productos_list: parámetro GET -> (condición SQL, tipo)
+FILTROS_PRODUCTOS = {
+    'id_proveedor': ("p.ID_PROVEEDOR = %s", int),
+    'stock_min': ("p.STOCK >= %s", int),
+    'stock_max': ("p.STOCK <= %s", int),
+    'precio_min': ("p.PRECIO >= %s", float),
+    'precio_max': ("p.PRECIO <= %s", float),
+}
+
+# Tamaño máximo de página para el listado paginado
+PRODUCTOS_LIMIT_MAX = 500
+
+@cached_list('PRODUCTOS', 'PROVEEDORES')
 def api_productos_list(request):
-    """GET: Obtener todos los productos"""
+    """GET: Obtener productos (paginación por cursor y filtros opcionales)
+
+    Sin parámetros devuelve el catálogo completo, como siempre.
+    - limit: tamaño de página; activa la paginación por ID_PRODUCTO
+    - cursor: último ID_PRODUCTO recibido (se devuelve en next_cursor)
+    - nombre, id_proveedor, stock_min, stock_max, precio_min, precio_max
+    - count=true: incluye el total de filas que cumplen los filtros
+    """
+    try:
+        where = []
+        params = []
+
+        nombre = request.GET.get('nombre', '').strip()
+        if nombre:
+            where.append("UPPER(p.NOMBRE) LIKE UPPER(%s)")
+            params.append(f"%{nombre}%")
+
+        for param, (condicion, tipo) in FILTROS_PRODUCTOS.items():
+            valor = request.GET.get(param)
+            if valor not in (None, ''):
+                where.append(condicion)
+                params.append(tipo(valor))
+
+        limit = request.GET.get('limit')
+        limit = min(int(limit), PRODUCTOS_LIMIT_MAX) if limit else None
+        if limit is not None and limit < 1:
+            raise ValueError('limit debe ser mayor que 0')
+        cursor_id = request.GET.get('cursor')
+        cursor_id = int(cursor_id) if cursor_id else None
+    except ValueError as e:
+        return JsonResponse({'success': False, 'error': f'Parámetro inválido: {e}'}, status=400)
+
     cursor = connection.cursor()
-    cursor.execute("""
+
+    # Productos dados de baja (pendientes de purga) no aparecen en el catálogo
+    if 'ACTIVO' in registry.columns(cursor, 'PRODUCTOS'):
+        where.insert(0, "NVL(p.ACTIVO, 'S') = 'S'")
+
+    total = None
+    if request.GET.get('count') == 'true':
+        sql_count = "SELECT COUNT(*) FROM PRODUCTOS p"
+        if where:
+            sql_count += " WHERE " + " AND ".join(where)
+        cursor.execute(sql_count, params)
+        total = cursor.fetchone()[0]
+
+    # El cursor se aplica después del conteo: el total ignora la página actual
+    page_where = list(where)
+    page_params = list(params)
+    if cursor_id is not None:
+        page_where.append("p.ID_PRODUCTO > %s")
+        page_params.append(cursor_id)
+
+    sql = """
         SELECT p.ID_PRODUCTO, p.NOMBRE, p.DESCRIPCION, p.STOCK, p.PRECIO, 
                p.ID_PROVEEDOR, pr.NOMBRE as PROVEEDOR_NOMBRE
         FROM PRODUCTOS p
         LEFT JOIN PROVEEDORES pr ON p.ID_PROVEEDOR = pr.ID_PROVEEDOR
-        ORDER BY p.ID_PRODUCTO
-    """)
+    """
+    if page_where:
+        sql += " WHERE " + " AND ".join(page_where)
+    sql += " ORDER BY p.ID_PRODUCTO"
+    if limit is not None:
+        # Se pide una fila extra para saber si hay más páginas
+        sql += " FETCH FIRST %s ROWS ONLY"
+        page_params.append(limit + 1)
+
+    cursor.execute(sql, page_params)
     columns = [col[0].lower() for col in cursor.description]
     productos = [dict(zip(columns, row)) for row in cursor.fetchall()]
     cursor.close()
-    return JsonResponse({'success': True, 'data': productos})
+
+    response = {'success': True, 'data': productos}
+    if limit is not None:
+        has_more = len(productos) > limit
+        productos = productos[:limit]
+        response['data'] = productos
+        response['next_cursor'] = productos[-1]['id_producto'] if has_more else None
+    if total is not None:
+        response['total'] = total
+    return JsonResponse(response)
+
+def api_productos_buscar(request):
+    """GET: Búsqueda typeahead de productos (?q=texto&limit=10)"""
+    q = request.GET.get('q', '')
+    try:
+        limit = min(int(request.GET.get('limit', SEARCH_LIMIT_DEFAULT)), 50)
+    except ValueError:
+        return JsonResponse({'success': False, 'error': 'limit debe ser un número'}, status=400)
+
+    inicio = time.perf_counter()
+    resultados = search_index.search(q, limit)
+    return JsonResponse({
+        'success': True,
+        'data': resultados,
+        'ms': round((time.perf_counter() - inicio) * 1000, 2)
+    })
+
+def api_productos_detalle(request, id):
+    """GET: Un producto por ID (precio y stock, desde el cache de consulta)"""
+    producto = lookup.get_productos([id]).get(id)
+    if producto is None:
+        return JsonResponse({'success': False, 'error': 'Producto no encontrado'}, status=404)
+    return JsonResponse({'success': True, 'data': producto})
+
+def api_productos_codigo(request, codigo):
+    """GET: Un producto por código de barras/SKU"""
+    encontrados = lookup.get_productos_por_codigo([codigo])
+    if encontrados is None:
+        return JsonResponse({'success': False, 'error': 'PRODUCTOS no tiene columna CODIGO'}, status=400)
+    if codigo not in encontrados:
+        return JsonResponse({'success': False, 'error': 'Producto no encontrado'}, status=404)
+    return JsonResponse({'success': True, 'data': encontrados[codigo]})
+
+@csrf_exempt
+def api_productos_lookup(request):
+    """GET/POST: Varios productos en una llamada (un carrito completo)
+
+    GET ?ids=1,2,3&codigos=A,B o POST {"ids": [...], "codigos": [...]}
+    """
+    try:
+        if request.method == 'POST':
+            data = json.loads(request.body)
+            ids = [int(i) for i in data.get('ids', [])]
+            lista_codigos = [str(c) for c in data.get('codigos', [])]
+        else:
+            ids = [int(i) for i in request.GET.get('ids', '').split(',') if i]
+            lista_codigos = [c for c in request.GET.get('codigos', '').split(',') if c]
+    except (ValueError, TypeError, AttributeError) as e:
+        return JsonResponse({'success': False, 'error': f'Parámetros inválidos: {e}'}, status=400)
+
+    if len(ids) + len(lista_codigos) > lookup.LOOKUP_BATCH_MAX:
+        return JsonResponse({
+            'success': False,
+            'error': f'Máximo {lookup.LOOKUP_BATCH_MAX} productos por consulta'
+        }, status=400)
+
+    por_id = lookup.get_productos(ids) if ids else {}
+    por_codigo = lookup.get_productos_por_codigo(lista_codigos) if lista_codigos else {}
+    if por_codigo is None:
+        return JsonResponse({'success': False, 'error': 'PRODUCTOS no tiene columna CODIGO'}, status=400)
+
+    return JsonResponse({
+        'success': True,
+        'data': {
+            'ids': {str(i): p for i, p in por_id.items()},
+            'codigos': por_codigo,
+        },
+        'no_encontrados': {
+            'ids': [i for i in ids if i not in por_id],
+            'codigos': [c for c in lista_codigos if c not in por_codigo],
+        }
+    })
+
+def api_productos_lookup_stats(request):
+    """GET: Hits/misses del cache de consulta de productos en este proceso"""
+    return JsonResponse({'success': True, 'data': lookup.lookup_stats()})
 
 @csrf_exempt
 def api_productos_create(request):
@@ -34,25 +207,24 @@ def api_productos_create(request):
     
     try:
         data = json.loads(request.body)
-        cursor = connection.cursor()
-        
-        # Obtener el próximo ID
-        cursor.execute("SELECT NVL(MAX(ID_PRODUCTO), 0) + 1 FROM PRODUCTOS")
-        next_id = cursor.fetchone()[0]
         
-        cursor.execute("""
-            INSERT INTO PRODUCTOS (ID_PRODUCTO, NOMBRE, DESCRIPCION, STOCK, PRECIO, ID_PROVEEDOR)
-            VALUES (%s, %s, %s, %s, %s, %s)
-        """, [
-            next_id,
-            data.get('nombre'),
-            data.get('descripcion', ''),
-            data.get('stock', 0),
-            data.get('precio', 0),
-            data.get('id_proveedor')
-        ])
-        connection.commit()
-        cursor.close()
+        with transaction.atomic():
+            cursor = connection.cursor()
+            # El ID sale de SEQ_PRODUCTOS en el mismo INSERT
+            next_id = insert_returning_id(cursor, 'PRODUCTOS', [
+                'NOMBRE', 'DESCRIPCION', 'STOCK', 'PRECIO', 'ID_PROVEEDOR'
+            ], [
+                data.get('nombre'),
+                data.get('descripcion', ''),
+                data.get('stock', 0),
+                data.get('precio', 0),
+                data.get('id_proveedor')
+            ])
+            ledger.registrar_deltas(cursor, [(next_id, int(data.get('stock') or 0))], 'ALTA')
+            registrar_cambios(cursor, 'PRODUCTOS', [next_id])
+            cursor.close()
+        invalidate_on_commit('PRODUCTOS')
+        producto_texto_cambiado(next_id)
         
         return JsonResponse({'success': True, 'id': next_id, 'message': 'Producto creado'})
     except Exception as e:
@@ -66,22 +238,28 @@ def api_productos_update(request, id):
     
     try:
         data = json.loads(request.body)
-        cursor = connection.cursor()
         
-        cursor.execute("""
-            UPDATE PRODUCTOS 
-            SET NOMBRE = %s, DESCRIPCION = %s, STOCK = %s, PRECIO = %s, ID_PROVEEDOR = %s
-            WHERE ID_PRODUCTO = %s
-        """, [
-            data.get('nombre'),
-            data.get('descripcion', ''),
-            data.get('stock', 0),
-            data.get('precio', 0),
-            data.get('id_proveedor'),
-            id
-        ])
-        connection.commit()
-        cursor.close()
+        with transaction.atomic():
+            cursor = connection.cursor()
+            # STOCK se sobrescribe: el libro anota la diferencia con el valor actual
+            ledger.registrar_sobrescritura(cursor, {id: data.get('stock', 0)}, 'AJUSTE')
+            cursor.execute("""
+                UPDATE PRODUCTOS 
+                SET NOMBRE = %s, DESCRIPCION = %s, STOCK = %s, PRECIO = %s, ID_PROVEEDOR = %s
+                WHERE ID_PRODUCTO = %s
+            """, [
+                data.get('nombre'),
+                data.get('descripcion', ''),
+                data.get('stock', 0),
+                data.get('precio', 0),
+                data.get('id_proveedor'),
+                id
+            ])
+            registrar_cambios(cursor, 'PRODUCTOS', [id])
+            cursor.close()
+        invalidate_on_commit('PRODUCTOS')
+        producto_texto_cambiado(id)
+        lookup.invalidar(id)
         
         return JsonResponse({'success': True, 'message': 'Producto actualizado'})
     except Exception as e:
@@ -89,27 +267,22 @@ def api_productos_update(request, id):
 
 @csrf_exempt
 def api_productos_delete(request, id):
-    """DELETE: Eliminar un producto"""
+    """DELETE: Eliminar un producto
+
+    - ?check=true: solo devuelve el impacto (registros relacionados)
+    - por defecto: si PRODUCTOS tiene ACTIVO, lo marca inactivo al instante y
+      borra el historial dependiente en segundo plano, por lotes
+    - ?modo=inmediato (o sin columna ACTIVO): borra todo en esta request
+    """
     if request.method not in ['DELETE', 'POST']:
         return JsonResponse({'success': False, 'error': 'Método no permitido'}, status=405)
     
     try:
         cursor = connection.cursor()
         
-        # Contar registros relacionados
-        cursor.execute("SELECT COUNT(*) FROM MOVIMIENTOS_INVENTARIO WHERE ID_PRODUCTO = %s", [id])
-        movimientos = cursor.fetchone()[0]
-        
-        cursor.execute("SELECT COUNT(*) FROM GARANTIAS WHERE ID_PRODUCTO = %s", [id])
-        garantias = cursor.fetchone()[0]
-        
-        cursor.execute("SELECT COUNT(*) FROM DETALLE_VENTA WHERE ID_PRODUCTO = %s", [id])
-        detalles = cursor.fetchone()[0]
-        
-        # Obtener nombre del producto
-        cursor.execute("SELECT NOMBRE FROM PRODUCTOS WHERE ID_PRODUCTO = %s", [id])
-        row = cursor.fetchone()
-        nombre_producto = row[0] if row else 'Producto'
+        # Nombre y registros relacionados en una sola consulta
+        nombre_producto, relacionados = purge.impacto(cursor, id)
+        nombre_producto = nombre_producto or 'Producto'
         
         # Si hay registros relacionados y es solo consulta (check=true), devolver info
         if request.GET.get('check') == 'true':
@@ -118,39 +291,76 @@ def api_productos_delete(request, id):
                 'success': True,
                 'producto': nombre_producto,
                 'registros_relacionados': {
-                    'movimientos': movimientos,
-                    'garantias': garantias,
-                    'detalles_venta': detalles,
-                    'total': movimientos + garantias + detalles
+                    **relacionados,
+                    'total': sum(relacionados.values())
                 }
             })
         
-        # Eliminar registros dependientes
-        cursor.execute("DELETE FROM MOVIMIENTOS_INVENTARIO WHERE ID_PRODUCTO = %s", [id])
-        cursor.execute("DELETE FROM GARANTIAS WHERE ID_PRODUCTO = %s", [id])
-        cursor.execute("DELETE FROM DETALLE_VENTA WHERE ID_PRODUCTO = %s", [id])
-        
-        # Ahora eliminar el producto
-        cursor.execute("DELETE FROM PRODUCTOS WHERE ID_PRODUCTO = %s", [id])
-        connection.commit()
+        diferido = (request.GET.get('modo') != 'inmediato'
+                    and 'ACTIVO' in registry.columns(cursor, 'PRODUCTOS'))
+        with transaction.atomic():
+            if diferido:
+                # Baja lógica inmediata; el historial se purga en segundo plano
+                cursor.execute("UPDATE PRODUCTOS SET ACTIVO = 'N' WHERE ID_PRODUCTO = %s", [id])
+                transaction.on_commit(lambda: purge.worker.submit(id))
+            else:
+                for tabla in purge.tablas_a_purgar(cursor):
+                    cursor.execute(f"DELETE FROM {tabla} WHERE ID_PRODUCTO = %s", [id])
+                cursor.execute("DELETE FROM PRODUCTOS WHERE ID_PRODUCTO = %s", [id])
+            registrar_cambios(cursor, 'PRODUCTOS', [id], 'D')
         cursor.close()
+        invalidate_on_commit('PRODUCTOS', 'MOVIMIENTOS_INVENTARIO')
+        producto_texto_cambiado(id)
+        lookup.invalidar(id)
         
         return JsonResponse({
             'success': True, 
             'message': 'Producto eliminado',
-            'eliminados': {
-                'movimientos': movimientos,
-                'garantias': garantias,
-                'detalles_venta': detalles
-            }
+            'eliminados': relacionados,
+            'purga': 'en_segundo_plano' if diferido else 'completada'
         })
     except Exception as e:
         return JsonResponse({'success': False, 'error': str(e)}, status=400)
 
+@csrf_exempt
+def api_productos_bulk(request):
+    """POST: Alta/actualización masiva de productos (CSV o JSON)
+
+    Acepta un archivo en el campo `archivo`, un body text/csv o un JSON
+    (lista o {"productos": [...]}). Filas con id_producto actualizan ese
+    producto (un ID inexistente es error de fila) y el resto se crean con
+    SEQ_PRODUCTOS. Devuelve errores por fila y estadísticas de la carga.
+    """
+    if request.method != 'POST':
+        return JsonResponse({'success': False, 'error': 'Método no permitido'}, status=405)
+    
+    try:
+        archivo = request.FILES.get('archivo')
+        if archivo is not None:
+            formato = 'csv' if archivo.name.lower().endswith('.csv') else 'json'
+            contenido = archivo.read()
+        else:
+            formato = 'csv' if request.content_type == 'text/csv' else 'json'
+            contenido = request.body
+        rows = parse_productos(contenido, formato)
+        chunk = int(request.GET.get('chunk', BULK_CHUNK_SIZE))
+        if not 1 <= chunk <= BULK_CHUNK_MAX:
+            raise ValueError(f'chunk debe estar entre 1 y {BULK_CHUNK_MAX}')
+    except ValueError as e:
+        return JsonResponse({'success': False, 'error': f'Datos inválidos: {e}'}, status=400)
+
+    stats = upsert_productos(rows, chunk)
+    if stats['escritas']:
+        invalidate_on_commit('PRODUCTOS')
+        producto_texto_cambiado()
+        lookup.invalidar_todo()
+    return JsonResponse({'success': stats['con_error'] == 0, **stats})
+
 # =============================================
 # API REST para PROVEEDORES
 # =============================================
 
+@cached_list('PROVEEDORES')
 def api_proveedores_list(request):
     """GET: Obtener todos los proveedores"""
     cursor = connection.cursor()
@@ -168,23 +378,20 @@ def api_proveedores_create(request):
     
     try:
         data = json.loads(request.body)
-        cursor = connection.cursor()
-        
-        cursor.execute("SELECT NVL(MAX(ID_PROVEEDOR), 0) + 1 FROM PROVEEDORES")
-        next_id = cursor.fetchone()[0]
         
-        cursor.execute("""
-            INSERT INTO PROVEEDORES (ID_PROVEEDOR, NOMBRE, CONTACTO, TELEFONO, CORREO)
-            VALUES (%s, %s, %s, %s, %s)
-        """, [
-            next_id,
-            data.get('nombre'),
-            data.get('contacto', ''),
-            data.get('telefono', ''),
-            data.get('correo', '')
-        ])
-        connection.commit()
-        cursor.close()
+        with transaction.atomic():
+            cursor = connection.cursor()
+            next_id = insert_returning_id(cursor, 'PROVEEDORES', [
+                'NOMBRE', 'CONTACTO', 'TELEFONO', 'CORREO'
+            ], [
+                data.get('nombre'),
+                data.get('contacto', ''),
+                data.get('telefono', ''),
+                data.get('correo', '')
+            ])
+            registrar_cambios(cursor, 'PROVEEDORES', [next_id])
+            cursor.close()
+        invalidate_on_commit('PROVEEDORES')
         
         return JsonResponse({'success': True, 'id': next_id, 'message': 'Proveedor creado'})
     except Exception as e:
@@ -194,26 +401,57 @@ def api_proveedores_create(request):
 # API REST para MOVIMIENTOS DE INVENTARIO
 # =============================================
 
+@conditional_list('MOVIMIENTOS_INVENTARIO', 'PRODUCTOS')
 def api_movimientos_list(request):
-    """GET: Obtener todos los movimientos"""
+    """GET: Obtener todos los movimientos (?desde=&hasta=, ?stream=json|ndjson para streaming)
+
+    Con un `desde` anterior a la frontera del archivo (core.archivo) se
+    agregan, después de los de la base, los movimientos archivados del rango.
+    """
+    stream = request.GET.get('stream')
+    try:
+        where, params, limite = rango_historial(request.GET, 'm.FECHA', 'movimientos')
+    except ValueError as e:
+        return JsonResponse({'success': False, 'error': f'Fecha inválida: {e}'}, status=400)
     cursor = connection.cursor()
-    cursor.execute("""
+    if stream in STREAM_FORMATS:
+        prepare_stream_cursor(cursor)
+    cursor.execute(f"""
         SELECT m.ID_MOV, m.ID_PRODUCTO, p.NOMBRE as PRODUCTO_NOMBRE, 
                m.TIPO, m.CANTIDAD, m.FECHA
         FROM MOVIMIENTOS_INVENTARIO m
         LEFT JOIN PRODUCTOS p ON m.ID_PRODUCTO = p.ID_PRODUCTO
+        {(" WHERE " + " AND ".join(where)) if where else ""}
         ORDER BY m.FECHA DESC
-    """)
+    """, params)
+    archivados = _movimientos_archivados(request.GET, limite)
+    if stream in STREAM_FORMATS:
+        return streaming_json_response(cursor, stream, extra=archivados)
     columns = [col[0].lower() for col in cursor.description]
     movimientos = []
-    for row in cursor.fetchall():
-        mov = dict(zip(columns, row))
+    for mov in itertools.chain((dict(zip(columns, row)) for row in cursor.fetchall()), archivados):
         if mov.get('fecha'):
             mov['fecha'] = mov['fecha'].isoformat()
         movimientos.append(mov)
     cursor.close()
     return JsonResponse({'success': True, 'data': movimientos})
 
+def _movimientos_archivados(filtros, limite):
+    """Movimientos archivados del rango, más recientes primero y con las columnas del listado"""
+    if limite is None:
+        return
+    desde, hasta = rango_archivado(filtros, limite)
+    columnas = ['ID_MOV', 'ID_PRODUCTO', 'TIPO', 'CANTIDAD', 'FECHA']
+    filas = archivo.filas_recientes('MOVIMIENTOS_INVENTARIO', desde, hasta, columnas)
+    for m in archivo.con_nombres(filas, 'PRODUCTOS', 'id_producto', 'producto_nombre'):
+        yield {
+            'id_mov': m['id_mov'], 'id_producto': m['id_producto'], 'producto_nombre': m['producto_nombre'],
+            'tipo': m['tipo'], 'cantidad': m['cantidad'], 'fecha': m['fecha'],
+        }
+
+# Signo con que cada tipo de movimiento afecta al stock (otros tipos no lo cambian)
+SIGNO_MOVIMIENTO = {'ENTRADA': 1, 'SALIDA': -1}
+
 @csrf_exempt
 def api_movimientos_create(request):
     """POST: Crear un nuevo movimiento"""
@@ -222,35 +460,153 @@ def api_movimientos_create(request):
     
     try:
         data = json.loads(request.body)
-        cursor = connection.cursor()
-        
-        cursor.execute("SELECT NVL(MAX(ID_MOV), 0) + 1 FROM MOVIMIENTOS_INVENTARIO")
-        next_id = cursor.fetchone()[0]
-        
-        cursor.execute("""
-            INSERT INTO MOVIMIENTOS_INVENTARIO (ID_MOV, ID_PRODUCTO, TIPO, CANTIDAD, FECHA)
-            VALUES (%s, %s, %s, %s, SYSDATE)
-        """, [
-            next_id,
-            data.get('id_producto'),
-            data.get('tipo'),
-            data.get('cantidad', 0)
-        ])
-        
-        # Actualizar stock del producto
         tipo = data.get('tipo', '').upper()
         cantidad = int(data.get('cantidad', 0))
         id_producto = data.get('id_producto')
-        
-        if tipo == 'ENTRADA':
-            cursor.execute("UPDATE PRODUCTOS SET STOCK = STOCK + %s WHERE ID_PRODUCTO = %s", [cantidad, id_producto])
-        elif tipo == 'SALIDA':
-            cursor.execute("UPDATE PRODUCTOS SET STOCK = STOCK - %s WHERE ID_PRODUCTO = %s", [cantidad, id_producto])
-        
-        connection.commit()
-        cursor.close()
+        delta = SIGNO_MOVIMIENTO.get(tipo, 0) * cantidad
+
+        with transaction.atomic():
+            cursor = connection.cursor()
+            
+            next_id = insert_returning_id(cursor, 'MOVIMIENTOS_INVENTARIO', [
+                'ID_PRODUCTO', 'TIPO', 'CANTIDAD'
+            ], [
+                id_producto,
+                data.get('tipo'),
+                data.get('cantidad', 0)
+            ], expresiones={'FECHA': 'SYSDATE'})
+            
+            # Actualizar stock del producto
+            if delta:
+                cursor.execute("UPDATE PRODUCTOS SET STOCK = STOCK + %s WHERE ID_PRODUCTO = %s", [delta, id_producto])
+            
+            registrar_movimientos(cursor, [(id_producto, delta)])
+            ledger.registrar_deltas(cursor, [(id_producto, delta)], 'MOVIMIENTO', next_id)
+            if delta:
+                registrar_cambios(cursor, 'PRODUCTOS', [id_producto])
+            cursor.close()
+            invalidate_on_commit('MOVIMIENTOS_INVENTARIO', 'PRODUCTOS')
+            lookup.invalidar(id_producto)
         
         return JsonResponse({'success': True, 'id': next_id, 'message': 'Movimiento registrado'})
     except Exception as e:
         return JsonResponse({'success': False, 'error': str(e)}, status=400)
 
+@csrf_exempt
+def api_movimientos_batch(request):
+    """POST: Registrar varios movimientos en una sola transacción
+
+    Body: {"movimientos": [{id_producto, tipo, cantidad}, ...]}
+    Inserta todos los movimientos con un array insert y aplica el neto por
+    producto con un único UPDATE de PRODUCTOS por producto afectado.
+    """
+    if request.method != 'POST':
+        return JsonResponse({'success': False, 'error': 'Método no permitido'}, status=405)
+    
+    try:
+        data = json.loads(request.body)
+        items = data.get('movimientos') if isinstance(data, dict) else data
+        if not isinstance(items, list) or not items:
+            return JsonResponse({'success': False, 'error': 'No hay movimientos'}, status=400)
+
+        movimientos = []
+        errores = []
+        for fila, item in enumerate(items, start=1):
+            try:
+                movimientos.append([
+                    int(item['id_producto']),
+                    str(item.get('tipo', '')).upper(),
+                    int(item.get('cantidad', 0)),
+                ])
+            except (KeyError, TypeError, ValueError, AttributeError):
+                errores.append({'fila': fila, 'error': f'Movimiento inválido: {item}'})
+        if errores:
+            return JsonResponse({'success': False, 'error': 'Movimientos inválidos', 'errores': errores}, status=400)
+
+        # Neto de stock por producto
+        deltas = {}
+        for id_producto, tipo, cantidad in movimientos:
+            signo = SIGNO_MOVIMIENTO.get(tipo, 0)
+            if signo:
+                deltas[id_producto] = deltas.get(id_producto, 0) + signo * cantidad
+        deltas = {i: d for i, d in sorted(deltas.items()) if d != 0}
+
+        with transaction.atomic():
+            cursor = connection.cursor()
+            cursor.executemany("""
+                INSERT INTO MOVIMIENTOS_INVENTARIO (ID_MOV, ID_PRODUCTO, TIPO, CANTIDAD, FECHA)
+                VALUES (SEQ_MOVIMIENTOS.NEXTVAL, %s, %s, %s, SYSDATE)
+            """, movimientos)
+            if deltas:
+                # Orden por ID para tomar los bloqueos siempre en el mismo orden
+                cursor.executemany(
+                    "UPDATE PRODUCTOS SET STOCK = STOCK + %s WHERE ID_PRODUCTO = %s",
+                    [[delta, id_producto] for id_producto, delta in deltas.items()]
+                )
+            registrar_movimientos(cursor, [
+                (id_producto, SIGNO_MOVIMIENTO.get(tipo, 0) * cantidad)
+                for id_producto, tipo, cantidad in movimientos
+            ])
+            ledger.registrar_deltas(cursor, deltas, 'MOVIMIENTO')
+            registrar_cambios(cursor, 'PRODUCTOS', deltas)
+            cursor.close()
+            invalidate_on_commit('MOVIMIENTOS_INVENTARIO', 'PRODUCTOS')
+            lookup.invalidar(*deltas)
+
+        return JsonResponse({
+            'success': True,
+            'registrados': len(movimientos),
+            'stock_delta': {str(i): d for i, d in deltas.items()},
+            'message': 'Movimientos registrados'
+        })
+    except Exception as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+
+# =============================================
+# API de STOCK (libro de snapshots + deltas)
+# =============================================
+
+def api_stock(request):
+    """GET: Stock por producto según el libro de stock (inventario.ledger)
+
+    - fecha: YYYY-MM-DD (al cierre de ese día) o YYYY-MM-DDTHH:MM; sin fecha, el actual
+    - ids: 1,2,3 para consultar solo esos productos; sin ids devuelve todo el
+      catálogo en streaming (?stream=json|ndjson)
+    """
+    try:
+        fecha = request.GET.get('fecha')
+        hasta = None
+        if fecha:
+            hasta = (datetime.combine(date.fromisoformat(fecha), datetime.min.time()) + timedelta(days=1)
+                     if len(fecha) == 10 else datetime.fromisoformat(fecha))
+        ids = sorted({int(i) for i in request.GET.get('ids', '').split(',') if i})
+    except ValueError as e:
+        return JsonResponse({'success': False, 'error': f'Parámetros inválidos: {e}'}, status=400)
+    if len(ids) > lookup.LOOKUP_BATCH_MAX:
+        return JsonResponse({
+            'success': False, 'error': f'Máximo {lookup.LOOKUP_BATCH_MAX} productos por consulta'
+        }, status=400)
+
+    cursor = connection.cursor()
+    if not ledger.activo(cursor):
+        cursor.close()
+        return JsonResponse({
+            'success': False, 'error': 'Falta el libro de stock (python manage.py stock_ledger --snapshot)'
+        }, status=503)
+    try:
+        sql, params = ledger.stock_sql(cursor, hasta, ids)
+    except ledger.SinSnapshot as e:
+        cursor.close()
+        return JsonResponse({'success': False, 'error': str(e)}, status=409)
+
+    if not ids:
+        prepare_stream_cursor(cursor)
+        cursor.execute(sql, params)
+        formato = request.GET.get('stream', 'json')
+        return streaming_json_response(cursor, formato if formato in STREAM_FORMATS else 'json')
+
+    cursor.execute(sql, params)
+    stock = {str(i): s for i, s in cursor.fetchall()}
+    cursor.close()
+    # Los productos sin snapshot ni deltas en el periodo no tienen stock registrado
+    return JsonResponse({'success': True, 'data': {str(i): stock.get(str(i), 0) for i in ids}})
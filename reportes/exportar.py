@@ -0,0 +1,363 @@
+"""
+Exportación de reportes a CSV y XLSX en streaming.
+
+Las filas se leen del cursor en lotes (core.streaming.iter_rows) y se escriben
+a medida que llegan, así que exportar un año de ventas usa la misma memoria
+que exportar un día. El XLSX se arma a mano (sin openpyxl): un zip en
+streaming con una hoja de cadenas inline, sin tabla de strings compartidos,
+que es lo que obligaría a tener todo el contenido en memoria.
+"""
+import codecs
+import csv
+import itertools
+import re
+import zipfile
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from xml.sax.saxutils import escape
+
+from django.db import connection
+from django.http import StreamingHttpResponse
+
+from core import archivo
+from core.schema import registry
+from core.streaming import STREAM_BATCH_SIZE, iter_rows
+
+FORMATOS_EXPORTACION = {
+    'csv': 'text/csv; charset=utf-8',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+# Reporte -> SELECT con {where}; los filtros los arma consulta_exportacion()
+CONSULTAS_EXPORTACION = {
+    # Una fila por línea de venta
+    'ventas': """
+        SELECT v.ID_VENTA, v.FECHA, v.ID_USUARIO, u.NOMBRE AS VENDEDOR,
+               d.ID_PRODUCTO, p.NOMBRE AS PRODUCTO, d.CANTIDAD, d.PRECIO_UNITARIO,
+               d.SUBTOTAL, v.TOTAL AS TOTAL_VENTA
+        FROM VENTAS v
+        JOIN DETALLE_VENTA d ON d.ID_VENTA = v.ID_VENTA
+        LEFT JOIN PRODUCTOS p ON d.ID_PRODUCTO = p.ID_PRODUCTO
+        LEFT JOIN USUARIOS u ON v.ID_USUARIO = u.ID_USUARIO
+        {where}
+        ORDER BY v.FECHA, v.ID_VENTA, d.ID_DETALLE
+    """,
+    'movimientos': """
+        SELECT m.ID_MOV, m.FECHA, m.ID_PRODUCTO, p.NOMBRE AS PRODUCTO, m.TIPO, m.CANTIDAD
+        FROM MOVIMIENTOS_INVENTARIO m
+        LEFT JOIN PRODUCTOS p ON m.ID_PRODUCTO = p.ID_PRODUCTO
+        {where}
+        ORDER BY m.FECHA, m.ID_MOV
+    """,
+    'inventario': """
+        SELECT p.ID_PRODUCTO, p.NOMBRE, p.DESCRIPCION, p.STOCK, p.PRECIO,
+               NVL(p.STOCK, 0) * NVL(p.PRECIO, 0) AS VALOR,
+               p.ID_PROVEEDOR, pr.NOMBRE AS PROVEEDOR
+        FROM PRODUCTOS p
+        LEFT JOIN PROVEEDORES pr ON p.ID_PROVEEDOR = pr.ID_PROVEEDOR
+        {where}
+        ORDER BY p.ID_PRODUCTO
+    """,
+}
+
+# Caracteres de control que XML 1.0 no admite
+_XML_INVALIDOS = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+
+class _Buffer:
+    """Destino de escritura que acumula lo escrito hasta que el generador lo entrega"""
+
+    def __init__(self, vacio):
+        self._vacio = vacio
+        self._partes = []
+
+    def write(self, data):
+        self._partes.append(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def vaciar(self):
+        data = self._vacio.join(self._partes)
+        self._partes = []
+        return data
+
+
+def rango_fechas(filtros, columna):
+    """Condición SQL y parámetros para desde=YYYY-MM-DD / hasta=YYYY-MM-DD (ambos inclusive)"""
+    where = []
+    params = []
+    desde = filtros.get('desde')
+    hasta = filtros.get('hasta')
+    if desde:
+        where.append(f"{columna} >= %s")
+        params.append(date.fromisoformat(desde))
+    if hasta:
+        where.append(f"{columna} < %s")
+        params.append(date.fromisoformat(hasta) + timedelta(days=1))
+    return where, params
+
+
+def rango_con_archivo(filtros, columna, familia):
+    """Como rango_fechas, pero si el rango llega al historial archivado agrega
+    `columna >= frontera`; devuelve (where, params, frontera o None)"""
+    where, params = rango_fechas(filtros, columna)
+    desde = filtros.get('desde')
+    limite = archivo.incluye(familia, date.fromisoformat(desde) if desde else None)
+    if limite is not None:
+        where.append(f"{columna} >= %s")
+        params.append(limite)
+    return where, params, limite
+
+
+def rango_historial(filtros, columna, familia):
+    """rango_con_archivo para listados: el archivo solo entra con un `desde`
+    explícito anterior a la frontera; sin él, el listado es solo la base"""
+    if filtros.get('desde'):
+        return rango_con_archivo(filtros, columna, familia)
+    where, params = rango_fechas(filtros, columna)
+    return where, params, None
+
+
+def rango_archivado(filtros, limite):
+    """(desde, hasta) de la parte archivada del rango: hasta la frontera como máximo"""
+    desde = filtros.get('desde')
+    hasta = filtros.get('hasta')
+    fin = date.fromisoformat(hasta) + timedelta(days=1) if hasta else limite
+    return (date.fromisoformat(desde) if desde else None), min(fin, limite)
+
+
+def _filtro_entero(filtros, clave, condicion, where, params):
+    valor = filtros.get(clave)
+    if valor:
+        where.append(condicion)
+        params.append(int(valor))
+
+
+def consulta_exportacion(cursor, nombre, filtros):
+    """SQL y parámetros del reporte `nombre` con los filtros dados
+
+    `filtros` es request.GET o un dict con las mismas claves (desde, hasta,
+    id_producto, tipo, id_proveedor, stock_max). ValueError si alguno es inválido.
+    """
+    if nombre == 'ventas':
+        where, params, _ = rango_con_archivo(filtros, 'v.FECHA', 'ventas')
+        _filtro_entero(filtros, 'id_producto', "d.ID_PRODUCTO = %s", where, params)
+    elif nombre == 'movimientos':
+        where, params, _ = rango_con_archivo(filtros, 'm.FECHA', 'movimientos')
+        _filtro_entero(filtros, 'id_producto', "m.ID_PRODUCTO = %s", where, params)
+        if filtros.get('tipo'):
+            where.append("UPPER(m.TIPO) = %s")
+            params.append(filtros['tipo'].upper())
+    elif nombre == 'inventario':
+        where, params = [], []
+        _filtro_entero(filtros, 'id_producto', "p.ID_PRODUCTO = %s", where, params)
+        _filtro_entero(filtros, 'id_proveedor', "p.ID_PROVEEDOR = %s", where, params)
+        _filtro_entero(filtros, 'stock_max', "NVL(p.STOCK, 0) <= %s", where, params)
+        if 'ACTIVO' in registry.columns(cursor, 'PRODUCTOS'):
+            where.append("NVL(p.ACTIVO, 'S') = 'S'")
+    else:
+        raise ValueError(f'reporte desconocido: {nombre}')
+
+    sql_where = (" WHERE " + " AND ".join(where)) if where else ""
+    return CONSULTAS_EXPORTACION[nombre].format(where=sql_where), params
+
+
+def filas_archivadas(nombre, filtros):
+    """Filas del historial archivado (core.archivo) que pide el reporte, como
+    tuplas con las mismas columnas que CONSULTAS_EXPORTACION y anteriores a
+    todas las de la base; no genera nada si el rango no llega al archivo.
+
+    Se procesa un mes por vez: las ventas se cruzan con su detalle en memoria y
+    los nombres de productos y vendedores se buscan en la base por lote.
+    """
+    if nombre not in archivo.FAMILIAS:
+        return
+    desde = filtros.get('desde')
+    limite = archivo.incluye(nombre, date.fromisoformat(desde) if desde else None)
+    if limite is None:
+        return
+    id_producto = int(filtros['id_producto']) if filtros.get('id_producto') else None
+    tipo = filtros['tipo'].upper() if filtros.get('tipo') else None
+    desde, hasta = rango_archivado(filtros, limite)
+
+    for inicio, fin in archivo.meses(nombre, desde, hasta):
+        if nombre == 'ventas':
+            ventas = {
+                v['id_venta']: v
+                for v in archivo.filas('VENTAS', inicio, fin, ['ID_VENTA', 'FECHA', 'ID_USUARIO', 'TOTAL'])
+            }
+            detalle = [
+                d for d in archivo.filas(
+                    'DETALLE_VENTA', inicio, fin,
+                    ['ID_VENTA', 'ID_PRODUCTO', 'CANTIDAD', 'PRECIO_UNITARIO', 'SUBTOTAL'],
+                )
+                if id_producto is None or d['id_producto'] == id_producto
+            ]
+            with connection.cursor() as cursor:
+                productos = archivo.nombres(cursor, 'PRODUCTOS', (d['id_producto'] for d in detalle))
+                usuarios = archivo.nombres(cursor, 'USUARIOS', (v['id_usuario'] for v in ventas.values()))
+            for d in detalle:
+                v = ventas.get(d['id_venta'])
+                if v is None:
+                    continue
+                yield (
+                    v['id_venta'], v['fecha'], v['id_usuario'], usuarios.get(v['id_usuario']),
+                    d['id_producto'], productos.get(d['id_producto']), d['cantidad'],
+                    d['precio_unitario'], d['subtotal'], v['total'],
+                )
+        else:
+            movimientos = [
+                m for m in archivo.filas(
+                    'MOVIMIENTOS_INVENTARIO', inicio, fin,
+                    ['ID_MOV', 'FECHA', 'ID_PRODUCTO', 'TIPO', 'CANTIDAD'],
+                )
+                if (id_producto is None or m['id_producto'] == id_producto)
+                and (tipo is None or (m['tipo'] or '').upper() == tipo)
+            ]
+            with connection.cursor() as cursor:
+                productos = archivo.nombres(cursor, 'PRODUCTOS', (m['id_producto'] for m in movimientos))
+            for m in movimientos:
+                yield (
+                    m['id_mov'], m['fecha'], m['id_producto'], productos.get(m['id_producto']),
+                    m['tipo'], m['cantidad'],
+                )
+
+
+def nombre_archivo(nombre, filtros):
+    """Nombre de descarga sin extensión, con el rango de fechas si lo hay"""
+    sufijo = '_'.join(filter(None, [filtros.get('desde'), filtros.get('hasta')]))
+    return f"{nombre}_{sufijo}" if sufijo else nombre
+
+
+def _valor_csv(valor):
+    if isinstance(valor, datetime):
+        return valor.isoformat(sep=' ', timespec='seconds')
+    return valor
+
+
+def csv_chunks(columnas, filas, batch_size=STREAM_BATCH_SIZE):
+    """CSV (con BOM, para que Excel reconozca UTF-8) en bloques de batch_size filas"""
+    buffer = _Buffer('')
+    writer = csv.writer(buffer)
+    yield codecs.BOM_UTF8.decode('utf-8')
+    writer.writerow(columnas)
+    for n, fila in enumerate(filas, start=1):
+        writer.writerow([_valor_csv(v) for v in fila])
+        if n % batch_size == 0:
+            yield buffer.vaciar()
+    yield buffer.vaciar()
+
+
+# =============================================
+# XLSX
+# =============================================
+
+_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '</Types>'
+)
+
+_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+
+_WORKBOOK = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheets><sheet name="{hoja}" sheetId="1" r:id="rId1"/></sheets>'
+    '</workbook>'
+)
+
+_WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+    'Target="worksheets/sheet1.xml"/>'
+    '</Relationships>'
+)
+
+_SHEET_INICIO = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+)
+
+_SHEET_FIN = '</sheetData></worksheet>'
+
+
+def _celda(valor):
+    if valor is None:
+        return '<c/>'
+    if isinstance(valor, bool):
+        return f'<c t="b"><v>{int(valor)}</v></c>'
+    if isinstance(valor, (int, float, Decimal)):
+        return f'<c><v>{valor}</v></c>'
+    if isinstance(valor, datetime):
+        valor = valor.isoformat(sep=' ', timespec='seconds')
+    elif isinstance(valor, date):
+        valor = valor.isoformat()
+    texto = escape(_XML_INVALIDOS.sub('', str(valor)))
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{texto}</t></is></c>'
+
+
+def _fila_xml(valores):
+    return '<row>' + ''.join(_celda(v) for v in valores) + '</row>'
+
+
+def xlsx_chunks(columnas, filas, hoja='Reporte', batch_size=STREAM_BATCH_SIZE):
+    """Libro XLSX de una hoja, entregado en bloques a medida que se comprime"""
+    buffer = _Buffer(b'')
+    with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_DEFLATED) as libro:
+        libro.writestr('[Content_Types].xml', _CONTENT_TYPES)
+        libro.writestr('_rels/.rels', _RELS)
+        libro.writestr('xl/workbook.xml', _WORKBOOK.format(hoja=escape(hoja[:31])))
+        libro.writestr('xl/_rels/workbook.xml.rels', _WORKBOOK_RELS)
+        yield buffer.vaciar()
+
+        with libro.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as hoja_xml:
+            hoja_xml.write((_SHEET_INICIO + _fila_xml(columnas)).encode('utf-8'))
+            lote = []
+            for fila in filas:
+                lote.append(_fila_xml(fila))
+                if len(lote) >= batch_size:
+                    hoja_xml.write(''.join(lote).encode('utf-8'))
+                    lote = []
+                    yield buffer.vaciar()
+            hoja_xml.write((''.join(lote) + _SHEET_FIN).encode('utf-8'))
+    yield buffer.vaciar()
+
+
+def archivo_chunks(columnas, filas, formato, hoja='Reporte'):
+    """Bloques del archivo: str para CSV, bytes para XLSX"""
+    if formato == 'xlsx':
+        return xlsx_chunks(columnas, filas, hoja)
+    return csv_chunks(columnas, filas)
+
+
+def exportar_response(cursor, formato, nombre, hoja='Reporte', previas=()):
+    """StreamingHttpResponse de descarga con las filas de un cursor ya ejecutado
+
+    `previas`: filas que van antes de las del cursor (las del historial archivado).
+    """
+    columnas = [col[0].lower() for col in cursor.description]
+    filas = itertools.chain(previas, (tuple(fila.values()) for fila in iter_rows(cursor)))
+    response = StreamingHttpResponse(
+        archivo_chunks(columnas, filas, formato, hoja), content_type=FORMATOS_EXPORTACION[formato]
+    )
+    response['Content-Disposition'] = f'attachment; filename="{nombre}.{formato}"'
+    return response
@@ -0,0 +1,342 @@
+"""
+Reportes pesados en segundo plano.
+
+POST /reportes/api/jobs/ registra el pedido en REPORTES_JOBS y devuelve el ID
+al instante. Un pool de hilos del mismo proceso genera el archivo (CSV/XLSX,
+con las consultas de reportes.exportar) en REPORTES_JOBS_DIR y va anotando las
+filas escritas en la tabla, así que cualquier worker del host puede responder
+el estado y servir la descarga. No hace falta broker: la tabla es la cola.
+No se cuentan las filas de antemano (sería recorrer la consulta dos veces):
+mientras corre, el avance es la cantidad de filas escritas.
+
+Un resultado terminado se reutiliza durante REPORTES_JOBS_TTL segundos: pedir
+el mismo reporte con el mismo formato y filtros devuelve el job existente sin
+volver a consultar la base. Lo mismo si todavía está en curso; un índice único
+sobre la clave de los jobs en curso evita que dos pedidos simultáneos lancen
+el mismo reporte dos veces. Los plazos se calculan con la hora de la base.
+
+`manage.py reportes_jobs` crea la tabla, ejecuta los jobs que quedaron
+pendientes (p. ej. tras un reinicio) y borra los resultados vencidos.
+"""
+import hashlib
+import itertools
+import json
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, connection, connections, transaction
+
+from core.schema import registry
+from core.streaming import iter_rows, prepare_stream_cursor
+from .exportar import (
+    CONSULTAS_EXPORTACION, FORMATOS_EXPORTACION, archivo_chunks, consulta_exportacion, filas_archivadas,
+)
+
+logger = logging.getLogger(__name__)
+
+REPORTES_JOBS_DIR = getattr(settings, 'REPORTES_JOBS_DIR', settings.BASE_DIR / 'reportes_jobs')
+
+# Hilos que generan reportes en cada proceso
+REPORTES_JOBS_WORKERS = getattr(settings, 'REPORTES_JOBS_WORKERS', 2)
+
+# Segundos que un resultado terminado se reutiliza y se conserva en disco
+REPORTES_JOBS_TTL = getattr(settings, 'REPORTES_JOBS_TTL', 3600)
+
+# Cada cuántas filas escritas se actualiza el avance en la tabla
+PROGRESO_CADA = 10_000
+
+PENDIENTE, EJECUTANDO, LISTO, ERROR = 'PENDIENTE', 'EJECUTANDO', 'LISTO', 'ERROR'
+
+DDL_JOBS = [
+    """
+    CREATE TABLE REPORTES_JOBS (
+        ID_JOB NUMBER PRIMARY KEY,
+        REPORTE VARCHAR2(30) NOT NULL,
+        FORMATO VARCHAR2(10) NOT NULL,
+        FILTROS VARCHAR2(2000),
+        CLAVE VARCHAR2(64) NOT NULL,
+        ESTADO VARCHAR2(12) DEFAULT 'PENDIENTE' NOT NULL,
+        FILAS NUMBER DEFAULT 0 NOT NULL,
+        TOTAL_FILAS NUMBER,
+        ARCHIVO VARCHAR2(500),
+        ERROR VARCHAR2(1000),
+        CREADO TIMESTAMP DEFAULT SYSTIMESTAMP NOT NULL,
+        INICIADO TIMESTAMP,
+        TERMINADO TIMESTAMP
+    )
+    """,
+    "CREATE INDEX IX_REPORTES_JOBS_CLAVE ON REPORTES_JOBS (CLAVE, ESTADO)",
+    "CREATE SEQUENCE SEQ_REPORTES_JOBS",
+]
+
+# Un solo job PENDIENTE o EJECUTANDO por clave (los demás estados quedan fuera del índice)
+INDICE_EN_CURSO = 'UX_REPORTES_JOBS_EN_CURSO'
+DDL_EN_CURSO = f"""
+    CREATE UNIQUE INDEX {INDICE_EN_CURSO} ON REPORTES_JOBS (
+        CASE WHEN ESTADO IN ('{PENDIENTE}', '{EJECUTANDO}') THEN CLAVE END
+    )
+"""
+
+# Filtros que admite cada reporte (el resto se ignora y no cuenta para la clave)
+FILTROS = {
+    'ventas': ('desde', 'hasta', 'id_producto'),
+    'movimientos': ('desde', 'hasta', 'id_producto', 'tipo'),
+    'inventario': ('id_producto', 'id_proveedor', 'stock_max'),
+}
+
+_COLUMNAS = """
+    ID_JOB, REPORTE, FORMATO, FILTROS, ESTADO, FILAS, TOTAL_FILAS,
+    ARCHIVO, ERROR, CREADO, INICIADO, TERMINADO
+"""
+
+
+def disponible():
+    """True si existe la tabla REPORTES_JOBS (python manage.py reportes_jobs)"""
+    with connection.cursor() as cursor:
+        return bool(registry.columns(cursor, 'REPORTES_JOBS'))
+
+
+def normalizar(reporte, formato, filtros):
+    """Valida el pedido; devuelve los filtros admitidos como dict de str. ValueError si es inválido"""
+    if reporte not in CONSULTAS_EXPORTACION:
+        raise ValueError(f"reporte debe ser uno de: {', '.join(CONSULTAS_EXPORTACION)}")
+    if formato not in FORMATOS_EXPORTACION:
+        raise ValueError('formato debe ser csv o xlsx')
+    filtros = {k: str(filtros[k]) for k in FILTROS[reporte] if filtros.get(k) not in (None, '')}
+    # Mismo chequeo que hará el job, para rechazar el pedido ahora y no al ejecutarlo
+    with connection.cursor() as cursor:
+        consulta_exportacion(cursor, reporte, filtros)
+    return filtros
+
+
+def clave(reporte, formato, filtros):
+    texto = json.dumps([reporte, formato, filtros], sort_keys=True)
+    return hashlib.sha256(texto.encode('utf-8')).hexdigest()
+
+
+def _job(fila):
+    (id_job, reporte, formato, filtros, estado, filas, total_filas,
+     archivo, error, creado, iniciado, terminado) = fila
+    # TOTAL_FILAS solo se conoce al terminar; mientras tanto el avance son las filas escritas
+    progreso = 100 if estado == LISTO else None
+    return {
+        'id_job': id_job,
+        'reporte': reporte,
+        'formato': formato,
+        'filtros': json.loads(filtros) if filtros else {},
+        'estado': estado,
+        'filas': filas,
+        'total_filas': total_filas,
+        'progreso': progreso,
+        'error': error,
+        'creado': creado,
+        'iniciado': iniciado,
+        'terminado': terminado,
+        'expira': terminado + timedelta(seconds=REPORTES_JOBS_TTL) if estado == LISTO else None,
+        'archivo': archivo,
+    }
+
+
+def obtener(cursor, id_job):
+    cursor.execute(f"SELECT {_COLUMNAS} FROM REPORTES_JOBS WHERE ID_JOB = %s", [id_job])
+    fila = cursor.fetchone()
+    return _job(fila) if fila else None
+
+
+def listar(cursor, limite=50):
+    cursor.execute(
+        f"SELECT {_COLUMNAS} FROM REPORTES_JOBS ORDER BY ID_JOB DESC FETCH FIRST %s ROWS ONLY",
+        [limite]
+    )
+    return [_job(fila) for fila in cursor.fetchall()]
+
+
+def _reutilizable(cursor, clave_job):
+    """Job en curso o terminado y vigente con la misma clave, o None"""
+    cursor.execute(f"""
+        SELECT {_COLUMNAS} FROM REPORTES_JOBS
+        WHERE CLAVE = %s
+          AND (ESTADO IN ('{PENDIENTE}', '{EJECUTANDO}')
+               OR (ESTADO = '{LISTO}' AND TERMINADO > SYSTIMESTAMP - NUMTODSINTERVAL(%s, 'SECOND')))
+        ORDER BY ID_JOB DESC
+        FETCH FIRST 1 ROWS ONLY
+    """, [clave_job, REPORTES_JOBS_TTL])
+    fila = cursor.fetchone()
+    if fila is None:
+        return None
+    job = _job(fila)
+    if job['estado'] == LISTO and not os.path.exists(job['archivo'] or ''):
+        return None
+    return job
+
+
+def crear(reporte, formato, filtros):
+    """Registra el pedido y lo encola; devuelve (job, reutilizado)
+
+    `filtros` debe venir de normalizar().
+    """
+    clave_job = clave(reporte, formato, filtros)
+    with connection.cursor() as cursor:
+        existente = _reutilizable(cursor, clave_job)
+        if existente is not None:
+            return existente, True
+
+        cursor.execute("SELECT SEQ_REPORTES_JOBS.NEXTVAL FROM DUAL")
+        id_job = cursor.fetchone()[0]
+        try:
+            with transaction.atomic():
+                cursor.execute("""
+                    INSERT INTO REPORTES_JOBS (ID_JOB, REPORTE, FORMATO, FILTROS, CLAVE, ESTADO)
+                    VALUES (%s, %s, %s, %s, %s, %s)
+                """, [id_job, reporte, formato, json.dumps(filtros, sort_keys=True), clave_job, PENDIENTE])
+        except IntegrityError:
+            # Un pedido idéntico simultáneo ya registró el job (UX_REPORTES_JOBS_EN_CURSO)
+            existente = _reutilizable(cursor, clave_job)
+            if existente is None:
+                raise
+            return existente, True
+        job = obtener(cursor, id_job)
+    runner.submit(id_job)
+    return job, False
+
+
+def _tomar(cursor, id_job):
+    """Pasa el job a EJECUTANDO; False si otro hilo o proceso ya lo tomó"""
+    cursor.execute(f"""
+        UPDATE REPORTES_JOBS SET ESTADO = '{EJECUTANDO}', INICIADO = SYSTIMESTAMP, FILAS = 0
+        WHERE ID_JOB = %s AND ESTADO = '{PENDIENTE}'
+    """, [id_job])
+    return cursor.rowcount == 1
+
+
+def ruta_resultado(id_job, formato):
+    return os.path.join(REPORTES_JOBS_DIR, f'reporte_{id_job}.{formato}')
+
+
+def ejecutar(id_job):
+    """Genera el archivo de un job PENDIENTE; devuelve False si no había nada que hacer
+
+    Cada UPDATE confirma por separado (autocommit), así el avance se ve desde
+    otros procesos mientras el job corre.
+    """
+    with connection.cursor() as cursor:
+        if not _tomar(cursor, id_job):
+            return False
+        job = obtener(cursor, id_job)
+
+    ruta = ruta_resultado(id_job, job['formato'])
+    temporal = ruta + '.tmp'
+    try:
+        os.makedirs(REPORTES_JOBS_DIR, exist_ok=True)
+        with connection.cursor() as datos:
+            sql, params = consulta_exportacion(datos, job['reporte'], job['filtros'])
+            prepare_stream_cursor(datos)
+            datos.execute(sql, params)
+            filas = _escribir(datos, job, temporal)
+        os.replace(temporal, ruta)
+
+        with connection.cursor() as cursor:
+            cursor.execute(f"""
+                UPDATE REPORTES_JOBS
+                SET ESTADO = '{LISTO}', FILAS = %s, TOTAL_FILAS = %s, ARCHIVO = %s, TERMINADO = SYSTIMESTAMP
+                WHERE ID_JOB = %s
+            """, [filas, filas, ruta, id_job])
+        logger.info('Reporte %s (%s) listo: %s filas', id_job, job['reporte'], filas)
+    except Exception as e:
+        logger.exception('Error generando el reporte %s', id_job)
+        if os.path.exists(temporal):
+            os.remove(temporal)
+        with connection.cursor() as cursor:
+            cursor.execute(f"""
+                UPDATE REPORTES_JOBS SET ESTADO = '{ERROR}', ERROR = %s, TERMINADO = SYSTIMESTAMP
+                WHERE ID_JOB = %s
+            """, [str(e)[:1000], id_job])
+    return True
+
+
+def _escribir(datos, job, ruta):
+    """Escribe el archivo a medida que llegan las filas, anotando el avance"""
+    filas = 0
+    avance = connection.cursor()
+
+    def leer():
+        nonlocal filas
+        calientes = (tuple(fila.values()) for fila in iter_rows(datos))
+        for fila in itertools.chain(filas_archivadas(job['reporte'], job['filtros']), calientes):
+            filas += 1
+            if filas % PROGRESO_CADA == 0:
+                avance.execute("UPDATE REPORTES_JOBS SET FILAS = %s WHERE ID_JOB = %s", [filas, job['id_job']])
+            yield fila
+
+    columnas = [col[0].lower() for col in datos.description]
+    chunks = archivo_chunks(columnas, leer(), job['formato'], hoja=job['reporte'])
+    modo = 'wb' if job['formato'] == 'xlsx' else 'w'
+    opciones = {} if modo == 'wb' else {'encoding': 'utf-8', 'newline': ''}
+    try:
+        with open(ruta, modo, **opciones) as archivo:
+            for chunk in chunks:
+                archivo.write(chunk)
+    finally:
+        avance.close()
+    return filas
+
+
+def pendientes(cursor):
+    cursor.execute(f"SELECT ID_JOB FROM REPORTES_JOBS WHERE ESTADO = '{PENDIENTE}' ORDER BY ID_JOB")
+    return [fila[0] for fila in cursor.fetchall()]
+
+
+def reencolar_interrumpidos(cursor):
+    """Devuelve a PENDIENTE los jobs que quedaron EJECUTANDO (proceso reiniciado)"""
+    cursor.execute(f"""
+        UPDATE REPORTES_JOBS SET ESTADO = '{PENDIENTE}', FILAS = 0, INICIADO = NULL
+        WHERE ESTADO = '{EJECUTANDO}'
+    """)
+    return cursor.rowcount
+
+
+def limpiar(cursor):
+    """Borra los jobs terminados hace más de REPORTES_JOBS_TTL y sus archivos"""
+    cursor.execute(f"""
+        SELECT ID_JOB, ARCHIVO FROM REPORTES_JOBS
+        WHERE ESTADO IN ('{LISTO}', '{ERROR}')
+          AND TERMINADO < SYSTIMESTAMP - NUMTODSINTERVAL(%s, 'SECOND')
+    """, [REPORTES_JOBS_TTL])
+    vencidos = cursor.fetchall()
+    for _, archivo in vencidos:
+        if archivo and os.path.exists(archivo):
+            os.remove(archivo)
+    cursor.executemany("DELETE FROM REPORTES_JOBS WHERE ID_JOB = %s", [[id_job] for id_job, _ in vencidos])
+    return len(vencidos)
+
+
+class _JobRunner:
+    """Pool de hilos de este proceso que ejecuta los jobs encolados"""
+
+    def __init__(self, workers):
+        self._workers = workers
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def submit(self, id_job):
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self._workers, thread_name_prefix='reportes-job')
+        self._pool.submit(self._run, id_job)
+
+    @staticmethod
+    def _run(id_job):
+        try:
+            ejecutar(id_job)
+        except Exception:
+            logger.exception('Error ejecutando el job %s', id_job)
+        finally:
+            # Devolver la conexión de este hilo al pool
+            connections.close_all()
+
+
+runner = _JobRunner(REPORTES_JOBS_WORKERS)
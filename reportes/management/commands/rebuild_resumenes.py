@@ -0,0 +1,82 @@
+"""
+Crea (si faltan) y recalcula las tablas de resumen diario desde el detalle:
+
+    python manage.py rebuild_resumenes
+    python manage.py rebuild_resumenes --desde 2025-01-01
+
+Los días ya archivados (core.archivo) no están en el detalle: el recálculo
+empieza en la frontera del archivo y conserva los resúmenes anteriores. Si
+RESUMEN_VENDEDORES_DIA se crea después de archivar, los días archivados se
+cargan desde el archivo.
+"""
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from core import archivo
+from core.schema import bump_schema_version
+from reportes.resumenes import (
+    DDL_RESUMENES, INSERT_VENDEDORES_SQL, REBUILD_FECHA, REBUILD_SQL, vendedores_archivados,
+)
+
+
+# Resumen -> familia del archivo cuyo detalle lo alimenta
+FAMILIA_RESUMEN = {
+    'RESUMEN_VENTAS_DIA': 'ventas',
+    'RESUMEN_VENDEDORES_DIA': 'ventas',
+    'RESUMEN_MOVIMIENTOS_DIA': 'movimientos',
+}
+
+
+class Command(BaseCommand):
+    help = 'Recalcula RESUMEN_VENTAS_DIA, RESUMEN_VENDEDORES_DIA y RESUMEN_MOVIMIENTOS_DIA desde el detalle'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--desde', help='Recalcular solo desde esta fecha (YYYY-MM-DD)')
+        parser.add_argument('--tabla', choices=list(DDL_RESUMENES),
+                            help='Recalcular solo una de las tablas')
+
+    def handle(self, *args, **options):
+        try:
+            desde = date.fromisoformat(options['desde']) if options['desde'] else None
+        except ValueError:
+            raise CommandError('--desde debe tener formato YYYY-MM-DD')
+        tablas = [options['tabla']] if options['tabla'] else list(DDL_RESUMENES)
+
+        cursor = connection.cursor()
+        cursor.execute("SELECT TABLE_NAME FROM USER_TABLES")
+        existentes = {row[0] for row in cursor.fetchall()}
+
+        for tabla in tablas:
+            frontera = archivo.frontera(FAMILIA_RESUMEN[tabla])
+            if tabla not in existentes:
+                cursor.execute(DDL_RESUMENES[tabla])
+                if tabla == 'RESUMEN_VENDEDORES_DIA' and frontera:
+                    filas = vendedores_archivados(frontera)
+                    if filas:
+                        with transaction.atomic():
+                            cursor.executemany(INSERT_VENDEDORES_SQL, filas)
+                    self.stdout.write(f'  {tabla}: {len(filas)} filas desde el archivo')
+                # Las escrituras y los reportes consultan el registro de esquema para saber si existe
+                bump_schema_version()
+                self.stdout.write(f'  {tabla}: creada')
+
+            inicio = desde
+            if frontera and (inicio is None or inicio < frontera):
+                inicio = frontera
+                self.stdout.write(f'  {tabla}: desde {frontera} (lo anterior está archivado)')
+
+            with transaction.atomic():
+                if inicio:
+                    cursor.execute(f"DELETE FROM {tabla} WHERE FECHA >= %s", [inicio])
+                    where = f"WHERE {REBUILD_FECHA[tabla]} >= %s"
+                    params = [inicio]
+                else:
+                    cursor.execute(f"DELETE FROM {tabla}")
+                    where, params = '', []
+                cursor.execute(REBUILD_SQL[tabla].format(where=where), params)
+                self.stdout.write(f'  {tabla}: {cursor.rowcount} filas')
+
+        cursor.close()
+        self.stdout.write(self.style.SUCCESS('Resúmenes recalculados'))
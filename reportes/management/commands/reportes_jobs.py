@@ -0,0 +1,57 @@
+"""
+Crea (si faltan) la tabla REPORTES_JOBS de los reportes en segundo plano y su
+índice único de jobs en curso, y mantiene la cola:
+
+    python manage.py reportes_jobs
+    python manage.py reportes_jobs --reencolar --procesar   # tras un reinicio
+    python manage.py reportes_jobs --limpiar                # p. ej. desde cron
+"""
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from core.schema import bump_schema_version
+from reportes import jobs
+
+
+class Command(BaseCommand):
+    help = 'Crea REPORTES_JOBS, ejecuta los reportes pendientes y borra los resultados vencidos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reencolar', action='store_true',
+                            help='Volver a PENDIENTE los jobs que quedaron EJECUTANDO (usar con los workers detenidos)')
+        parser.add_argument('--procesar', action='store_true',
+                            help='Ejecutar aquí los jobs pendientes')
+        parser.add_argument('--limpiar', action='store_true',
+                            help=f'Borrar los jobs terminados hace más de {jobs.REPORTES_JOBS_TTL} s y sus archivos')
+
+    def handle(self, *args, **options):
+        cursor = connection.cursor()
+        cursor.execute("SELECT TABLE_NAME FROM USER_TABLES WHERE TABLE_NAME = 'REPORTES_JOBS'")
+        if cursor.fetchone() is None:
+            for ddl in jobs.DDL_JOBS:
+                cursor.execute(ddl)
+            # Las vistas consultan el registro de esquema para saber si la tabla existe
+            bump_schema_version()
+            self.stdout.write('  REPORTES_JOBS: creada')
+        else:
+            self.stdout.write('  REPORTES_JOBS: ya existe')
+
+        # Tablas creadas antes del índice de jobs en curso
+        cursor.execute("SELECT 1 FROM USER_INDEXES WHERE INDEX_NAME = %s", [jobs.INDICE_EN_CURSO])
+        if cursor.fetchone() is None:
+            cursor.execute(jobs.DDL_EN_CURSO)
+            self.stdout.write(f'  {jobs.INDICE_EN_CURSO}: creado')
+
+        if options['reencolar']:
+            self.stdout.write(f'  {jobs.reencolar_interrumpidos(cursor)} jobs interrumpidos reencolados')
+
+        if options['procesar']:
+            for id_job in jobs.pendientes(cursor):
+                jobs.ejecutar(id_job)
+                job = jobs.obtener(cursor, id_job)
+                self.stdout.write(f"  job {id_job} ({job['reporte']}): {job['estado']}, {job['filas']} filas")
+
+        if options['limpiar']:
+            self.stdout.write(f'  {jobs.limpiar(cursor)} jobs vencidos borrados')
+
+        cursor.close()
@@ -0,0 +1,210 @@
+"""
+Tablas de resumen diario mantenidas en las rutas de escritura.
+
+- RESUMEN_VENTAS_DIA: unidades, monto y líneas vendidas por producto y día
+  (se actualiza en api_ventas_checkout).
+- RESUMEN_VENDEDORES_DIA: ventas y monto por vendedor y día (api_ventas_checkout
+  y api_ventas_create); alimenta los reportes de ventas por periodo y por
+  vendedor. Las ventas sin vendedor se anotan con ID_USUARIO = 0.
+- RESUMEN_MOVIMIENTOS_DIA: entradas y salidas de stock por producto y día
+  (se actualiza en api_movimientos_create y api_movimientos_batch).
+
+Las actualizaciones se hacen con MERGE dentro de la misma transacción que la
+escritura de detalle. `manage.py rebuild_resumenes` crea las tablas y las
+recalcula desde el detalle (carga inicial o recuperación). Mientras una tabla
+no exista, las escrituras no la tocan y los reportes leen el detalle.
+"""
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+
+from core import archivo
+from core.schema import registry
+
+RESUMENES_DIARIOS = getattr(settings, 'RESUMENES_DIARIOS', True)
+
+DDL_RESUMENES = {
+    'RESUMEN_VENTAS_DIA': """
+        CREATE TABLE RESUMEN_VENTAS_DIA (
+            FECHA DATE NOT NULL,
+            ID_PRODUCTO NUMBER NOT NULL,
+            UNIDADES NUMBER DEFAULT 0 NOT NULL,
+            TOTAL NUMBER(14,2) DEFAULT 0 NOT NULL,
+            LINEAS NUMBER DEFAULT 0 NOT NULL,
+            CONSTRAINT PK_RESUMEN_VENTAS_DIA PRIMARY KEY (FECHA, ID_PRODUCTO)
+        )
+    """,
+    'RESUMEN_VENDEDORES_DIA': """
+        CREATE TABLE RESUMEN_VENDEDORES_DIA (
+            FECHA DATE NOT NULL,
+            ID_USUARIO NUMBER NOT NULL,
+            VENTAS NUMBER DEFAULT 0 NOT NULL,
+            TOTAL NUMBER(14,2) DEFAULT 0 NOT NULL,
+            CONSTRAINT PK_RESUMEN_VENDEDORES_DIA PRIMARY KEY (FECHA, ID_USUARIO)
+        )
+    """,
+    'RESUMEN_MOVIMIENTOS_DIA': """
+        CREATE TABLE RESUMEN_MOVIMIENTOS_DIA (
+            FECHA DATE NOT NULL,
+            ID_PRODUCTO NUMBER NOT NULL,
+            ENTRADAS NUMBER DEFAULT 0 NOT NULL,
+            SALIDAS NUMBER DEFAULT 0 NOT NULL,
+            MOVIMIENTOS NUMBER DEFAULT 0 NOT NULL,
+            CONSTRAINT PK_RESUMEN_MOVIMIENTOS_DIA PRIMARY KEY (FECHA, ID_PRODUCTO)
+        )
+    """,
+}
+
+MERGE_VENTAS_SQL = """
+    MERGE INTO RESUMEN_VENTAS_DIA r
+    USING (
+        SELECT TRUNC(SYSDATE) AS FECHA, %s AS ID_PRODUCTO, %s AS UNIDADES,
+               %s AS TOTAL, %s AS LINEAS
+        FROM DUAL
+    ) s
+    ON (r.FECHA = s.FECHA AND r.ID_PRODUCTO = s.ID_PRODUCTO)
+    WHEN MATCHED THEN UPDATE SET
+        r.UNIDADES = r.UNIDADES + s.UNIDADES, r.TOTAL = r.TOTAL + s.TOTAL,
+        r.LINEAS = r.LINEAS + s.LINEAS
+    WHEN NOT MATCHED THEN INSERT (FECHA, ID_PRODUCTO, UNIDADES, TOTAL, LINEAS)
+        VALUES (s.FECHA, s.ID_PRODUCTO, s.UNIDADES, s.TOTAL, s.LINEAS)
+"""
+
+MERGE_VENDEDORES_SQL = """
+    MERGE INTO RESUMEN_VENDEDORES_DIA r
+    USING (
+        SELECT TRUNC(SYSDATE) AS FECHA, %s AS ID_USUARIO, %s AS TOTAL FROM DUAL
+    ) s
+    ON (r.FECHA = s.FECHA AND r.ID_USUARIO = s.ID_USUARIO)
+    WHEN MATCHED THEN UPDATE SET r.VENTAS = r.VENTAS + 1, r.TOTAL = r.TOTAL + s.TOTAL
+    WHEN NOT MATCHED THEN INSERT (FECHA, ID_USUARIO, VENTAS, TOTAL)
+        VALUES (s.FECHA, s.ID_USUARIO, 1, s.TOTAL)
+"""
+
+MERGE_MOVIMIENTOS_SQL = """
+    MERGE INTO RESUMEN_MOVIMIENTOS_DIA r
+    USING (
+        SELECT TRUNC(SYSDATE) AS FECHA, %s AS ID_PRODUCTO, %s AS ENTRADAS,
+               %s AS SALIDAS, %s AS MOVIMIENTOS
+        FROM DUAL
+    ) s
+    ON (r.FECHA = s.FECHA AND r.ID_PRODUCTO = s.ID_PRODUCTO)
+    WHEN MATCHED THEN UPDATE SET
+        r.ENTRADAS = r.ENTRADAS + s.ENTRADAS, r.SALIDAS = r.SALIDAS + s.SALIDAS,
+        r.MOVIMIENTOS = r.MOVIMIENTOS + s.MOVIMIENTOS
+    WHEN NOT MATCHED THEN INSERT (FECHA, ID_PRODUCTO, ENTRADAS, SALIDAS, MOVIMIENTOS)
+        VALUES (s.FECHA, s.ID_PRODUCTO, s.ENTRADAS, s.SALIDAS, s.MOVIMIENTOS)
+"""
+
+# Recalculo completo desde el detalle (rebuild_resumenes)
+REBUILD_SQL = {
+    'RESUMEN_VENTAS_DIA': """
+        INSERT INTO RESUMEN_VENTAS_DIA (FECHA, ID_PRODUCTO, UNIDADES, TOTAL, LINEAS)
+        SELECT TRUNC(v.FECHA), d.ID_PRODUCTO, NVL(SUM(d.CANTIDAD), 0),
+               NVL(SUM(d.SUBTOTAL), 0), COUNT(*)
+        FROM DETALLE_VENTA d
+        JOIN VENTAS v ON d.ID_VENTA = v.ID_VENTA
+        {where}
+        GROUP BY TRUNC(v.FECHA), d.ID_PRODUCTO
+    """,
+    'RESUMEN_VENDEDORES_DIA': """
+        INSERT INTO RESUMEN_VENDEDORES_DIA (FECHA, ID_USUARIO, VENTAS, TOTAL)
+        SELECT TRUNC(v.FECHA), NVL(v.ID_USUARIO, 0), COUNT(*), NVL(SUM(v.TOTAL), 0)
+        FROM VENTAS v
+        {where}
+        GROUP BY TRUNC(v.FECHA), NVL(v.ID_USUARIO, 0)
+    """,
+    'RESUMEN_MOVIMIENTOS_DIA': """
+        INSERT INTO RESUMEN_MOVIMIENTOS_DIA (FECHA, ID_PRODUCTO, ENTRADAS, SALIDAS, MOVIMIENTOS)
+        SELECT TRUNC(m.FECHA), m.ID_PRODUCTO,
+               NVL(SUM(CASE WHEN UPPER(m.TIPO) = 'ENTRADA' THEN m.CANTIDAD END), 0),
+               NVL(SUM(CASE WHEN UPPER(m.TIPO) = 'SALIDA' THEN m.CANTIDAD END), 0),
+               COUNT(*)
+        FROM MOVIMIENTOS_INVENTARIO m
+        {where}
+        GROUP BY TRUNC(m.FECHA), m.ID_PRODUCTO
+    """,
+}
+
+# Columna de fecha del detalle para limitar el recalculo con --desde
+REBUILD_FECHA = {
+    'RESUMEN_VENTAS_DIA': 'v.FECHA',
+    'RESUMEN_VENDEDORES_DIA': 'v.FECHA',
+    'RESUMEN_MOVIMIENTOS_DIA': 'm.FECHA',
+}
+
+INSERT_VENDEDORES_SQL = """
+    INSERT INTO RESUMEN_VENDEDORES_DIA (FECHA, ID_USUARIO, VENTAS, TOTAL) VALUES (%s, %s, %s, %s)
+"""
+
+
+def activo(cursor, tabla):
+    """True si RESUMENES_DIARIOS y la tabla de resumen existe (manage.py rebuild_resumenes)"""
+    return RESUMENES_DIARIOS and bool(registry.columns(cursor, tabla))
+
+
+def _merge(cursor, sql, params):
+    """executemany del MERGE; reintenta una vez si otra sesión insertó la misma clave"""
+    if not params:
+        return
+    try:
+        with transaction.atomic():
+            cursor.executemany(sql, params)
+    except IntegrityError:
+        with transaction.atomic():
+            cursor.executemany(sql, params)
+
+
+def registrar_venta(cursor, lineas, id_usuario, total):
+    """Suma una venta a los resúmenes del día
+
+    `lineas`: [(id_producto, cantidad, subtotal), ...] (vacía si la venta no
+    trae detalle); `id_usuario` y `total` van al resumen por vendedor.
+    """
+    if activo(cursor, 'RESUMEN_VENDEDORES_DIA'):
+        _merge(cursor, MERGE_VENDEDORES_SQL, [[id_usuario or 0, total or 0]])
+    if not activo(cursor, 'RESUMEN_VENTAS_DIA'):
+        return
+    por_producto = {}
+    for id_producto, cantidad, subtotal in lineas:
+        unidades, total, n = por_producto.get(id_producto, (0, 0, 0))
+        por_producto[id_producto] = (unidades + cantidad, total + subtotal, n + 1)
+    _merge(cursor, MERGE_VENTAS_SQL, [
+        [id_producto, *valores] for id_producto, valores in sorted(por_producto.items())
+    ])
+
+
+def registrar_movimientos(cursor, movimientos):
+    """Suma movimientos al resumen del día
+
+    `movimientos`: [(id_producto, cantidad_con_signo), ...]; positivo = entrada,
+    negativo = salida, 0 = movimiento que no cambia el stock.
+    """
+    if not activo(cursor, 'RESUMEN_MOVIMIENTOS_DIA'):
+        return
+    por_producto = {}
+    for id_producto, cantidad in movimientos:
+        entradas, salidas, n = por_producto.get(id_producto, (0, 0, 0))
+        por_producto[id_producto] = (
+            entradas + max(cantidad, 0), salidas + max(-cantidad, 0), n + 1
+        )
+    _merge(cursor, MERGE_MOVIMIENTOS_SQL, [
+        [id_producto, *valores] for id_producto, valores in sorted(por_producto.items())
+    ])
+
+
+def vendedores_archivados(hasta):
+    """Filas de RESUMEN_VENDEDORES_DIA para las ventas archivadas antes de `hasta`
+
+    Para crear el resumen cuando parte del historial ya está en el archivo
+    (rebuild_resumenes solo recalcula desde la frontera).
+    """
+    por_dia = {}
+    for v in archivo.filas('VENTAS', None, hasta, ['FECHA', 'ID_USUARIO', 'TOTAL']):
+        clave = (v['fecha'].replace(hour=0, minute=0, second=0, microsecond=0), v['id_usuario'] or 0)
+        ventas, total = por_dia.get(clave, (0, 0))
+        # Archivos anteriores al tipo 'd' de core.columnar traen los montos como float
+        monto = Decimal(repr(v['total'])) if isinstance(v['total'], float) else v['total'] or 0
+        por_dia[clave] = (ventas + 1, total + monto)
+    return [[fecha, id_usuario, ventas, total] for (fecha, id_usuario), (ventas, total) in sorted(por_dia.items())]
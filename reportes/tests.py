@@ -1,3 +1,155 @@
-from django.test import TestCase
+import csv
+import io
+import zipfile
+from datetime import datetime
+from decimal import Decimal
+from unittest import mock
+from xml.etree import ElementTree
 
-# Create your tests here.
+from django.db import IntegrityError
+from django.test import SimpleTestCase
+
+from . import exportar, jobs, resumenes
+
+
+# =============================================
+# Resúmenes diarios (reportes.resumenes)
+# =============================================
+
+class RegistrarResumenesTests(SimpleTestCase):
+    def registrar(self, funcion, *datos, activo=True):
+        with mock.patch.object(resumenes, 'activo', return_value=activo), \
+                mock.patch.object(resumenes, '_merge') as merge:
+            funcion(mock.sentinel.cursor, *datos)
+        return merge
+
+    def test_venta_agrupa_por_producto_y_vendedor(self):
+        merge = self.registrar(resumenes.registrar_venta, [(5, 2, 200), (3, 1, 50), (5, 1, 100)], 9, 350)
+        self.assertEqual(merge.call_args_list, [
+            mock.call(mock.sentinel.cursor, resumenes.MERGE_VENDEDORES_SQL, [[9, 350]]),
+            mock.call(mock.sentinel.cursor, resumenes.MERGE_VENTAS_SQL, [
+                [3, 1, 50, 1],
+                [5, 3, 300, 2],
+            ]),
+        ])
+
+    def test_venta_sin_vendedor_ni_detalle(self):
+        merge = self.registrar(resumenes.registrar_venta, [], None, 80)
+        merge.assert_any_call(mock.sentinel.cursor, resumenes.MERGE_VENDEDORES_SQL, [[0, 80]])
+
+    def test_vendedores_archivados_por_dia(self):
+        archivadas = [
+            {'fecha': datetime(2024, 1, 2, 9), 'id_usuario': 4, 'total': Decimal('10.50')},
+            {'fecha': datetime(2024, 1, 2, 18), 'id_usuario': 4, 'total': 2.25},
+            {'fecha': datetime(2024, 1, 3, 8), 'id_usuario': None, 'total': Decimal('7')},
+        ]
+        with mock.patch.object(resumenes.archivo, 'filas', return_value=archivadas):
+            self.assertEqual(resumenes.vendedores_archivados(datetime(2024, 2, 1)), [
+                [datetime(2024, 1, 2), 4, 2, Decimal('12.75')],
+                [datetime(2024, 1, 3), 0, 1, Decimal('7')],
+            ])
+
+    def test_movimientos_separa_entradas_y_salidas(self):
+        merge = self.registrar(resumenes.registrar_movimientos, [(5, 10), (5, -4), (5, 0), (3, -1)])
+        merge.assert_called_once_with(mock.sentinel.cursor, resumenes.MERGE_MOVIMIENTOS_SQL, [
+            [3, 0, 1, 1],
+            [5, 10, 4, 3],
+        ])
+
+    def test_sin_tabla_no_escribe(self):
+        self.registrar(resumenes.registrar_venta, [(5, 2, 200)], 1, 200, activo=False).assert_not_called()
+        self.registrar(resumenes.registrar_movimientos, [(5, 2)], activo=False).assert_not_called()
+
+    def test_activo_segun_tabla(self):
+        with mock.patch.object(resumenes.registry, 'columns', return_value=[]):
+            self.assertFalse(resumenes.activo(mock.sentinel.cursor, 'RESUMEN_VENTAS_DIA'))
+        with mock.patch.object(resumenes.registry, 'columns', return_value=['FECHA']), \
+                mock.patch.object(resumenes, 'RESUMENES_DIARIOS', True):
+            self.assertTrue(resumenes.activo(mock.sentinel.cursor, 'RESUMEN_VENTAS_DIA'))
+
+
+# =============================================
+# Exportación (reportes.exportar)
+# =============================================
+
+class CsvChunksTests(SimpleTestCase):
+    def test_bom_cabecera_y_lotes(self):
+        filas = [(i, f'Producto {i}', datetime(2024, 1, 2, 3, 4, 5)) for i in range(5)]
+        chunks = list(exportar.csv_chunks(['id', 'nombre', 'fecha'], filas, batch_size=2))
+        self.assertEqual(chunks[0], '\ufeff')
+        # BOM + un bloque cada 2 filas + el resto (con la cabecera en el primero)
+        self.assertEqual(len(chunks), 4)
+        leidas = list(csv.reader(io.StringIO(''.join(chunks[1:]))))
+        self.assertEqual(leidas[0], ['id', 'nombre', 'fecha'])
+        self.assertEqual(leidas[1], ['0', 'Producto 0', '2024-01-02 03:04:05'])
+        self.assertEqual(len(leidas), 6)
+
+    def test_comillas_y_separadores(self):
+        texto = ''.join(exportar.csv_chunks(['a'], [('con, coma "y comillas"',)]))
+        self.assertEqual(list(csv.reader(io.StringIO(texto[1:])))[1], ['con, coma "y comillas"'])
+
+
+class XlsxChunksTests(SimpleTestCase):
+    NS = {'x': 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'}
+
+    def celdas(self, fila):
+        valores = []
+        for celda in fila.findall('x:c', self.NS):
+            texto = celda.find('x:is/x:t', self.NS)
+            valor = celda.find('x:v', self.NS)
+            valores.append(texto.text if texto is not None else valor.text if valor is not None else None)
+        return valores
+
+    def test_libro_valido(self):
+        filas = [(1, 'Cañería <PVC> & co\x01', Decimal('10.50'), None)] + [(i, 'x', 0, None) for i in range(2, 6)]
+        contenido = b''.join(exportar.xlsx_chunks(['id', 'nombre', 'total', 'nulo'], filas,
+                                                  hoja='Ventas', batch_size=2))
+        with zipfile.ZipFile(io.BytesIO(contenido)) as libro:
+            self.assertIsNone(libro.testzip())
+            self.assertIn('[Content_Types].xml', libro.namelist())
+            self.assertIn('name="Ventas"', libro.read('xl/workbook.xml').decode())
+            hoja = ElementTree.fromstring(libro.read('xl/worksheets/sheet1.xml'))
+        filas_xml = hoja.findall('x:sheetData/x:row', self.NS)
+        self.assertEqual(len(filas_xml), 6)
+        self.assertEqual(self.celdas(filas_xml[0]), ['id', 'nombre', 'total', 'nulo'])
+        # Caracteres de control inválidos en XML se descartan
+        self.assertEqual(self.celdas(filas_xml[1]), ['1', 'Cañería <PVC> & co', '10.50', None])
+
+
+# =============================================
+# Reportes en segundo plano (reportes.jobs)
+# =============================================
+
+class CrearJobTests(SimpleTestCase):
+    def crear(self, cursor, reutilizable):
+        with mock.patch.object(jobs, 'connection') as connection, \
+                mock.patch.object(jobs, 'transaction'), \
+                mock.patch.object(jobs, '_reutilizable', side_effect=reutilizable), \
+                mock.patch.object(jobs, 'obtener', return_value={'id_job': 8}), \
+                mock.patch.object(jobs, 'runner') as runner:
+            connection.cursor.return_value.__enter__.return_value = cursor
+            return jobs.crear('ventas', 'csv', {}), runner
+
+    def test_reutiliza_el_job_vigente(self):
+        (job, reutilizado), runner = self.crear(mock.MagicMock(), [{'id_job': 3}])
+        self.assertEqual((job['id_job'], reutilizado), (3, True))
+        runner.submit.assert_not_called()
+
+    def test_encola_un_job_nuevo(self):
+        cursor = mock.MagicMock()
+        cursor.fetchone.return_value = (8,)
+        (job, reutilizado), runner = self.crear(cursor, [None])
+        self.assertEqual((job['id_job'], reutilizado), (8, False))
+        runner.submit.assert_called_once_with(8)
+
+    def test_pedido_simultaneo_devuelve_el_job_del_otro(self):
+        cursor = mock.MagicMock()
+        cursor.fetchone.return_value = (8,)
+
+        def execute(sql, params=None):
+            if 'INSERT' in sql:
+                raise IntegrityError('UX_REPORTES_JOBS_EN_CURSO')
+        cursor.execute.side_effect = execute
+        (job, reutilizado), runner = self.crear(cursor, [None, {'id_job': 7}])
+        self.assertEqual((job['id_job'], reutilizado), (7, True))
+        runner.submit.assert_not_called()
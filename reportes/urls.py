@@ -1,6 +1,31 @@
 from django.urls import path
+from core.asyncviews import async_view
 from . import views
 
 urlpatterns = [
     path('', views.reportes_view, name='reportes'),
+
+    # APIs de Reportes
+    path('api/ventas/', views.api_reportes_ventas, name='api_reportes_ventas'),
+    path('api/productos/', views.api_reportes_productos, name='api_reportes_productos'),
+    path('api/movimientos/', views.api_reportes_movimientos, name='api_reportes_movimientos'),
+    path('api/vendedores/', views.api_reportes_vendedores, name='api_reportes_vendedores'),
+    path('api/inventario/', views.api_reportes_inventario, name='api_reportes_inventario'),
+
+    # Exportación en streaming (?formato=csv|xlsx)
+    path('api/exportar/ventas/', views.api_exportar_ventas, name='api_exportar_ventas'),
+    path('api/exportar/movimientos/', views.api_exportar_movimientos, name='api_exportar_movimientos'),
+    path('api/exportar/inventario/', views.api_exportar_inventario, name='api_exportar_inventario'),
+
+    # Reportes en segundo plano (reportes.jobs)
+    path('api/jobs/', views.api_jobs, name='api_reportes_jobs'),
+    path('api/jobs/<int:id>/', views.api_job_estado, name='api_reportes_job_estado'),
+    path('api/jobs/<int:id>/resultado/', views.api_job_resultado, name='api_reportes_job_resultado'),
+
+    # APIs de Reportes async (ASGI)
+    path('api/async/ventas/', async_view(views.api_reportes_ventas), name='api_async_reportes_ventas'),
+    path('api/async/productos/', async_view(views.api_reportes_productos), name='api_async_reportes_productos'),
+    path('api/async/movimientos/', async_view(views.api_reportes_movimientos), name='api_async_reportes_movimientos'),
+    path('api/async/vendedores/', async_view(views.api_reportes_vendedores), name='api_async_reportes_vendedores'),
+    path('api/async/inventario/', async_view(views.api_reportes_inventario), name='api_async_reportes_inventario'),
 ]
@@ -1,4 +1,461 @@
+import json
+import os
+from datetime import timedelta
+from decimal import Decimal
+
 from django.shortcuts import render
+from django.http import FileResponse, JsonResponse
+from django.db import connection
+from django.views.decorators.csrf import csrf_exempt
+
+from core import archivo
+from core.streaming import prepare_stream_cursor
+from . import jobs
+from .exportar import (
+    FORMATOS_EXPORTACION, consulta_exportacion, exportar_response, filas_archivadas, nombre_archivo,
+    rango_archivado, rango_con_archivo, rango_fechas,
+)
+from . import resumenes
 
 def reportes_view(request):
     return render(request, 'reportes/reportes.html')
+
+# =============================================
+# API de REPORTES (agregaciones en SQL)
+# =============================================
+
+# Agrupaciones de ventas por periodo: parámetro -> formato de TRUNC
+PERIODOS = {
+    'dia': 'DD',
+    'semana': 'IW',
+    'mes': 'MM',
+}
+
+# Límite por defecto de filas en los rankings
+TOP_DEFAULT = 20
+
+def _rango_fechas(request, columna):
+    """Condición SQL y parámetros para ?desde=YYYY-MM-DD&hasta=YYYY-MM-DD (ambos inclusive)"""
+    return rango_fechas(request.GET, columna)
+
+def _rango_con_archivo(request, columna, familia):
+    """_rango_fechas cortado en la frontera del archivo: (where, params, frontera o None)"""
+    return rango_con_archivo(request.GET, columna, familia)
+
+def _archivadas(request, tabla, limite, columnas):
+    """Filas archivadas de `tabla` dentro del rango pedido (nada si limite es None)"""
+    if limite is None:
+        return []
+    desde, hasta = rango_archivado(request.GET, limite)
+    return archivo.filas(tabla, desde, hasta, columnas)
+
+def _numero(valor):
+    # Los montos del archivo ya vuelven como Decimal; los float (columnas float o
+    # archivos escritos antes del tipo 'd') se pasan a Decimal para sumarlos con los de la base
+    if valor is None:
+        return 0
+    return Decimal(repr(valor)) if isinstance(valor, float) else valor
+
+def _sumar(agregados, clave, **valores):
+    fila = agregados.setdefault(clave, dict.fromkeys(valores, 0))
+    for columna, valor in valores.items():
+        fila[columna] += _numero(valor)
+
+def _combinar(data, columna, agregados):
+    """Suma a las filas de la base los agregados del archivo con la misma `columna`"""
+    por_clave = {r[columna]: r for r in data}
+    for clave, valores in agregados.items():
+        fila = por_clave.setdefault(clave, {columna: clave})
+        for nombre, valor in valores.items():
+            fila[nombre] = _numero(fila.get(nombre)) + valor
+    return list(por_clave.values())
+
+def _periodo(fecha, agrupar):
+    """Inicio del periodo de `fecha` como TRUNC(..., PERIODOS[agrupar])"""
+    dia = fecha.date()
+    if agrupar == 'semana':
+        dia -= timedelta(days=dia.weekday())
+    elif agrupar == 'mes':
+        dia = dia.replace(day=1)
+    return dia.isoformat()
+
+def _rows(cursor):
+    columns = [col[0].lower() for col in cursor.description]
+    rows = []
+    for row in cursor.fetchall():
+        item = dict(zip(columns, row))
+        if hasattr(item.get('periodo'), 'isoformat'):
+            item['periodo'] = item['periodo'].date().isoformat()
+        rows.append(item)
+    return rows
+
+def _where(conditions):
+    return (" WHERE " + " AND ".join(conditions)) if conditions else ""
+
+def api_reportes_ventas(request):
+    """GET: Ventas agrupadas por periodo (?agrupar=dia|semana|mes&desde=&hasta=)"""
+    agrupar = request.GET.get('agrupar', 'dia')
+    if agrupar not in PERIODOS:
+        return JsonResponse({'success': False, 'error': 'agrupar debe ser dia, semana o mes'}, status=400)
+    # Con resúmenes se lee RESUMEN_VENDEDORES_DIA (incluye los días archivados)
+    cursor = connection.cursor()
+    resumen = resumenes.activo(cursor, 'RESUMEN_VENDEDORES_DIA')
+    limite = None
+    try:
+        if resumen:
+            where, params = _rango_fechas(request, 'r.FECHA')
+        else:
+            where, params, limite = _rango_con_archivo(request, 'v.FECHA', 'ventas')
+    except ValueError as e:
+        cursor.close()
+        return JsonResponse({'success': False, 'error': f'Fecha inválida: {e}'}, status=400)
+
+    if resumen:
+        cursor.execute(f"""
+            SELECT TRUNC(r.FECHA, '{PERIODOS[agrupar]}') AS PERIODO,
+                   SUM(r.VENTAS) AS VENTAS, SUM(r.TOTAL) AS TOTAL
+            FROM RESUMEN_VENDEDORES_DIA r
+            {_where(where)}
+            GROUP BY TRUNC(r.FECHA, '{PERIODOS[agrupar]}')
+            ORDER BY PERIODO
+        """, params)
+    else:
+        cursor.execute(f"""
+            SELECT TRUNC(v.FECHA, '{PERIODOS[agrupar]}') AS PERIODO,
+                   COUNT(*) AS VENTAS, NVL(SUM(v.TOTAL), 0) AS TOTAL
+            FROM VENTAS v
+            {_where(where)}
+            GROUP BY TRUNC(v.FECHA, '{PERIODOS[agrupar]}')
+            ORDER BY PERIODO
+        """, params)
+    data = _rows(cursor)
+    cursor.close()
+
+    if limite is not None:
+        agregados = {}
+        for v in _archivadas(request, 'VENTAS', limite, ['FECHA', 'TOTAL']):
+            _sumar(agregados, _periodo(v['fecha'], agrupar), ventas=1, total=v['total'])
+        data = sorted(_combinar(data, 'periodo', agregados), key=lambda r: r['periodo'])
+
+    return JsonResponse({
+        'success': True,
+        'agrupar': agrupar,
+        'data': data,
+        'resumen': {
+            'ventas': sum(r['ventas'] for r in data),
+            'total': sum(r['total'] for r in data),
+        }
+    })
+
+def api_reportes_productos(request):
+    """GET: Unidades y monto vendido por producto (?desde=&hasta=&top=)"""
+    # Con resúmenes se lee RESUMEN_VENTAS_DIA en lugar de recorrer DETALLE_VENTA
+    # Los resúmenes diarios sobreviven al archivo (rebuild_resumenes no borra antes de la frontera)
+    cursor = connection.cursor()
+    resumen = resumenes.activo(cursor, 'RESUMEN_VENTAS_DIA')
+    limite = None
+    try:
+        if resumen:
+            where, params = _rango_fechas(request, 'r.FECHA')
+        else:
+            where, params, limite = _rango_con_archivo(request, 'v.FECHA', 'ventas')
+        top = int(request.GET.get('top', TOP_DEFAULT))
+    except ValueError as e:
+        cursor.close()
+        return JsonResponse({'success': False, 'error': f'Parámetro inválido: {e}'}, status=400)
+
+    if resumen:
+        cursor.execute(f"""
+            SELECT r.ID_PRODUCTO, p.NOMBRE,
+                   SUM(r.UNIDADES) AS UNIDADES, SUM(r.TOTAL) AS TOTAL
+            FROM RESUMEN_VENTAS_DIA r
+            LEFT JOIN PRODUCTOS p ON r.ID_PRODUCTO = p.ID_PRODUCTO
+            {_where(where)}
+            GROUP BY r.ID_PRODUCTO, p.NOMBRE
+            ORDER BY TOTAL DESC
+            FETCH FIRST %s ROWS ONLY
+        """, params + [top])
+    else:
+        cursor.execute(f"""
+            SELECT d.ID_PRODUCTO, p.NOMBRE,
+                   SUM(d.CANTIDAD) AS UNIDADES, NVL(SUM(d.SUBTOTAL), 0) AS TOTAL
+            FROM DETALLE_VENTA d
+            JOIN VENTAS v ON d.ID_VENTA = v.ID_VENTA
+            LEFT JOIN PRODUCTOS p ON d.ID_PRODUCTO = p.ID_PRODUCTO
+            {_where(where)}
+            GROUP BY d.ID_PRODUCTO, p.NOMBRE
+            ORDER BY TOTAL DESC
+            {'' if limite else 'FETCH FIRST %s ROWS ONLY'}
+        """, params + ([] if limite else [top]))
+    data = _rows(cursor)
+
+    if limite is not None:
+        # El top se corta después de sumar el archivo
+        agregados = {}
+        columnas = ['ID_PRODUCTO', 'CANTIDAD', 'SUBTOTAL']
+        for d in _archivadas(request, 'DETALLE_VENTA', limite, columnas):
+            _sumar(agregados, d['id_producto'], unidades=d['cantidad'], total=d['subtotal'])
+        data = _combinar(data, 'id_producto', agregados)
+        data = sorted(data, key=lambda r: r['total'], reverse=True)[:top]
+        faltan = [r['id_producto'] for r in data if 'nombre' not in r]
+        nombres = archivo.nombres(cursor, 'PRODUCTOS', faltan)
+        for r in data:
+            r.setdefault('nombre', nombres.get(r['id_producto']))
+    cursor.close()
+
+    return JsonResponse({'success': True, 'data': data})
+
+def api_reportes_movimientos(request):
+    """GET: Entradas, salidas y neto de stock por día (?desde=&hasta=&id_producto=)"""
+    cursor = connection.cursor()
+    resumen = resumenes.activo(cursor, 'RESUMEN_MOVIMIENTOS_DIA')
+    alias = 'r' if resumen else 'm'
+    limite = None
+    try:
+        if resumen:
+            where, params = _rango_fechas(request, 'r.FECHA')
+        else:
+            where, params, limite = _rango_con_archivo(request, 'm.FECHA', 'movimientos')
+        id_producto = request.GET.get('id_producto')
+        if id_producto:
+            id_producto = int(id_producto)
+            where.append(f"{alias}.ID_PRODUCTO = %s")
+            params.append(id_producto)
+    except ValueError as e:
+        cursor.close()
+        return JsonResponse({'success': False, 'error': f'Parámetro inválido: {e}'}, status=400)
+
+    if resumen:
+        cursor.execute(f"""
+            SELECT r.FECHA AS PERIODO, SUM(r.ENTRADAS) AS ENTRADAS,
+                   SUM(r.SALIDAS) AS SALIDAS, SUM(r.ENTRADAS - r.SALIDAS) AS NETO,
+                   SUM(r.MOVIMIENTOS) AS MOVIMIENTOS
+            FROM RESUMEN_MOVIMIENTOS_DIA r
+            {_where(where)}
+            GROUP BY r.FECHA
+            ORDER BY PERIODO
+        """, params)
+    else:
+        cursor.execute(f"""
+            SELECT TRUNC(m.FECHA) AS PERIODO,
+                   NVL(SUM(CASE WHEN UPPER(m.TIPO) = 'ENTRADA' THEN m.CANTIDAD END), 0) AS ENTRADAS,
+                   NVL(SUM(CASE WHEN UPPER(m.TIPO) = 'SALIDA' THEN m.CANTIDAD END), 0) AS SALIDAS,
+                   NVL(SUM(CASE UPPER(m.TIPO) WHEN 'ENTRADA' THEN m.CANTIDAD
+                                              WHEN 'SALIDA' THEN -m.CANTIDAD END), 0) AS NETO,
+                   COUNT(*) AS MOVIMIENTOS
+            FROM MOVIMIENTOS_INVENTARIO m
+            {_where(where)}
+            GROUP BY TRUNC(m.FECHA)
+            ORDER BY PERIODO
+        """, params)
+    data = _rows(cursor)
+    cursor.close()
+
+    if limite is not None:
+        agregados = {}
+        columnas = ['FECHA', 'ID_PRODUCTO', 'TIPO', 'CANTIDAD']
+        for m in _archivadas(request, 'MOVIMIENTOS_INVENTARIO', limite, columnas):
+            if id_producto and m['id_producto'] != id_producto:
+                continue
+            tipo = (m['tipo'] or '').upper()
+            cantidad = _numero(m['cantidad'])
+            _sumar(
+                agregados, _periodo(m['fecha'], 'dia'),
+                entradas=cantidad if tipo == 'ENTRADA' else 0,
+                salidas=cantidad if tipo == 'SALIDA' else 0,
+                neto={'ENTRADA': cantidad, 'SALIDA': -cantidad}.get(tipo, 0),
+                movimientos=1,
+            )
+        data = sorted(_combinar(data, 'periodo', agregados), key=lambda r: r['periodo'])
+
+    return JsonResponse({'success': True, 'data': data})
+
+def api_reportes_vendedores(request):
+    """GET: Ventas por vendedor (?desde=&hasta=)"""
+    cursor = connection.cursor()
+    resumen = resumenes.activo(cursor, 'RESUMEN_VENDEDORES_DIA')
+    limite = None
+    try:
+        if resumen:
+            where, params = _rango_fechas(request, 'r.FECHA')
+        else:
+            where, params, limite = _rango_con_archivo(request, 'v.FECHA', 'ventas')
+    except ValueError as e:
+        cursor.close()
+        return JsonResponse({'success': False, 'error': f'Fecha inválida: {e}'}, status=400)
+
+    if resumen:
+        # ID_USUARIO = 0 en el resumen son las ventas sin vendedor
+        cursor.execute(f"""
+            SELECT NULLIF(r.ID_USUARIO, 0) AS ID_USUARIO, u.NOMBRE AS VENDEDOR,
+                   SUM(r.VENTAS) AS VENTAS, SUM(r.TOTAL) AS TOTAL,
+                   SUM(r.TOTAL) / SUM(r.VENTAS) AS TICKET_PROMEDIO
+            FROM RESUMEN_VENDEDORES_DIA r
+            LEFT JOIN USUARIOS u ON r.ID_USUARIO = u.ID_USUARIO
+            {_where(where)}
+            GROUP BY r.ID_USUARIO, u.NOMBRE
+            ORDER BY TOTAL DESC
+        """, params)
+    else:
+        cursor.execute(f"""
+            SELECT v.ID_USUARIO, u.NOMBRE AS VENDEDOR,
+                   COUNT(*) AS VENTAS, NVL(SUM(v.TOTAL), 0) AS TOTAL,
+                   NVL(AVG(v.TOTAL), 0) AS TICKET_PROMEDIO
+            FROM VENTAS v
+            LEFT JOIN USUARIOS u ON v.ID_USUARIO = u.ID_USUARIO
+            {_where(where)}
+            GROUP BY v.ID_USUARIO, u.NOMBRE
+            ORDER BY TOTAL DESC
+        """, params)
+    data = _rows(cursor)
+
+    if limite is not None:
+        agregados = {}
+        for v in _archivadas(request, 'VENTAS', limite, ['ID_USUARIO', 'TOTAL']):
+            _sumar(agregados, v['id_usuario'], ventas=1, total=v['total'])
+        data = _combinar(data, 'id_usuario', agregados)
+        nombres = archivo.nombres(cursor, 'USUARIOS', [r['id_usuario'] for r in data if 'vendedor' not in r])
+        for r in data:
+            r.setdefault('vendedor', nombres.get(r['id_usuario']))
+            r['ticket_promedio'] = Decimal(r['total']) / r['ventas'] if r['ventas'] else 0
+        data.sort(key=lambda r: r['total'], reverse=True)
+    cursor.close()
+
+    return JsonResponse({'success': True, 'data': data})
+
+def api_reportes_inventario(request):
+    """GET: Valor del inventario y productos por estado de stock (?stock_bajo=5)"""
+    try:
+        stock_bajo = int(request.GET.get('stock_bajo', 5))
+    except ValueError:
+        return JsonResponse({'success': False, 'error': 'stock_bajo debe ser un número'}, status=400)
+
+    cursor = connection.cursor()
+    cursor.execute("""
+        SELECT COUNT(*) AS PRODUCTOS,
+               NVL(SUM(STOCK), 0) AS UNIDADES,
+               NVL(SUM(STOCK * PRECIO), 0) AS VALOR,
+               COUNT(CASE WHEN NVL(STOCK, 0) <= 0 THEN 1 END) AS AGOTADOS,
+               COUNT(CASE WHEN STOCK > 0 AND STOCK <= %s THEN 1 END) AS STOCK_BAJO,
+               COUNT(CASE WHEN STOCK > %s THEN 1 END) AS DISPONIBLES
+        FROM PRODUCTOS
+    """, [stock_bajo, stock_bajo])
+    data = _rows(cursor)[0]
+    cursor.close()
+
+    return JsonResponse({'success': True, 'data': data})
+
+# =============================================
+# EXPORTACIÓN (CSV / XLSX en streaming)
+# =============================================
+
+def _exportar(request, nombre):
+    """Ejecuta el reporte con cursor de streaming y devuelve la descarga"""
+    formato = request.GET.get('formato', 'csv')
+    if formato not in FORMATOS_EXPORTACION:
+        return JsonResponse({'success': False, 'error': 'formato debe ser csv o xlsx'}, status=400)
+
+    cursor = connection.cursor()
+    try:
+        sql, params = consulta_exportacion(cursor, nombre, request.GET)
+    except ValueError as e:
+        cursor.close()
+        return JsonResponse({'success': False, 'error': f'Parámetro inválido: {e}'}, status=400)
+    prepare_stream_cursor(cursor)
+    cursor.execute(sql, params)
+    return exportar_response(
+        cursor, formato, nombre_archivo(nombre, request.GET), hoja=nombre,
+        previas=filas_archivadas(nombre, request.GET),
+    )
+
+def api_exportar_ventas(request):
+    """GET: Líneas de venta (VENTAS + DETALLE_VENTA) como CSV/XLSX (?formato=&desde=&hasta=&id_producto=)"""
+    return _exportar(request, 'ventas')
+
+def api_exportar_movimientos(request):
+    """GET: Movimientos de inventario como CSV/XLSX (?formato=&desde=&hasta=&id_producto=&tipo=)"""
+    return _exportar(request, 'movimientos')
+
+def api_exportar_inventario(request):
+    """GET: Productos con stock y valor como CSV/XLSX (?formato=&id_producto=&id_proveedor=&stock_max=)"""
+    return _exportar(request, 'inventario')
+
+# =============================================
+# REPORTES EN SEGUNDO PLANO (reportes.jobs)
+# =============================================
+
+def _job_json(job):
+    datos = {k: v for k, v in job.items() if k != 'archivo'}
+    if job['estado'] == jobs.LISTO:
+        datos['url_resultado'] = f"/reportes/api/jobs/{job['id_job']}/resultado/"
+    return datos
+
+def _sin_tabla_jobs():
+    return JsonResponse({
+        'success': False, 'error': 'Falta la tabla REPORTES_JOBS (python manage.py reportes_jobs)'
+    }, status=503)
+
+@csrf_exempt
+def api_jobs(request):
+    """GET: Últimos reportes pedidos. POST: Encolar un reporte y devolver su id_job al instante
+
+    Body: {"reporte": "ventas|movimientos|inventario", "formato": "csv|xlsx",
+    "filtros": {"desde": ..., "hasta": ..., ...}}. Si ya hay un job igual en curso
+    o terminado hace menos de REPORTES_JOBS_TTL, devuelve ese (reutilizado=true).
+    """
+    if request.method not in ['GET', 'POST']:
+        return JsonResponse({'success': False, 'error': 'Método no permitido'}, status=405)
+    if not jobs.disponible():
+        return _sin_tabla_jobs()
+
+    if request.method == 'GET':
+        with connection.cursor() as cursor:
+            data = [_job_json(job) for job in jobs.listar(cursor)]
+        return JsonResponse({'success': True, 'data': data})
+
+    try:
+        data = json.loads(request.body)
+        reporte = data.get('reporte')
+        formato = data.get('formato', 'csv')
+        filtros = jobs.normalizar(reporte, formato, data.get('filtros') or {})
+    except (ValueError, AttributeError) as e:
+        return JsonResponse({'success': False, 'error': f'Pedido inválido: {e}'}, status=400)
+
+    job, reutilizado = jobs.crear(reporte, formato, filtros)
+    return JsonResponse({
+        'success': True, 'reutilizado': reutilizado, 'data': _job_json(job)
+    }, status=200 if job['estado'] == jobs.LISTO else 202)
+
+def api_job_estado(request, id):
+    """GET: Estado y avance (filas escritas / total) de un reporte en segundo plano"""
+    if not jobs.disponible():
+        return _sin_tabla_jobs()
+    with connection.cursor() as cursor:
+        job = jobs.obtener(cursor, id)
+    if job is None:
+        return JsonResponse({'success': False, 'error': 'Job no encontrado'}, status=404)
+    return JsonResponse({'success': True, 'data': _job_json(job)})
+
+def api_job_resultado(request, id):
+    """GET: Descarga el archivo de un reporte terminado"""
+    if not jobs.disponible():
+        return _sin_tabla_jobs()
+    with connection.cursor() as cursor:
+        job = jobs.obtener(cursor, id)
+    if job is None:
+        return JsonResponse({'success': False, 'error': 'Job no encontrado'}, status=404)
+    if job['estado'] != jobs.LISTO:
+        return JsonResponse({
+            'success': False, 'error': f"El reporte está {job['estado']}", 'data': _job_json(job)
+        }, status=409)
+    if not os.path.exists(job['archivo'] or ''):
+        return JsonResponse({'success': False, 'error': 'El resultado expiró; vuelva a pedirlo'}, status=410)
+
+    response = FileResponse(
+        open(job['archivo'], 'rb'), as_attachment=True,
+        filename=f"{nombre_archivo(job['reporte'], job['filtros'])}.{job['formato']}",
+        content_type=FORMATOS_EXPORTACION[job['formato']],
+    )
+    # El archivo de un job no cambia: el navegador puede reutilizarlo hasta que expira
+    response['Cache-Control'] = f'private, max-age={jobs.REPORTES_JOBS_TTL}'
+    return response
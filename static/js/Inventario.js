@@ -135,8 +135,31 @@ async function loadProductsFromAPI() {
 document.addEventListener('DOMContentLoaded', () => {
     loadProductsFromAPI();
     setupEventListeners();
+    subscribeStockEvents();
 });
 
+// Stock y precio en vivo (SSE) en vez de recargar la lista completa
+function subscribeStockEvents() {
+    if (!window.EventSource) return;
+    const eventos = new EventSource('/api/eventos/');
+    eventos.addEventListener('stock', (e) => {
+        const data = JSON.parse(e.data);
+        const index = products.findIndex(p => p.id === data.id_producto);
+        if (data.eliminado) {
+            if (index !== -1) products.splice(index, 1);
+        } else if (index !== -1) {
+            products[index].stock = data.stock;
+            products[index].salePrice = data.precio;
+        } else {
+            // Producto creado en otra terminal
+            loadProductsFromAPI();
+            return;
+        }
+        updateProductsTable();
+        updateStats();
+    });
+}
+
 function setupEventListeners() {
     // Search
     document.getElementById('searchProducts').addEventListener('input', filterProducts);
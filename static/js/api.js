@@ -13,6 +13,42 @@ const API = {
             return await response.json();
         },
         
+        // Un producto por ID o por código (escaneo en caja)
+        async get(id) {
+            const response = await fetch(`/inventario/api/productos/${id}/`);
+            return await response.json();
+        },
+        
+        async getByCodigo(codigo) {
+            const response = await fetch(`/inventario/api/productos/codigo/${encodeURIComponent(codigo)}/`);
+            return await response.json();
+        },
+        
+        // Carrito completo en una llamada: { ids: [...], codigos: [...] }
+        async lookup(data) {
+            const response = await fetch('/inventario/api/productos/lookup/', {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify(data)
+            });
+            return await response.json();
+        },
+        
+        // Búsqueda typeahead (top-N por relevancia, sin tildes)
+        async buscar(q, limit = 10) {
+            const query = new URLSearchParams({ q, limit }).toString();
+            const response = await fetch(`/inventario/api/productos/buscar/?${query}`);
+            return await response.json();
+        },
+        
+        // Página de productos: { limit, cursor, nombre, id_proveedor, stock_min,
+        // stock_max, precio_min, precio_max, count }
+        async getPage(params = {}) {
+            const query = new URLSearchParams(params).toString();
+            const response = await fetch(`/inventario/api/productos/?${query}`);
+            return await response.json();
+        },
+        
         async create(data) {
             const response = await fetch('/inventario/api/productos/create/', {
                 method: 'POST',
@@ -22,6 +58,20 @@ const API = {
             return await response.json();
         },
         
+        // Carga masiva: lista de productos (JSON) o un File .csv/.json
+        async bulk(productos) {
+            const options = { method: 'POST' };
+            if (productos instanceof File) {
+                options.body = new FormData();
+                options.body.append('archivo', productos);
+            } else {
+                options.headers = { 'Content-Type': 'application/json' };
+                options.body = JSON.stringify(productos);
+            }
+            const response = await fetch('/inventario/api/productos/bulk/', options);
+            return await response.json();
+        },
+        
         async update(id, data) {
             const response = await fetch(`/inventario/api/productos/${id}/update/`, {
                 method: 'POST',
@@ -74,6 +124,16 @@ const API = {
                 body: JSON.stringify(data)
             });
             return await response.json();
+        },
+        
+        // Varios movimientos en una transacción: [{ id_producto, tipo, cantidad }]
+        async batch(movimientos) {
+            const response = await fetch('/inventario/api/movimientos/batch/', {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify({ movimientos })
+            });
+            return await response.json();
         }
     },
     
@@ -128,6 +188,98 @@ const API = {
                 body: JSON.stringify(data)
             });
             return await response.json();
+        },
+        
+        // Venta completa: { id_usuario, id_cliente, items: [{ id_producto, cantidad, precio }] }
+        async checkout(data) {
+            const response = await fetch('/ventas/api/ventas/checkout/', {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify(data)
+            });
+            return await response.json();
+        }
+    },
+    
+    // =============================================
+    // REPORTES (agregados calculados en el servidor)
+    // =============================================
+    reportes: {
+        // params: { agrupar: 'dia' | 'semana' | 'mes', desde, hasta }
+        async ventas(params = {}) {
+            const response = await fetch(`/reportes/api/ventas/?${new URLSearchParams(params)}`);
+            return await response.json();
+        },
+        
+        // params: { desde, hasta, top }
+        async productos(params = {}) {
+            const response = await fetch(`/reportes/api/productos/?${new URLSearchParams(params)}`);
+            return await response.json();
+        },
+        
+        // params: { desde, hasta, id_producto }
+        async movimientos(params = {}) {
+            const response = await fetch(`/reportes/api/movimientos/?${new URLSearchParams(params)}`);
+            return await response.json();
+        },
+        
+        async vendedores(params = {}) {
+            const response = await fetch(`/reportes/api/vendedores/?${new URLSearchParams(params)}`);
+            return await response.json();
+        },
+        
+        // params: { stock_bajo }
+        async inventario(params = {}) {
+            const response = await fetch(`/reportes/api/inventario/?${new URLSearchParams(params)}`);
+            return await response.json();
+        },
+        
+        // URL de descarga (CSV/XLSX en streaming); reporte: 'ventas' | 'movimientos' | 'inventario'
+        // params: { formato: 'csv' | 'xlsx', desde, hasta, id_producto, tipo, id_proveedor, stock_max }
+        exportarUrl(reporte, params = {}) {
+            return `/reportes/api/exportar/${reporte}/?${new URLSearchParams(params)}`;
+        },
+        
+        // Reporte pesado en segundo plano: devuelve data.id_job; consultar
+        // estadoJob() hasta estado 'LISTO' y descargar data.url_resultado
+        async crearJob(reporte, formato = 'csv', filtros = {}) {
+            const response = await fetch('/reportes/api/jobs/', {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify({ reporte, formato, filtros })
+            });
+            return await response.json();
+        },
+        
+        async estadoJob(idJob) {
+            const response = await fetch(`/reportes/api/jobs/${idJob}/`);
+            return await response.json();
+        }
+    },
+    
+    // =============================================
+    // SYNC (cambios desde el último cursor)
+    // =============================================
+    sync: {
+        // Sin cursor devuelve reset: cargar las listas completas y guardar data.cursor.
+        // params: { cursor, tablas: 'productos,clientes,proveedores', limit }
+        async cambios(params = {}) {
+            const response = await fetch(`/api/sync/?${new URLSearchParams(params)}`);
+            return await response.json();
+        }
+    },
+    
+    // =============================================
+    // EVENTOS EN VIVO (SSE, requiere ASGI)
+    // =============================================
+    eventos: {
+        // handlers: { stock(data), venta(data) }; devuelve el EventSource para cerrarlo
+        suscribir(handlers = {}) {
+            const source = new EventSource('/api/eventos/');
+            Object.entries(handlers).forEach(([tipo, handler]) => {
+                source.addEventListener(tipo, (e) => handler(JSON.parse(e.data)));
+            });
+            return source;
         }
     },
     
@@ -365,6 +365,36 @@ window.addEventListener('productsUpdated', () => {
     loadProducts();
 });
 
+// Eventos en vivo de stock y ventas (SSE); sin servidor ASGI el navegador reintenta en silencio
+if (window.EventSource) {
+    const eventos = new EventSource('/api/eventos/');
+
+    eventos.addEventListener('stock', (e) => {
+        const data = JSON.parse(e.data);
+        let products = JSON.parse(localStorage.getItem('products') || '[]');
+        if (data.eliminado) {
+            products = products.filter(p => p.id !== data.id_producto);
+        } else {
+            products.forEach(p => {
+                if (p.id === data.id_producto) {
+                    p.stock = data.stock;
+                    p.salePrice = data.precio;
+                }
+            });
+        }
+        localStorage.setItem('products', JSON.stringify(products));
+        loadProducts();
+    });
+
+    eventos.addEventListener('venta', (e) => {
+        const data = JSON.parse(e.data);
+        const sales = JSON.parse(localStorage.getItem('sales') || '[]');
+        sales.push({ date: data.fecha || new Date().toISOString(), amount: Number(data.total) || 0 });
+        localStorage.setItem('sales', JSON.stringify(sales));
+        initSalesChart();
+    });
+}
+
 // Exponer función para botones de tabla (se usa onclick inline)
 window.goToInventory = goToInventory;
 
@@ -499,23 +499,36 @@ function printReport() {
     window.print();
 }
 
-function exportReportCSV() {
-    const headers = Array.from(document.querySelectorAll('#reportTableHeader th')).map(th => th.textContent);
-    const rows = Array.from(document.querySelectorAll('#reportTableBody tr')).map(tr => 
-        Array.from(tr.querySelectorAll('td')).map(td => td.textContent)
-    );
-    
-    let csv = headers.join(',') + '\n';
-    rows.forEach(row => {
-        csv += row.map(val => `"${val}"`).join(',') + '\n';
-    });
-    
-    const blob = new Blob([csv], { type: 'text/csv;charset=utf-8;' });
-    const link = document.createElement('a');
-    const url = URL.createObjectURL(blob);
-    link.setAttribute('href', url);
-    link.setAttribute('download', `reporte_inventario_${new Date().toISOString().split('T')[0]}.csv`);
-    link.click();
+// Rango de fechas (YYYY-MM-DD) del período seleccionado, para la exportación
+function exportRange() {
+    const period = document.getElementById('reportPeriod').value;
+    const iso = d => d.toISOString().split('T')[0];
+    const hoy = new Date();
+    if (period === 'personalizado') {
+        return {
+            desde: document.getElementById('startDate').value,
+            hasta: document.getElementById('endDate').value
+        };
+    }
+    const desde = new Date(hoy);
+    if (period === 'semana') desde.setDate(hoy.getDate() - 6);
+    else if (period === 'mes') desde.setDate(1);
+    else if (period === 'trimestre') desde.setMonth(Math.floor(hoy.getMonth() / 3) * 3, 1);
+    else if (period === 'ano') desde.setMonth(0, 1);
+    return { desde: iso(desde), hasta: iso(hoy) };
+}
+
+// La exportación la genera el servidor en streaming con todas las filas del
+// período, no solo las que están cargadas en la tabla
+function exportReportCSV(formato = 'csv') {
+    const reportType = document.getElementById('reportType').value;
+    const reporte = reportType === 'ventas' ? 'ventas' : 'inventario';
+    const params = reporte === 'ventas' ? exportRange() : {};
+    window.location.href = `/reportes/api/exportar/${reporte}/?${new URLSearchParams({ ...params, formato })}`;
+}
+
+function exportReportXLSX() {
+    exportReportCSV('xlsx');
 }
 
 function exportReportPDF() {
@@ -1,4 +1,5 @@
 from django.urls import path
+from core.asyncviews import async_view
 from . import views
 
 urlpatterns = [
@@ -15,8 +16,14 @@ urlpatterns = [
     # APIs de Ventas
     path('api/ventas/', views.api_ventas_list, name='api_ventas_list'),
     path('api/ventas/create/', views.api_ventas_create, name='api_ventas_create'),
+    path('api/ventas/checkout/', views.api_ventas_checkout, name='api_ventas_checkout'),
     
     # APIs de Usuarios
     path('api/usuarios/', views.api_usuarios_list, name='api_usuarios_list'),
     path('api/login/', views.api_login, name='api_login'),
+    
+    # APIs de lectura async (ASGI)
+    path('api/async/clientes/', async_view(views.api_clientes_list), name='api_async_clientes_list'),
+    path('api/async/ventas/', async_view(views.api_ventas_list), name='api_async_ventas_list'),
+    path('api/async/usuarios/', async_view(views.api_usuarios_list), name='api_async_usuarios_list'),
 ]
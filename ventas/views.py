@@ -1,9 +1,20 @@
 from django.shortcuts import render
 from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
-from django.db import connection
+from django.db import connection, transaction
+import itertools
 import json
 
+from core import archivo
+from core.cache import cached_list, conditional_list, invalidate_on_commit
+from core.ids import insert_returning_id
+from core.schema import registry
+from inventario import ledger, lookup
+from reportes.exportar import rango_archivado, rango_historial
+from reportes.resumenes import registrar_venta
+from core.streaming import STREAM_FORMATS, prepare_stream_cursor, streaming_json_response
+from core.sync import registrar_cambios
+
 def punto_venta_view(request):
     return render(request, 'ventas/PuntoDeVenta.html')
 
@@ -17,6 +28,7 @@ def clientes_view(request):
 # API REST para CLIENTES
 # =============================================
 
+@cached_list('CLIENTES')
 def api_clientes_list(request):
     """GET: Obtener todos los clientes"""
     cursor = connection.cursor()
@@ -36,16 +48,12 @@ def api_clientes_create(request):
         data = json.loads(request.body)
         cursor = connection.cursor()
         
-        # Obtener columnas disponibles
-        cursor.execute("SELECT * FROM CLIENTES WHERE ROWNUM = 0")
-        available_cols = [col[0].upper() for col in cursor.description]
-        
-        cursor.execute("SELECT NVL(MAX(ID_CLIENTE), 0) + 1 FROM CLIENTES")
-        next_id = cursor.fetchone()[0]
+        # Columnas disponibles (cacheadas por core.schema)
+        available_cols = registry.columns(cursor, 'CLIENTES')
         
         # Construir INSERT dinámicamente según las columnas disponibles
-        columns = ['ID_CLIENTE']
-        values = [next_id]
+        columns = []
+        values = []
         
         col_mapping = {
             'NOMBRE': data.get('nombre', ''),
@@ -61,12 +69,11 @@ def api_clientes_create(request):
                 columns.append(col)
                 values.append(val)
         
-        placeholders = ', '.join(['%s'] * len(values))
-        sql = f"INSERT INTO CLIENTES ({', '.join(columns)}) VALUES ({placeholders})"
-        
-        cursor.execute(sql, values)
-        connection.commit()
+        with transaction.atomic():
+            next_id = insert_returning_id(cursor, 'CLIENTES', columns, values)
+            registrar_cambios(cursor, 'CLIENTES', [next_id])
         cursor.close()
+        invalidate_on_commit('CLIENTES')
         
         return JsonResponse({'success': True, 'id': next_id, 'message': 'Cliente creado'})
     except Exception as e:
@@ -82,9 +89,8 @@ def api_clientes_update(request, id):
         data = json.loads(request.body)
         cursor = connection.cursor()
         
-        # Obtener columnas disponibles
-        cursor.execute("SELECT * FROM CLIENTES WHERE ROWNUM = 0")
-        available_cols = [col[0].upper() for col in cursor.description]
+        # Columnas disponibles (cacheadas por core.schema)
+        available_cols = registry.columns(cursor, 'CLIENTES')
         
         # Construir UPDATE dinámicamente
         updates = []
@@ -106,9 +112,14 @@ def api_clientes_update(request, id):
         
         if updates:
             values.append(id)
-            sql = f"UPDATE CLIENTES SET {', '.join(updates)} WHERE ID_CLIENTE = %s"
-            cursor.execute(sql, values)
-            connection.commit()
+            sql = registry.statement(
+                ('update', 'CLIENTES', tuple(updates)),
+                lambda: f"UPDATE CLIENTES SET {', '.join(updates)} WHERE ID_CLIENTE = %s"
+            )
+            with transaction.atomic():
+                cursor.execute(sql, values)
+                registrar_cambios(cursor, 'CLIENTES', [id])
+            invalidate_on_commit('CLIENTES')
         
         cursor.close()
         
@@ -123,10 +134,12 @@ def api_clientes_delete(request, id):
         return JsonResponse({'success': False, 'error': 'Método no permitido'}, status=405)
     
     try:
-        cursor = connection.cursor()
-        cursor.execute("DELETE FROM CLIENTES WHERE ID_CLIENTE = %s", [id])
-        connection.commit()
-        cursor.close()
+        with transaction.atomic():
+            cursor = connection.cursor()
+            cursor.execute("DELETE FROM CLIENTES WHERE ID_CLIENTE = %s", [id])
+            registrar_cambios(cursor, 'CLIENTES', [id], 'D')
+            cursor.close()
+        invalidate_on_commit('CLIENTES')
         
         return JsonResponse({'success': True, 'message': 'Cliente eliminado'})
     except Exception as e:
@@ -136,25 +149,52 @@ def api_clientes_delete(request, id):
 # API REST para VENTAS
 # =============================================
 
+@conditional_list('VENTAS', 'USUARIOS')
 def api_ventas_list(request):
-    """GET: Obtener todas las ventas"""
+    """GET: Obtener todas las ventas (?desde=&hasta=, ?stream=json|ndjson para streaming)
+
+    Con un `desde` anterior a la frontera del archivo (core.archivo) se
+    agregan, después de las de la base, las ventas archivadas del rango.
+    """
+    stream = request.GET.get('stream')
+    try:
+        where, params, limite = rango_historial(request.GET, 'v.FECHA', 'ventas')
+    except ValueError as e:
+        return JsonResponse({'success': False, 'error': f'Fecha inválida: {e}'}, status=400)
     cursor = connection.cursor()
-    cursor.execute("""
+    if stream in STREAM_FORMATS:
+        prepare_stream_cursor(cursor)
+    cursor.execute(f"""
         SELECT v.ID_VENTA, v.FECHA, v.ID_USUARIO, u.NOMBRE as VENDEDOR, v.TOTAL
         FROM VENTAS v
         LEFT JOIN USUARIOS u ON v.ID_USUARIO = u.ID_USUARIO
+        {(" WHERE " + " AND ".join(where)) if where else ""}
         ORDER BY v.FECHA DESC
-    """)
+    """, params)
+    archivadas = _ventas_archivadas(request.GET, limite)
+    if stream in STREAM_FORMATS:
+        return streaming_json_response(cursor, stream, extra=archivadas)
     columns = [col[0].lower() for col in cursor.description]
     ventas = []
-    for row in cursor.fetchall():
-        venta = dict(zip(columns, row))
+    for venta in itertools.chain((dict(zip(columns, row)) for row in cursor.fetchall()), archivadas):
         if venta.get('fecha'):
             venta['fecha'] = venta['fecha'].isoformat()
         ventas.append(venta)
     cursor.close()
     return JsonResponse({'success': True, 'data': ventas})
 
+def _ventas_archivadas(filtros, limite):
+    """Ventas archivadas del rango, más recientes primero y con las columnas del listado"""
+    if limite is None:
+        return
+    desde, hasta = rango_archivado(filtros, limite)
+    filas = archivo.filas_recientes('VENTAS', desde, hasta, ['ID_VENTA', 'FECHA', 'ID_USUARIO', 'TOTAL'])
+    for v in archivo.con_nombres(filas, 'USUARIOS', 'id_usuario', 'vendedor'):
+        yield {
+            'id_venta': v['id_venta'], 'fecha': v['fecha'], 'id_usuario': v['id_usuario'],
+            'vendedor': v['vendedor'], 'total': v['total'],
+        }
+
 @csrf_exempt
 def api_ventas_create(request):
     """POST: Crear una nueva venta"""
@@ -163,30 +203,166 @@ def api_ventas_create(request):
     
     try:
         data = json.loads(request.body)
-        cursor = connection.cursor()
         
-        cursor.execute("SELECT NVL(MAX(ID_VENTA), 0) + 1 FROM VENTAS")
-        next_id = cursor.fetchone()[0]
-        
-        cursor.execute("""
-            INSERT INTO VENTAS (ID_VENTA, FECHA, ID_USUARIO, TOTAL)
-            VALUES (%s, SYSDATE, %s, %s)
-        """, [
-            next_id,
-            data.get('id_usuario', 1),
-            data.get('total', 0)
-        ])
-        connection.commit()
-        cursor.close()
+        with transaction.atomic():
+            cursor = connection.cursor()
+            next_id = insert_returning_id(cursor, 'VENTAS', ['ID_USUARIO', 'TOTAL'], [
+                data.get('id_usuario', 1),
+                data.get('total', 0)
+            ], expresiones={'FECHA': 'SYSDATE'})
+            registrar_venta(cursor, [], data.get('id_usuario', 1), data.get('total', 0))
+            registrar_cambios(cursor, 'VENTAS', [next_id])
+            cursor.close()
+        invalidate_on_commit('VENTAS')
         
         return JsonResponse({'success': True, 'id': next_id, 'message': 'Venta registrada'})
     except Exception as e:
         return JsonResponse({'success': False, 'error': str(e)}, status=400)
 
+# Columnas opcionales de VENTAS que el checkout llena si existen en la tabla
+VENTAS_COLUMNAS_OPCIONALES = {
+    'ID_CLIENTE': 'id_cliente',
+    'METODO_PAGO': 'metodo_pago',
+}
+
+class CheckoutError(Exception):
+    """Carrito rechazado por la validación del servidor"""
+
+    def __init__(self, error, status=400, detalle=None):
+        super().__init__(error)
+        self.error = error
+        self.status = status
+        self.detalle = detalle
+
+def _parse_carrito(data):
+    """Valida las líneas del carrito: [{id_producto, cantidad, precio?}]"""
+    items = data.get('items')
+    if not isinstance(items, list) or not items:
+        raise CheckoutError('El carrito está vacío')
+
+    lineas = []
+    for item in items:
+        try:
+            id_producto = int(item['id_producto'])
+            cantidad = int(item.get('cantidad', 1))
+        except (KeyError, TypeError, ValueError):
+            raise CheckoutError(f'Línea inválida: {item}')
+        if cantidad <= 0:
+            raise CheckoutError(f'Cantidad inválida para el producto {id_producto}')
+        lineas.append((id_producto, cantidad, item.get('precio')))
+    return lineas
+
+@csrf_exempt
+def api_ventas_checkout(request):
+    """POST: Registrar una venta completa (cabecera, detalle y stock) en una transacción
+
+    Body: {id_usuario, id_cliente?, metodo_pago?, items: [{id_producto, cantidad, precio?}]}
+    Precios y stock se validan contra PRODUCTOS; si el cliente envía `precio`
+    y no coincide con el actual, la venta se rechaza. Usa un número fijo de
+    round trips sin importar el tamaño del carrito.
+    """
+    if request.method != 'POST':
+        return JsonResponse({'success': False, 'error': 'Método no permitido'}, status=405)
+    
+    try:
+        data = json.loads(request.body)
+        lineas = _parse_carrito(data)
+
+        # Cantidad total por producto (un mismo producto puede venir en varias líneas)
+        cantidades = {}
+        for id_producto, cantidad, _ in lineas:
+            cantidades[id_producto] = cantidades.get(id_producto, 0) + cantidad
+        ids = sorted(cantidades)
+
+        with transaction.atomic():
+            cursor = connection.cursor()
+
+            # 1. Precio y stock actuales, bloqueando las filas hasta el commit
+            # (un producto dado de baja, pendiente de purga, cuenta como inexistente)
+            placeholders = ', '.join(['%s'] * len(ids))
+            activo = "AND NVL(ACTIVO, 'S') = 'S'" if 'ACTIVO' in registry.columns(cursor, 'PRODUCTOS') else ''
+            cursor.execute(f"""
+                SELECT ID_PRODUCTO, PRECIO, STOCK FROM PRODUCTOS
+                WHERE ID_PRODUCTO IN ({placeholders}) {activo}
+                FOR UPDATE
+            """, ids)
+            productos = {row[0]: (row[1], row[2]) for row in cursor.fetchall()}
+
+            faltantes = [i for i in ids if i not in productos]
+            if faltantes:
+                raise CheckoutError('Productos inexistentes', 400, {'productos': faltantes})
+
+            sin_stock = [
+                {'id_producto': i, 'stock': productos[i][1], 'solicitado': cantidades[i]}
+                for i in ids if (productos[i][1] or 0) < cantidades[i]
+            ]
+            if sin_stock:
+                raise CheckoutError('Stock insuficiente', 409, {'productos': sin_stock})
+
+            detalle = []
+            total = 0
+            for id_producto, cantidad, precio_cliente in lineas:
+                precio = productos[id_producto][0] or 0
+                if precio_cliente is not None and float(precio_cliente) != float(precio):
+                    raise CheckoutError('El precio de un producto cambió', 409, {
+                        'id_producto': id_producto, 'precio': precio
+                    })
+                subtotal = precio * cantidad
+                total += subtotal
+                detalle.append([id_producto, cantidad, precio, subtotal])
+
+            # 2. Cabecera (ID desde SEQ_VENTAS)
+            columnas = ['ID_USUARIO', 'TOTAL']
+            valores = [data.get('id_usuario', 1), total]
+            disponibles = registry.columns(cursor, 'VENTAS')
+            for columna, campo in VENTAS_COLUMNAS_OPCIONALES.items():
+                if columna in disponibles and data.get(campo) is not None:
+                    columnas.append(columna)
+                    valores.append(data[campo])
+            id_venta = insert_returning_id(cursor, 'VENTAS', columnas, valores,
+                                           expresiones={'FECHA': 'SYSDATE'})
+
+            # 3. Detalle con array DML
+            cursor.executemany("""
+                INSERT INTO DETALLE_VENTA (ID_DETALLE, ID_VENTA, ID_PRODUCTO, CANTIDAD, PRECIO_UNITARIO, SUBTOTAL)
+                VALUES (SEQ_DETALLE.NEXTVAL, %s, %s, %s, %s, %s)
+            """, [[id_venta] + linea for linea in detalle])
+
+            # 4. Descuento de stock, una fila por producto en un solo lote
+            cursor.executemany(
+                "UPDATE PRODUCTOS SET STOCK = STOCK - %s WHERE ID_PRODUCTO = %s",
+                [[cantidades[i], i] for i in ids]
+            )
+
+            # 5. Resúmenes diarios por producto y por vendedor
+            registrar_venta(cursor, [(d[0], d[1], d[3]) for d in detalle], valores[0], total)
+            ledger.registrar_deltas(cursor, [(i, -cantidades[i]) for i in ids], 'VENTA', id_venta)
+            registrar_cambios(cursor, 'PRODUCTOS', ids)
+            registrar_cambios(cursor, 'VENTAS', [id_venta])
+            cursor.close()
+            invalidate_on_commit('PRODUCTOS', 'VENTAS')
+            lookup.invalidar(*ids)
+
+        return JsonResponse({
+            'success': True,
+            'id': id_venta,
+            'total': total,
+            'lineas': len(detalle),
+            'message': 'Venta registrada'
+        })
+    except CheckoutError as e:
+        response = {'success': False, 'error': e.error}
+        if e.detalle is not None:
+            response['detalle'] = e.detalle
+        return JsonResponse(response, status=e.status)
+    except Exception as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+
 # =============================================
 # API REST para USUARIOS (Login)
 # =============================================
 
+@cached_list('USUARIOS')
 def api_usuarios_list(request):
     """GET: Obtener todos los usuarios"""
     cursor = connection.cursor()